@@ -1,127 +1,298 @@
 # --- Import necessary libraries ---
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import argparse
+import base64
+import hashlib
+import html
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import pandas as pd
+
+# Bump this when the look of the plots changes, so cached images are re-rendered.
+PLOT_VERSION = 1
+HISTOGRAM_BINS = 30
+CACHE_FILENAME = '.eda_cache.json'
+
+
+# =========================================================================
+# PLOT RENDERING (runs in worker processes)
+# =========================================================================
+
+def render_plot(job):
+    """
+    Renders one plot from pre-aggregated data and saves it as a PNG.
+    Workers only receive small arrays (bin counts, value counts, a correlation
+    matrix), never the raw data, so there is almost nothing to send between processes.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Headless: never opens a window
+    import matplotlib.pyplot as plt
+
+    kind, title, path = job['kind'], job['title'], job['path']
+    if kind == 'histogram':
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.stairs(job['counts'], job['edges'], fill=True, alpha=0.7)
+        ax.set_xlabel(job['column'])
+        ax.set_ylabel('Frequency')
+    elif kind == 'countplot':
+        fig, ax = plt.subplots(figsize=(12, 7))
+        labels, counts = job['labels'], job['counts']
+        ax.barh(range(len(labels)), counts)
+        ax.set_yticks(range(len(labels)))
+        ax.set_yticklabels(labels)
+        ax.invert_yaxis()
+        ax.set_xlabel('Count')
+        ax.set_ylabel(job['column'])
+    else:  # heatmap
+        import seaborn as sns
+        fig, ax = plt.subplots(figsize=(12, 8))
+        corr = pd.DataFrame(job['matrix'], index=job['columns'], columns=job['columns'])
+        sns.heatmap(corr, annot=True, cmap='coolwarm', fmt='.2f', ax=ax)
+
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+# =========================================================================
+# STREAMING STATISTICS (one pass over the CSV, chunk by chunk)
+# =========================================================================
+
+def scan_statistics(filepath, chunksize):
+    """
+    Reads the CSV in chunks and computes everything except histograms in one pass:
+    per-column count/missing/sum/sum of squares/min/max, categorical value counts,
+    the sums needed for the correlation matrix, and a content hash per column.
+    """
+    stats = None
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        if stats is None:
+            numerical_cols = chunk.select_dtypes(include=np.number).columns.tolist()
+            categorical_cols = chunk.select_dtypes(include=['object', 'category']).columns.tolist()
+            k = len(numerical_cols)
+            stats = {
+                'rows': 0,
+                'columns': chunk.columns.tolist(),
+                'dtypes': {col: str(dtype) for col, dtype in chunk.dtypes.items()},
+                'numerical_cols': numerical_cols,
+                'categorical_cols': categorical_cols,
+                'missing': pd.Series(0, index=chunk.columns),
+                'count': np.zeros(k), 'sum': np.zeros(k), 'sumsq': np.zeros(k),
+                'min': np.full(k, np.inf), 'max': np.full(k, -np.inf),
+                'value_counts': {col: pd.Series(dtype='int64') for col in categorical_cols},
+                'corr_n': 0, 'corr_sum': np.zeros(k), 'corr_xtx': np.zeros((k, k)),
+                'hashes': {col: hashlib.sha1() for col in chunk.columns},
+                'head': chunk.head()
+            }
+
+        stats['rows'] += len(chunk)
+        stats['missing'] = stats['missing'].add(chunk.isnull().sum(), fill_value=0)
+        for col in chunk.columns:
+            stats['hashes'][col].update(pd.util.hash_pandas_object(chunk[col], index=False).values.tobytes())
+
+        numeric = chunk[stats['numerical_cols']].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        stats['count'] += np.sum(~np.isnan(numeric), axis=0)
+        stats['sum'] += np.nansum(numeric, axis=0)
+        stats['sumsq'] += np.nansum(numeric ** 2, axis=0)
+        if len(numeric):
+            stats['min'] = np.fmin(stats['min'], np.nanmin(numeric, axis=0, initial=np.inf))
+            stats['max'] = np.fmax(stats['max'], np.nanmax(numeric, axis=0, initial=-np.inf))
+
+        complete = numeric[~np.isnan(numeric).any(axis=1)]
+        stats['corr_n'] += len(complete)
+        stats['corr_sum'] += complete.sum(axis=0)
+        stats['corr_xtx'] += complete.T @ complete
+
+        for col in stats['categorical_cols']:
+            stats['value_counts'][col] = stats['value_counts'][col].add(chunk[col].value_counts(), fill_value=0)
+
+    if stats is None:
+        raise ValueError(f"'{filepath}' contains no rows.")
+    stats['hashes'] = {col: h.hexdigest() for col, h in stats['hashes'].items()}
+    return stats
+
+
+def describe(stats):
+    """Builds a describe()-style table from the streamed sums."""
+    count = stats['count']
+    mean = np.divide(stats['sum'], count, out=np.full_like(count, np.nan), where=count > 0)
+    variance = np.divide(stats['sumsq'] - count * mean ** 2, count - 1, out=np.full_like(count, np.nan), where=count > 1)
+    return pd.DataFrame({
+        'count': count.astype(int),
+        'mean': mean,
+        'std': np.sqrt(np.clip(variance, 0, None)),
+        'min': stats['min'],
+        'max': stats['max']
+    }, index=stats['numerical_cols']).T
+
 
+def correlation(stats):
+    """Pearson correlation of the numerical columns from the streamed sums."""
+    n = stats['corr_n']
+    mean = stats['corr_sum'] / n
+    cov = stats['corr_xtx'] / n - np.outer(mean, mean)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / np.outer(std, std)
+
+
+def histograms(filepath, columns, stats, chunksize):
+    """Second chunked pass, only for the columns whose histogram must be (re-)rendered."""
+    index = {col: stats['numerical_cols'].index(col) for col in columns}
+    edges = {}
+    for col, i in index.items():
+        low, high = stats['min'][i], stats['max'][i]
+        if not np.isfinite(low):
+            low, high = 0.0, 1.0
+        edges[col] = np.linspace(low, high if high > low else low + 1, HISTOGRAM_BINS + 1)
+    counts = {col: np.zeros(HISTOGRAM_BINS) for col in columns}
+    for chunk in pd.read_csv(filepath, chunksize=chunksize, usecols=columns):
+        for col in columns:
+            values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64)
+            counts[col] += np.histogram(values[~np.isnan(values)], bins=edges[col])[0]
+    return counts, edges
+
+
+# =========================================================================
+# REPORT
+# =========================================================================
+
+def write_report(path, filepath, stats, summary, missing, plot_paths, elapsed):
+    def table(df):
+        return df.to_html(classes='table', float_format=lambda v: f'{v:.3f}', border=0)
+
+    images = []
+    for title, plot_path in plot_paths:
+        with open(plot_path, 'rb') as f:
+            encoded = base64.b64encode(f.read()).decode('ascii')
+        images.append(f'<figure><img src="data:image/png;base64,{encoded}" alt="{html.escape(title)}"><figcaption>{html.escape(title)}</figcaption></figure>')
+
+    categorical = ''.join(
+        f'<h3>{html.escape(col)}</h3>' + table(counts.sort_values(ascending=False).astype(int).to_frame('count'))
+        for col, counts in stats['value_counts'].items()
+    ) or '<p>No categorical columns found to describe.</p>'
+
+    dtypes = pd.DataFrame({'dtype': pd.Series(stats['dtypes']), 'missing': stats['missing'].astype(int)})
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>EDA report - {html.escape(os.path.basename(filepath))}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem; }}
+.table {{ border-collapse: collapse; margin-bottom: 1.5rem; }}
+.table th, .table td {{ border: 1px solid #ddd; padding: 4px 8px; text-align: right; }}
+figure {{ display: inline-block; margin: 0 1rem 1rem 0; }}
+img {{ max-width: 600px; }}
+</style></head><body>
+<h1>EDA report</h1>
+<p>Source: <code>{html.escape(os.path.abspath(filepath))}</code> &mdash; {stats['rows']} rows, {len(stats['columns'])} columns. Generated in {elapsed:.1f}s.</p>
+<h2>1. Initial Data Inspection</h2>{table(stats['head'])}{table(dtypes)}
+<h2>2. Descriptive Statistics</h2>{table(summary)}
+<h2>Categorical Columns</h2>{categorical}
+<h2>3. Missing Values</h2>{table(missing.to_frame('missing')) if len(missing) else '<p>No missing values.</p>'}
+<h2>4. Plots</h2>{''.join(images)}
+</body></html>
+""")
+
+
+def perform_eda(filepath, output_dir="EDA_Plots", workers=None, chunksize=200_000):
+    """
+    Non-interactive EDA: streams the CSV in chunks, computes the statistics in one
+    vectorized pass, renders only the plots whose column data changed (in parallel
+    on the Agg backend), and writes everything into a single HTML report.
+    Returns the path of the report.
+    """
+    start = time.perf_counter()
 
-def perform_eda(filepath): 
     # =========================================================================
-    # STEP 1: DATA LOADING AND INITIAL INSPECTION
+    # STEP 1-3: DATA LOADING, DESCRIPTIVE STATISTICS, MISSING VALUES
     # =========================================================================
-    
+
     print(f"\nReading data from: {filepath}")
     try:
-        df = pd.read_csv('Data/Heartdata.csv')
+        stats = scan_statistics(filepath, chunksize)
     except FileNotFoundError:
         print(f"Error: The file '{filepath}' was not found. Please check the path and filename and try again.")
-        return
+        return None
     except Exception as e:
         print(f"An error occurred while reading the file: {e}")
-        return
-
-    print("Data loaded successfully!")
+        return None
+    print(f"Data loaded successfully! Shape of the dataset (Rows, Columns): ({stats['rows']}, {len(stats['columns'])})")
 
-    print("\n--- 1. Initial Data Inspection ---")
-    print("\nFirst 5 Rows:")
-    print(df.head())
-    print(f"\nShape of the dataset (Rows, Columns): {df.shape}")
-    print("\nData Types and Non-Null Values:")
-    df.info()
+    summary = describe(stats)
+    missing = stats['missing'][stats['missing'] > 0].sort_values(ascending=False)
+    print("\n--- Descriptive Statistics ---")
+    print(summary)
 
-    
     # =========================================================================
-    # STEP 2: DESCRIPTIVE STATISTICS
+    # STEP 4: DATA VISUALIZATION (only plots whose data changed)
     # =========================================================================
-    
-    print("\n--- 2. Descriptive Statistics ---")
-    print("\nFor Numerical Columns:")
-    print(df.describe())
-    
-    try:
-        print("\nFor Categorical Columns:")
-        print(df.describe(include=['object', 'category']))
-    except ValueError:
-        print("No categorical columns found to describe.")
 
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CACHE_FILENAME)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
 
-    # =========================================================================
-    # STEP 3: MISSING VALUES ANALYSIS
-    # =========================================================================
-    
-    print("\n--- 3. Missing Values Count ---")
-    missing_values = df.isnull().sum()
-    print("Columns with missing values:")
-    print(missing_values[missing_values > 0].sort_values(ascending=False))
+    plots = []  # (title, path, cache key, job builder)
+    for col in stats['numerical_cols']:
+        plots.append((f'Histogram of {col}', os.path.join(output_dir, f'{col}_histogram.png'),
+                      f"{PLOT_VERSION}:{HISTOGRAM_BINS}:{stats['hashes'][col]}", ('histogram', col)))
+    for col in stats['categorical_cols']:
+        plots.append((f'Count Plot of {col}', os.path.join(output_dir, f'{col}_countplot.png'),
+                      f"{PLOT_VERSION}:{stats['hashes'][col]}", ('countplot', col)))
+    if len(stats['numerical_cols']) > 1:
+        combined = hashlib.sha1(''.join(stats['hashes'][c] for c in stats['numerical_cols']).encode()).hexdigest()
+        plots.append(('Correlation Matrix of Numerical Columns', os.path.join(output_dir, 'correlation_heatmap.png'),
+                      f"{PLOT_VERSION}:{combined}", ('heatmap', None)))
 
+    stale = [plot for plot in plots if cache.get(os.path.basename(plot[1])) != plot[2] or not os.path.exists(plot[1])]
+    stale_histograms = [plot[3][1] for plot in stale if plot[3][0] == 'histogram']
+    hist_counts, hist_edges = histograms(filepath, stale_histograms, stats, chunksize) if stale_histograms else ({}, {})
 
-    # =========================================================================
-    # STEP 4: DATA VISUALIZATION (MODIFIED TO DISPLAY PLOTS)
-    # =========================================================================
-    
-    print("\n--- 4. Generating and Displaying Plots ---")
-    # --- IMPORTANT INSTRUCTION FOR THE USER ---
-    print("\n>>> IMPORTANT: Close each plot window that appears to proceed to the next one. <<<")
-    
-    output_dir = "EDA_Plots"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    print(f"\nPlots will also be saved in the '{output_dir}' directory for your records.")
-
-    numerical_cols = df.select_dtypes(include=np.number).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-
-    # --- Histograms for Numerical Columns ---
-    for col in numerical_cols:
-        plt.figure(figsize=(10, 6))
-        sns.histplot(df[col], kde=True, bins=30)
-        plt.title(f'Histogram of {col}')
-        plt.xlabel(col)
-        plt.ylabel('Frequency')
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, f'{col}_histogram.png'))
-        plt.show() # This line displays the plot
-        plt.close() # Closes the figure to free up memory
-
-    # --- Count Plots for Categorical Columns ---
-    for col in categorical_cols:
-        plt.figure(figsize=(12, 7))
-        sns.countplot(y=col, data=df, order=df[col].value_counts().index)
-        plt.title(f'Count Plot of {col}')
-        plt.xlabel('Count')
-        plt.ylabel(col)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, f'{col}_countplot.png'))
-        plt.show() # This line displays the plot
-        plt.close()
-
-    # --- Correlation Heatmap for Numerical Columns ---
-    if len(numerical_cols) > 1:
-        plt.figure(figsize=(12, 8))
-        correlation_matrix = df[numerical_cols].corr()
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt='.2f')
-        plt.title('Correlation Matrix of Numerical Columns')
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, 'correlation_heatmap.png'))
-        plt.show() # This line displays the plot
-        plt.close()
-
-    print("\nEDA complete. All plots have been displayed and saved successfully.")
+    jobs = []
+    for title, path, _, (kind, col) in stale:
+        job = {'kind': kind, 'title': title, 'path': path, 'column': col}
+        if kind == 'histogram':
+            job.update(counts=hist_counts[col], edges=hist_edges[col])
+        elif kind == 'countplot':
+            counts = stats['value_counts'][col].sort_values(ascending=False)
+            job.update(labels=[str(label) for label in counts.index], counts=counts.to_numpy())
+        else:
+            job.update(matrix=correlation(stats), columns=stats['numerical_cols'])
+        jobs.append(job)
+
+    print(f"\n--- Rendering {len(jobs)} of {len(plots)} plots ({len(plots) - len(jobs)} unchanged, reused from '{output_dir}') ---")
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render_plot, jobs))
+
+    for _, path, key, _ in plots:
+        cache[os.path.basename(path)] = key
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+
+    report_path = os.path.join(output_dir, 'eda_report.html')
+    write_report(report_path, filepath, stats, summary, missing,
+                 [(title, path) for title, path, _, _ in plots], time.perf_counter() - start)
+    print(f"\nEDA complete in {time.perf_counter() - start:.1f}s. Report written to '{report_path}'.")
+    return report_path
 
 
 # =========================================================================
 # SCRIPT ENTRY POINT
 # =========================================================================
 if __name__ == "__main__":
-    
-    DATA_FOLDER = "data"
-
-    if not os.path.isdir(DATA_FOLDER):
-        print(f"--- SETUP ERROR ---")
-        print(f"A folder named '{DATA_FOLDER}' was not found in this directory.")
-        print(f"Please create a '{DATA_FOLDER}' folder, place your CSV file inside it, and run the script again.")
-    else:
-        filename = input(f"Enter the filename of your CSV (must be in the '{DATA_FOLDER}' folder): ").strip()
-        full_path = os.path.join(DATA_FOLDER, filename)
-        perform_eda(full_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate a headless EDA report (HTML) for a CSV file.")
+    parser.add_argument('filepath', nargs='?', default=os.path.join('Data', 'Heartdata.csv'), help='CSV file to analyse')
+    parser.add_argument('--output-dir', default='EDA_Plots', help='Where plots, the cache and the report are written')
+    parser.add_argument('--workers', type=int, default=None, help='Plot rendering processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=200_000, help='Rows read per CSV chunk')
+    args = parser.parse_args()
+
+    perform_eda(args.filepath, output_dir=args.output_dir, workers=args.workers, chunksize=args.chunksize)
@@ -1,27 +1,18 @@
-import pandas as pd
+import os
+import sys
+
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score
 
-# Load your dataset
-df = pd.read_csv("Data/Heartdata.csv")  # Update path if needed
-
-# Check if 'target' column exists
-if 'target' not in df.columns:
-    raise ValueError("Column 'target' not found in dataset.")
-
-# Drop rows with missing target
-df = df.dropna(subset=['target'])
-
-# Separate features and target
-X = df.drop('target', axis=1)
-y = df['target']
-
-# Convert categorical columns to numeric (if any)
-X = pd.get_dummies(X)
+# data_ingestion.py lives in the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_ingestion import load_training_data
 
-# Fill missing values with column median
-X = X.fillna(X.median())
+# Load your dataset in chunks into the shared columnar cache (reused on later runs).
+# Rows with a missing target are dropped and missing features are filled with
+# the column median during ingestion.
+X, y = load_training_data("Data/Heartdata.csv")  # Update path if needed
 
 # Split data into train and test sets
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
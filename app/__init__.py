@@ -3,6 +3,7 @@
 import os
 from flask import Flask, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_migrate import Migrate
 from flask_restful import Api
 from flask_bcrypt import Bcrypt
@@ -10,6 +11,7 @@ from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 from flask_cors import CORS
 from config import Config
+from app.serialization import FastJSONProvider, output_json
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -17,23 +19,55 @@ bcrypt = Bcrypt()
 jwt = JWTManager()
 mail = Mail()
 
-def create_app(config_class=Config):
+def _sqlite_pragmas(config):
+    """Returns a connect listener that switches SQLite to WAL with the configured sync level."""
+    synchronous = config['SQLITE_SYNCHRONOUS']
+    busy_timeout = int(config['SQLITE_BUSY_TIMEOUT_MS'])
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+    return set_pragmas
+
+def create_app(config_class=Config, model_loading=None):
+    """
+    Application factory. `model_loading` (default: the MODEL_LOADING setting) controls
+    when the ML models are loaded:
+      'eager'      - load them now, before the app is returned.
+      'background' - start loading and warming them up in a background thread;
+                     /ready returns 503 until they are available.
+      'lazy'       - load them on the first prediction (e.g. for CLI commands).
+    """
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
+    model_loading = model_loading or app.config['MODEL_LOADING']
 
     CORS(app)
     db.init_app(app)
+    if app.config['SQLITE_WAL']:
+        with app.app_context():
+            if db.engine.dialect.name == 'sqlite':
+                event.listen(db.engine, 'connect', _sqlite_pragmas(app.config))
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
     api = Api(app)
+    api.representation('application/json')(output_json)
 
-    from .models import User
+    from app.services import user_cache
 
     @jwt.additional_claims_loader
     def add_claims_to_jwt(identity):
-        user = User.query.get(int(identity))
+        # Served from the per-process user cache, so issuing a token for a
+        # recently seen user does not query the database.
+        user = user_cache.get_user(identity)
         if user:
             # --- THIS IS THE NEW DEBUG LINE ---
             print(f"DEBUG: Creating token for user '{user.username}'. Role found in DB: {user.role}")
@@ -41,12 +75,28 @@ def create_app(config_class=Config):
             return {'role': user.role}
         return {'role': None}
 
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        # Tokens stay valid until they expire, so an account queued for deletion
+        # (or already deleted) is refused here rather than only at login: otherwise
+        # it could keep writing predictions and documents the deletion job has
+        # already swept. Served from the user cache like the claims above.
+        from app.services.deletion_service import DELETING_ROLE
+        user = user_cache.get_user(jwt_payload[app.config['JWT_IDENTITY_CLAIM']])
+        return user is None or user.role == DELETING_ROLE
+
     # The '/uploads/profile_pics/' route has been removed.
 
-    with app.app_context():
-        from app.services import prediction_service
+    from app.services import prediction_service
+    prediction_service.configure(app.config['MODEL_LATENCY_BUDGET_MS'])
+    if model_loading == 'eager':
         prediction_service.load_models()
-    
+    elif model_loading == 'background':
+        prediction_service.start_warm_up()
+
     from app import routes
     routes.initialize_routes(api)
+
+    from app.commands import register_commands
+    register_commands(app)
     return app
\ No newline at end of file
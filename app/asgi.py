@@ -0,0 +1,361 @@
+# app/asgi.py
+
+"""
+ASGI serving mode: `uvicorn asgi:app` (see asgi.py next to run.py).
+
+The endpoints that mostly wait on the network, the disk or the database run
+here as async handlers, so a slow client or a slow query holds a suspended
+coroutine instead of a worker thread:
+
+  GET/HEAD/PUT /uploads/<id>    resumable upload status and chunks (streamed to disk)
+  GET /documents[/<id>]         document list and details (async SQLAlchemy)
+  POST /forgot-password         queues the reset email in the outbox (async INSERT)
+  GET /doctor/export            streams the export; each chunk is produced in a thread
+  GET /profile-images/...       profile picture renditions, with ETag revalidation
+
+Every other route is served by the Flask app through a WSGI bridge with a
+bounded thread pool: CPU_ROUTES (model + SHAP, OCR, PDF rendering, bcrypt) on
+ASGI_CPU_THREADS threads, everything else on ASGI_IO_THREADS. The WSGI app
+itself (`run.py`, gunicorn) is unchanged and remains the default deployment.
+
+Async database access needs an async driver for the configured database:
+aiosqlite for SQLite, asyncpg for PostgreSQL.
+"""
+
+import json
+import re
+from urllib.parse import parse_qsl
+
+from config import Config
+from app import create_app, db, schemas, _sqlite_pragmas
+from app.models import User, MedicalDocument, EmailOutbox
+from app.services import (admission_control, deletion_service, export_service, image_service, mail_outbox,
+                          retention_service, upload_service, user_cache)
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg'}
+
+# Flask routes whose work is CPU-bound; they get their own, smaller thread pool so
+# a burst of predictions or OCR cannot starve the cheap routes (and vice versa).
+CPU_ROUTES = re.compile(
+    r'/(predict|predict/what-if|upload-document|uploads/[0-9a-f]+/complete|predictions/\d+/export'
+    r'|login|register|reset-password|profile/picture)'
+)
+
+NOT_FOUND = ('The requested URL was not found on the server. If you entered the URL manually '
+             'please check your spelling and try again.')
+
+
+def async_database_uri(uri):
+    """The SQLAlchemy URI of the same database with its async driver."""
+    scheme, _, rest = uri.partition('://')
+    dialect = scheme.split('+', 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise RuntimeError(f'ASGI mode has no async driver for {dialect} databases')
+    return f'{ASYNC_DRIVERS[dialect]}://{rest}'
+
+
+class HTTPError(Exception):
+    """Ends a native handler with a JSON error response."""
+
+    def __init__(self, status, body, headers=None):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+class AsgiApp:
+    """Routes requests to the native async handlers, or to the Flask app through a bounded WSGI bridge."""
+
+    def __init__(self, flask_app):
+        from a2wsgi import WSGIMiddleware
+
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.cpu = WSGIMiddleware(flask_app, workers=config['ASGI_CPU_THREADS'])
+        self.io = WSGIMiddleware(flask_app, workers=config['ASGI_IO_THREADS'])
+        self.engine = None
+        self._limiter = None
+        self.routes = [
+            (('GET', 'HEAD'), re.compile(r'/uploads/(?P<upload_id>[^/]+)'), self.upload_status),
+            (('PUT',), re.compile(r'/uploads/(?P<upload_id>[^/]+)'), self.upload_chunk),
+            (('GET',), re.compile(r'/documents'), self.document_list),
+            (('GET',), re.compile(r'/documents/(?P<doc_id>\d+)'), self.document_detail),
+            (('POST',), re.compile(r'/forgot-password'), self.forgot_password),
+            (('GET',), re.compile(r'/doctor/export'), self.doctor_export),
+            (('GET', 'HEAD'), re.compile(r'/profile-images/(?P<digest>[^/]+)/(?P<size>\d+)\.(?P<ext>\w+)'), self.profile_image),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http':
+            for methods, pattern, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match and scope['method'] in methods:
+                    return await self._native(handler, match.groupdict(), scope, receive, send)
+            if CPU_ROUTES.fullmatch(scope['path']):
+                return await self.cpu(scope, receive, send)
+        await self.io(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._database()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _native(self, handler, params, scope, receive, send):
+        from starlette.requests import Request
+
+        request = Request(scope, receive)
+        # The app context lets handlers use the services' config access; threads
+        # started with _in_thread() run inside a copy of it.
+        with self.flask_app.app_context():
+            try:
+                try:
+                    response = await handler(request, **params)
+                except HTTPError as e:
+                    response = self._json(e.body, e.status, e.headers)
+                response.headers['Access-Control-Allow-Origin'] = '*'  # As flask_cors does for the Flask routes
+                await response(scope, receive, send)
+            finally:
+                db.session.remove()
+
+    # --- Helpers ---
+
+    def _database(self):
+        """The async engine, created on first use (normally at lifespan startup)."""
+        if self.engine is None:
+            from sqlalchemy import event
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            config = self.flask_app.config
+            self.engine = create_async_engine(async_database_uri(config['SQLALCHEMY_DATABASE_URI']))
+            if config['SQLITE_WAL'] and self.engine.dialect.name == 'sqlite':
+                event.listen(self.engine.sync_engine, 'connect', _sqlite_pragmas(config))
+        return self.engine
+
+    async def _in_thread(self, fn, *args):
+        """Runs blocking work on a worker thread, at most ASGI_IO_THREADS at a time."""
+        import anyio
+
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.flask_app.config['ASGI_IO_THREADS'])
+        return await anyio.to_thread.run_sync(fn, *args, limiter=self._limiter)
+
+    def _json(self, body, status=200, headers=None):
+        from starlette.responses import Response
+        return Response(self.flask_app.json.dumps(body), status_code=status, headers=headers,
+                        media_type='application/json')
+
+    async def _identity(self, request):
+        """The user id of the request's access token, checked as @jwt_required() does."""
+        from flask_jwt_extended import decode_token
+        from jwt import ExpiredSignatureError
+
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not token:
+            raise HTTPError(401, {'msg': 'Missing Authorization Header'})
+        try:
+            claims = decode_token(token)
+        except ExpiredSignatureError:
+            raise HTTPError(401, {'msg': 'Token has expired'})
+        except Exception as e:
+            raise HTTPError(422, {'msg': str(e)})
+        if claims.get('type') != 'access':
+            raise HTTPError(422, {'msg': 'Only non-refresh tokens are allowed'})
+        user_id = int(claims[self.flask_app.config['JWT_IDENTITY_CLAIM']])
+        # As the app's token_in_blocklist_loader: accounts being deleted are refused.
+        user = await self._in_thread(user_cache.get_user, user_id)
+        if user is None or user.role == deletion_service.DELETING_ROLE:
+            raise HTTPError(401, {'msg': 'Token has been revoked'})
+        return user_id
+
+    async def _require_doctor(self, request):
+        from sqlalchemy import select
+
+        user_id = await self._identity(request)
+        async with self._database().connect() as conn:
+            role = (await conn.execute(select(User.role).where(User.id == user_id))).scalar()
+        if role != 'Doctor':
+            raise HTTPError(403, {'message': 'Doctors access required!'})
+        return user_id
+
+    async def _admit(self, endpoint_class, client_key):
+        """Admission control as @admission_controlled does it; the wait for a slot happens in a thread."""
+        try:
+            return await self._in_thread(admission_control.acquire, endpoint_class, client_key)
+        except admission_control.Overloaded as e:
+            raise HTTPError(e.status, {'message': e.message, 'retry_after': e.retry_after},
+                            {'Retry-After': str(e.retry_after)})
+
+    @staticmethod
+    def _upload_error(e):
+        headers = {'Upload-Offset': str(e.details['offset'])} if 'offset' in e.details else {}
+        return HTTPError(e.status, {'message': e.message, **e.details}, headers)
+
+    # --- Native handlers ---
+
+    async def upload_status(self, request, upload_id):
+        try:
+            state = upload_service.status(upload_service.get_upload(upload_id, await self._identity(request)))
+        except upload_service.UploadError as e:
+            raise self._upload_error(e)
+        return self._json(state, 200, {'Upload-Offset': str(state['offset']), 'Cache-Control': 'no-store'})
+
+    async def upload_chunk(self, request, upload_id):
+        from starlette.requests import ClientDisconnect
+
+        user_id = await self._identity(request)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            raise HTTPError(400, {'message': 'Upload-Offset header is required'})
+        checksum = None
+        if 'Upload-Checksum' in request.headers:
+            algorithm, _, checksum = request.headers['Upload-Checksum'].partition(' ')
+            if algorithm.lower() != 'sha256' or not checksum:
+                raise HTTPError(400, {'message': "Upload-Checksum must be 'sha256 <hex digest>'"})
+        length = request.headers.get('Content-Length')
+        length = int(length) if length and length.isdigit() else None
+
+        async def body():
+            try:
+                async for piece in request.stream():
+                    if piece:
+                        yield piece
+            except ClientDisconnect:
+                return  # append_chunk_async sees a short chunk and rolls it back
+
+        try:
+            meta = upload_service.get_upload(upload_id, user_id)
+            state = await upload_service.append_chunk_async(meta, offset, body(), length, checksum=checksum)
+        except upload_service.UploadError as e:
+            raise self._upload_error(e)
+        return self._json(state, 200, {'Upload-Offset': str(state['offset'])})
+
+    async def document_list(self, request):
+        from sqlalchemy import select
+
+        user_id = await self._identity(request)
+        async with self._database().connect() as conn:
+            rows = (await conn.execute(
+                select(MedicalDocument.id, MedicalDocument.filename, MedicalDocument.upload_timestamp, MedicalDocument.ocr_text)
+                .where(MedicalDocument.user_id == user_id)
+            )).all()
+        output = [
+            {'id': row.id, 'filename': row.filename, 'upload_timestamp': row.upload_timestamp.isoformat(), 'ocr_text': row.ocr_text}
+            for row in rows
+        ]
+        include_archived = request.query_params.get('include_archived', '')
+        if include_archived.isdigit() and int(include_archived):
+            for doc in await self._in_thread(retention_service.archived_rows, 'medical_document', user_id):
+                output.append({'id': doc['id'], 'filename': doc['filename'], 'upload_timestamp': doc['upload_timestamp'], 'ocr_text': doc['ocr_text'], 'archived': True})
+        return self._json(output)
+
+    async def document_detail(self, request, doc_id):
+        from sqlalchemy import select
+
+        user_id = await self._identity(request)
+        async with self._database().connect() as conn:
+            doc = (await conn.execute(
+                select(MedicalDocument.id, MedicalDocument.user_id, MedicalDocument.filename,
+                       MedicalDocument.upload_timestamp, MedicalDocument.ocr_text)
+                .where(MedicalDocument.id == int(doc_id))
+            )).first()
+        if doc is None:
+            # Documents moved out by the retention job are looked up in the owner's archive.
+            archived = await self._in_thread(retention_service.archived_row, 'medical_document', user_id, int(doc_id))
+            if archived is None:
+                raise HTTPError(404, {'message': NOT_FOUND})
+            _, _, doc = archived
+            return self._json({'id': doc['id'], 'filename': doc['filename'], 'upload_timestamp': doc['upload_timestamp'], 'ocr_text': doc['ocr_text'], 'archived': True})
+        if doc.user_id != user_id:
+            raise HTTPError(403, {'message': 'Permission denied'})
+        return self._json({'id': doc.id, 'filename': doc.filename, 'upload_timestamp': doc.upload_timestamp.isoformat(), 'ocr_text': doc.ocr_text})
+
+    async def forgot_password(self, request):
+        from sqlalchemy import insert
+
+        client = request.client.host if request.client else None
+        ticket = await self._admit('auth', f'ip:{client}')
+        try:
+            # JSON body, or form/query values, as Schema.parse accepts them.
+            body = await request.body()
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                data = dict(request.query_params)
+                if request.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                    data.update(parse_qsl(body.decode('latin-1')))
+            args, errors = schemas.FORGOT_PASSWORD.validate(data)
+            if errors:
+                raise HTTPError(400, {'message': '; '.join(f"{e['field']}: {e['message']}" for e in errors), 'errors': errors})
+            # Same single INSERT as mail_outbox.enqueue_password_reset; the sender does the rest.
+            async with self._database().begin() as conn:
+                await conn.execute(insert(EmailOutbox).values(template='password_reset', recipient=args['email']))
+        finally:
+            admission_control.release(ticket)
+        if self.flask_app.config['MAIL_OUTBOX_WORKER']:
+            mail_outbox.start_worker(self.flask_app)
+        return self._json({'message': 'If an account with that email exists, a password reset link has been sent.'})
+
+    async def doctor_export(self, request):
+        import anyio
+        from datetime import datetime
+        from starlette.responses import StreamingResponse
+
+        user_id = await self._require_doctor(request)
+        try:
+            filters = export_service.parse_filters(request.query_params)
+        except export_service.ExportError as e:
+            raise HTTPError(e.status, {'message': e.message})
+        ticket = await self._admit('export', f'user:{user_id}')
+        mimetype, extension = export_service.FORMATS[filters['format']]
+        chunks = export_service.stream_export(filters, self.flask_app.config['EXPORT_CHUNK_SIZE'])
+
+        async def body():
+            # Each chunk is read and encoded in a worker thread; between chunks,
+            # while the client receives the data, no thread is held.
+            try:
+                while True:
+                    piece = await self._in_thread(next, chunks, None)
+                    if piece is None:
+                        break
+                    yield piece
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await self._in_thread(chunks.close)
+                    admission_control.release(ticket)
+
+        filename = f"predictions_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return StreamingResponse(body(), media_type=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no'
+        })
+
+    async def profile_image(self, request, digest, size, ext):
+        from starlette.responses import FileResponse, Response
+
+        # With S3 storage a cache miss downloads the rendition, so off the event loop.
+        path = await self._in_thread(image_service.rendition_path, digest, int(size), ext)
+        if path is None:
+            raise HTTPError(404, {'message': NOT_FOUND})
+        headers = {'ETag': f'"{digest}-{size}.{ext}"', 'Cache-Control': 'public, max-age=31536000, immutable'}
+        if headers['ETag'] in request.headers.get('If-None-Match', ''):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type=image_service.FORMATS[ext][1], headers=headers)
+
+
+def create_asgi_app(config_class=Config, model_loading=None):
+    """Builds the Flask app (see create_app) and wraps it for an ASGI server."""
+    return AsgiApp(create_app(config_class, model_loading))
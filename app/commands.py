@@ -0,0 +1,121 @@
+# app/commands.py
+
+import click
+
+
+def register_commands(app):
+    """Registers the project's `flask <command>` CLI commands on the app."""
+
+    @app.cli.command('outbox-send')
+    def outbox_send():
+        """Delivers every due message in the email outbox, then exits."""
+        from app.services import mail_outbox
+        totals = mail_outbox.drain()
+        click.echo(f"Outbox: {totals['sent']} sent, {totals['dropped']} dropped, {totals['retried']} scheduled for retry.")
+
+    @app.cli.command('outbox-worker')
+    def outbox_worker():
+        """Runs the email outbox sender in the foreground until interrupted."""
+        from app.services import mail_outbox
+        click.echo("Email outbox worker running. Press CTRL+C to stop.")
+        try:
+            mail_outbox.run_worker(app)
+        except KeyboardInterrupt:
+            click.echo("Email outbox worker stopped.")
+
+    @app.cli.command('deletion-run')
+    def deletion_run():
+        """Runs every queued patient deletion job, then exits."""
+        from app.services import deletion_service
+        jobs = deletion_service.process_pending()
+        click.echo(f"Deletion: {jobs} job(s) processed.")
+
+    @app.cli.command('deletion-worker')
+    def deletion_worker():
+        """Runs queued patient deletion jobs in the foreground until interrupted."""
+        from app.services import deletion_service
+        click.echo("Deletion worker running. Press CTRL+C to stop.")
+        try:
+            deletion_service.run_worker(app)
+        except KeyboardInterrupt:
+            click.echo("Deletion worker stopped.")
+
+    @app.cli.command('rescore-predictions')
+    @click.option('--chunk-size', default=500, show_default=True, help='Predictions per chunk (one scoring call each).')
+    @click.option('--max-rate', default=None, type=float, help='Maximum rows per second, to leave headroom for live traffic.')
+    @click.option('--pause', default=0.05, show_default=True, help='Minimum sleep between chunks, in seconds.')
+    @click.option('--no-contributions', is_flag=True, help='Skip SHAP (much faster); stored contributions become NaN.')
+    def rescore_predictions(chunk_size, max_rate, pause, no_contributions):
+        """Re-scores historical predictions with the current model (resumable)."""
+        from app.services import rescoring_service
+        rescoring_service.rescore_predictions(chunk_size=chunk_size, max_rows_per_second=max_rate, pause=pause,
+                                              with_contributions=not no_contributions)
+
+    @app.cli.command('cohort-rebuild')
+    @click.option('--chunk-size', default=5000, show_default=True, help='Predictions aggregated per chunk.')
+    def cohort_rebuild(chunk_size):
+        """Recomputes the doctor dashboard's cohort rollups from every hot and archived prediction."""
+        from app.services import cohort_service
+        cohort_service.rebuild(chunk_size=chunk_size)
+
+    @app.cli.command('storage-sync')
+    def storage_sync():
+        """Copies documents and profile pictures from UPLOAD_FOLDER into the configured storage backend."""
+        import os
+        from app.services import storage
+        files = storage.get_storage()
+        if files.name == 'local':
+            click.echo("STORAGE_BACKEND is 'local': files are already in UPLOAD_FOLDER.")
+            return
+        root = os.path.realpath(app.config['UPLOAD_FOLDER'])
+        copied, skipped = 0, 0
+        for directory, subdirectories, names in os.walk(root):
+            # Unfinished resumable uploads and a cache kept inside UPLOAD_FOLDER stay local.
+            subdirectories[:] = [d for d in subdirectories if d != '.partial'
+                                 and os.path.join(directory, d) != os.path.realpath(app.config['STORAGE_CACHE_DIR'])]
+            for name in names:
+                path = os.path.join(directory, name)
+                key = files.key(path)
+                try:
+                    if files.size(key) == os.path.getsize(path):
+                        skipped += 1
+                        continue
+                except FileNotFoundError:
+                    pass
+                with open(path, 'rb') as f:
+                    files.save(key, f)
+                copied += 1
+        click.echo(f"Storage sync: {copied} file(s) copied, {skipped} already present.")
+
+    @app.cli.command('model-variants')
+    @click.option('--budget', default=None, type=float, help='Latency budget to show the selection for (default: MODEL_LATENCY_BUDGET_MS).')
+    @click.option('--profile', is_flag=True, help='Re-measure every variant on this host and update the manifest.')
+    def model_variants_report(budget, profile):
+        """Prints the compact model variants' accuracy/latency trade-offs and Pareto frontier."""
+        import json
+        from app.services import model_variants, prediction_service
+        manifest = model_variants.load_manifest()
+        if manifest is None:
+            click.echo("No model variants found. Run train_model.py to build them.")
+            return
+        if profile:
+            with open(prediction_service.COLUMNS_PATH, 'r') as f:
+                manifest = model_variants.reprofile(manifest, json.load(f))
+        click.echo(model_variants.format_report(manifest, budget if budget is not None else app.config['MODEL_LATENCY_BUDGET_MS']))
+
+    @app.cli.command('retention-run')
+    @click.option('--batch-size', default=None, type=int, help='Rows per transaction (default: RETENTION_BATCH_SIZE).')
+    @click.option('--pause', default=0.05, show_default=True, help='Sleep between batches, in seconds.')
+    @click.option('--vacuum', is_flag=True, help='Also VACUUM the database (rewrites the file; blocks writers while it runs).')
+    def retention_run(batch_size, pause, vacuum):
+        """Archives old predictions/documents, recompresses old images and analyzes the database."""
+        from app.services import retention_service
+        report = retention_service.run_retention(batch_size=batch_size, pause=pause, vacuum=vacuum)
+        click.echo(f"Retention finished in {report['seconds']:.1f}s.")
+        for table in report['hot_before']:
+            click.echo(f"  {table:18} {report['hot_before'][table]:>10} -> {report['hot_after'][table]:>10} rows")
+        click.echo(f"  archived: {report['archived']['prediction']} predictions, {report['archived']['medical_document']} documents")
+        click.echo(f"  images recompressed: {report['images_compacted']}, {report['image_bytes_saved']} bytes saved")
+        if report['db_bytes_before'] is not None:
+            click.echo(f"  database file: {report['db_bytes_before']} -> {report['db_bytes_after']} bytes "
+                       f"({report['db_bytes_before'] - report['db_bytes_after']} reclaimed)")
@@ -1,15 +1,53 @@
 # app/decorators.py
 
 from functools import wraps
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask import request, Response
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app.services import user_cache, admission_control
 
 def doctor_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         verify_jwt_in_request()
-        claims = get_jwt()
-        if claims.get('role') != 'Doctor':
+        # The role is read from the user cache rather than trusted from the token
+        # claims, so a demoted or deleted doctor loses access once their cache entry
+        # is invalidated, and a warm cache still avoids any database query.
+        if user_cache.get_role(get_jwt_identity()) != 'Doctor':
             return {'message': 'Doctors access required!'}, 403 # 403 Forbidden status
         else:
             return fn(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def admission_controlled(endpoint_class):
+    """
+    Runs the resource method only once admission control (ADMISSION_LIMITS) has
+    admitted it; otherwise answers straight away with 429/503 and Retry-After.
+    Place it below @jwt_required() so requests are limited per user; without a
+    token (login, registration) they are limited per client address.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                identity = get_jwt_identity()
+            except RuntimeError:  # No JWT verified for this request
+                identity = None
+            client_key = f'user:{identity}' if identity else f'ip:{request.remote_addr}'
+            try:
+                ticket = admission_control.acquire(endpoint_class, client_key)
+            except admission_control.Overloaded as e:
+                # Also in the body: browsers hide Retry-After from cross-origin scripts.
+                return {'message': e.message, 'retry_after': e.retry_after}, e.status, {'Retry-After': str(e.retry_after)}
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                admission_control.release(ticket)
+                raise
+            if isinstance(result, Response) and result.is_streamed:
+                # A streamed body is generated after we return: keep the slot until it is sent.
+                result.call_on_close(lambda: admission_control.release(ticket))
+            else:
+                admission_control.release(ticket)
+            return result
+        return wrapper
+    return decorator
@@ -10,7 +10,9 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(10), index=True, default='Patient')
     
-    # The 'profile_image_file' column has been removed.
+    # SHA-256 of the current profile picture; its renditions live under
+    # profile_pics/ in storage (see image_service).
+    profile_image = db.Column(db.String(64), index=True)
     
     predictions = db.relationship('Prediction', backref='author', lazy='dynamic')
     documents = db.relationship('MedicalDocument', backref='owner', lazy='dynamic')
@@ -41,9 +43,16 @@ class Prediction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     prediction_result = db.Column(db.Integer, nullable=False)
     risk_category = db.Column(db.String(64))
+    probability = db.Column(db.Float, nullable=True)
+    model_version = db.Column(db.String(32), nullable=True)
+    # Packed float32 inputs + SHAP contributions (see prediction_service.VECTOR_DTYPE).
+    feature_vector = db.Column(db.LargeBinary, nullable=True)
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
+    # Per-user history and "latest prediction" lookups walk this index instead of the table.
+    __table_args__ = (db.Index('ix_prediction_user_id_timestamp', 'user_id', 'timestamp'),)
+
     def __repr__(self):
         return f'<Prediction {self.id} - Result: {self.prediction_result}>'
 
@@ -54,6 +63,114 @@ class MedicalDocument(db.Model):
     upload_timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     ocr_text = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # Set once the retention job has recompressed the uploaded file.
+    compacted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    __table_args__ = (db.Index('ix_medical_document_user_id_upload_timestamp', 'user_id', 'upload_timestamp'),)
 
     def __repr__(self):
         return f'<MedicalDocument {self.filename}>'
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # 'password_reset' messages are rendered at send time, so the request that
+    # queues them does the same work whether or not the account exists.
+    template = db.Column(db.String(32), nullable=False, default='plain')
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(256), nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), index=True, nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.template} -> {self.recipient} ({self.status})>'
+
+class RescoreJob(db.Model):
+    """Checkpoint for re-scoring historical predictions with a new model version."""
+    id = db.Column(db.Integer, primary_key=True)
+    model_version = db.Column(db.String(32), index=True, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='running')
+    # Keyset position: every Prediction with id <= last_id has been processed.
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_rescored = db.Column(db.Integer, nullable=False, default=0)
+    rows_changed = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<RescoreJob {self.id} {self.model_version} at id {self.last_id} ({self.status})>'
+
+class ArchiveSegment(db.Model):
+    """
+    One user's batch of rows moved out of a hot table ('prediction' or
+    'medical_document') by the retention job. The rows are stored column by
+    column in a compressed .npz payload (see retention_service).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    first_id = db.Column(db.Integer, nullable=False)
+    last_id = db.Column(db.Integer, nullable=False)
+    start_timestamp = db.Column(db.DateTime)
+    end_timestamp = db.Column(db.DateTime)
+    row_count = db.Column(db.Integer, nullable=False)
+    # Prediction segments: rows per risk category, so totals need no decoding.
+    risk_counts = db.Column(db.JSON)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_archive_segment_kind_user_id_end_timestamp', 'kind', 'user_id', 'end_timestamp'),)
+
+    def __repr__(self):
+        return f'<ArchiveSegment {self.id} {self.kind} user {self.user_id}: {self.row_count} rows>'
+
+class DeletionJob(db.Model):
+    """
+    Background removal of a patient account and everything it owns (see
+    deletion_service). The account is hidden as soon as the job is queued; the
+    user row itself is deleted last, so user_id has no foreign key.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, index=True, nullable=False)
+    username = db.Column(db.String(64), nullable=False)
+    requested_by = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(16), index=True, nullable=False, default='pending')
+    # Current step: predictions, documents, archives, uploads, account.
+    stage = db.Column(db.String(16), nullable=True)
+    rows_deleted = db.Column(db.Integer, nullable=False, default=0)
+    files_deleted = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<DeletionJob {self.id} user {self.user_id} ({self.status}, {self.stage})>'
+
+class CohortDailyRisk(db.Model):
+    """Rollup: predictions per UTC day and risk category (see cohort_service)."""
+    day = db.Column(db.Date, primary_key=True)
+    risk_category = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # Older predictions have no stored probability: the mean uses probability_count.
+    probability_count = db.Column(db.Integer, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<CohortDailyRisk {self.day} {self.risk_category}: {self.count}>'
+
+class CohortFeatureImpact(db.Model):
+    """Rollup: running sums of each feature's SHAP contribution over all predictions that have one."""
+    feature = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    abs_shap_sum = db.Column(db.Float, nullable=False, default=0.0)
+    shap_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<CohortFeatureImpact {self.feature}: {self.count}>'
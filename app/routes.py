@@ -1,19 +1,18 @@
 # app/routes.py
 
-import os
-import secrets
-from PIL import Image
-from flask import request, jsonify, current_app, send_file
-from flask_restful import Resource, reqparse
+import hashlib
+from datetime import datetime, timedelta
+from flask import request, jsonify, current_app, send_file, abort, Response, stream_with_context
+from sqlalchemy import func
+from flask_restful import Resource
 from werkzeug.utils import secure_filename
 
-from app import db, mail
-from app.decorators import doctor_required
-from .models import User, Prediction, MedicalDocument
-from .services import prediction_service, ocr_service, pdf_service
+from app import db, schemas
+from app.decorators import doctor_required, admission_controlled
+from .models import User, Prediction, MedicalDocument, DeletionJob
+from .services import prediction_service, prediction_log, retention_service, upload_service, ocr_service, pdf_service, storage, user_cache, mail_outbox, admission_control, deletion_service, image_service
 
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from flask_mail import Message
 
 
 # Helper Function
@@ -21,24 +20,52 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
+def process_document(user_id, filename, key):
+    """Runs OCR on a stored document and records it (shared by direct and resumable uploads)."""
+    with storage.get_storage().open(key) as f:
+        extracted_text = ocr_service.extract_text_from_image(f)
+    new_document = MedicalDocument(filename=filename, filepath=key, user_id=user_id, ocr_text=extracted_text)
+    db.session.add(new_document)
+    db.session.commit()
+    return {'message': 'Document uploaded and processed successfully', 'filename': filename, 'extracted_text': extracted_text.strip()}, 201
+
+def save_profile_picture(user_id, source):
+    """Stores an uploaded picture (a file object or a path) as the user's profile picture."""
+    try:
+        pictures = image_service.save_profile_picture(user_id, source)
+    except image_service.ImageError as e:
+        return {'message': e.message}, e.status
+    return {'message': 'Profile picture updated!', 'profile_image': pictures}, 200
+
+def upload_error(e):
+    """Response for an UploadError; includes the current offset so the client can resume."""
+    headers = {'Upload-Offset': str(e.details['offset'])} if 'offset' in e.details else {}
+    return {'message': e.message, **e.details}, e.status, headers
+
 # --- API Resource Classes ---
 
 class Home(Resource):
     def get(self):
         return {'message': 'Welcome to the Heart Disease Detection API!'}, 200
 
+class Readiness(Resource):
+    """Readiness probe: 200 once the ML models are loaded, 503 while they are still warming up."""
+    def get(self):
+        if prediction_service.models_loaded():
+            return {'status': 'ready', 'model_variant': prediction_service.variant_name}, 200
+        if prediction_service.warm_up_error:
+            return {'status': 'error', 'message': prediction_service.warm_up_error}, 503
+        return {'status': 'loading'}, 503
+
 
 # ... (Helper function and other Resource classes like Home, HealthCheck, ApiStatus are unchanged) ...
 
 # --- THIS CLASS IS NOW SIMPLIFIED ---
 class UserRegistration(Resource):
     """Endpoint for new user registration. Users will default to the 'Patient' role."""
+    @admission_controlled('auth')
     def post(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument('username', type=str, required=True, help='Username cannot be blank')
-        parser.add_argument('email', type=str, required=True, help='Email cannot be blank')
-        parser.add_argument('password', type=str, required=True, help='Password cannot be blank')
-        args = parser.parse_args()
+        args = schemas.REGISTRATION.parse()
         if User.query.filter_by(username=args['username']).first():
             return {'message': 'Username already exists'}, 400
         if User.query.filter_by(email=args['email']).first():
@@ -48,73 +75,82 @@ class UserRegistration(Resource):
         new_user.set_password(args['password'])
         db.session.add(new_user)
         db.session.commit()
+        user_cache.invalidate(new_user.id)  # The id may be cached as missing (e.g. reused after a deletion)
         return {'message': 'User registered successfully'}, 201
 
 class UserLogin(Resource):
+    @admission_controlled('auth')
     def post(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument('username', type=str, required=True, help='Username cannot be blank')
-        parser.add_argument('password', type=str, required=True, help='Password cannot be blank')
-        args = parser.parse_args()
+        args = schemas.LOGIN.parse()
         user = User.query.filter_by(username=args['username']).first()
-        if user and user.check_password(args['password']):
+        # Accounts queued for deletion can no longer log in.
+        if user and user.role != deletion_service.DELETING_ROLE and user.check_password(args['password']):
             access_token = create_access_token(identity=str(user.id))
             return {'access_token': access_token}, 200
         return {'message': 'Invalid credentials'}, 401
 
 class PredictionAPI(Resource):
     @jwt_required()
+    @admission_controlled('predict')
     def post(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument('age', type=int, required=True)
-        parser.add_argument('sex', type=int, required=True)
-        parser.add_argument('cp', type=int, required=True)
-        parser.add_argument('trestbps', type=int, required=True)
-        parser.add_argument('chol', type=int, required=True)
-        parser.add_argument('fbs', type=int, required=True)
-        parser.add_argument('restecg', type=int, required=True)
-        parser.add_argument('thalach', type=int, required=True)
-        parser.add_argument('exang', type=int, required=True)
-        parser.add_argument('oldpeak', type=float, required=True)
-        parser.add_argument('slope', type=int, required=True)
-        parser.add_argument('ca', type=int, required=True)
-        parser.add_argument('thal', type=int, required=True)
-        args = parser.parse_args()
-        result = prediction_service.predict(args)
+        args = schemas.PREDICTION.parse()
+        result, record = prediction_service.predict_with_record(args)
         current_user_id = get_jwt_identity()
-        prediction_record = Prediction(user_id=int(current_user_id), prediction_result=result['prediction'], risk_category=result['risk_category'])
-        db.session.add(prediction_record)
-        db.session.commit()
+        # Committed now, or group-committed / written behind depending on PREDICTION_LOG_MODE.
+        try:
+            prediction_log.save(user_id=int(current_user_id), prediction_result=result['prediction'], risk_category=result['risk_category'], **record)
+        except prediction_log.PredictionLogError as e:
+            return {'message': e.message}, e.status
+        return result, 200
+
+class WhatIfPrediction(Resource):
+    """
+    Returns a probability curve (one varied feature) or surface (two) for a base
+    feature vector. Nothing is persisted and SHAP is not run.
+    Body: {"base": {<all 13 features>}, "vary": {"chol": {"min": 150, "max": 300, "steps": 50}}}
+    """
+    @jwt_required()
+    @admission_controlled('predict')
+    def post(self):
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data.get('base'), dict) or not isinstance(data.get('vary'), dict):
+            return {'message': "Request body must contain 'base' and 'vary' objects."}, 400
+        base, errors = schemas.PREDICTION.validate(data['base'])
+        if errors:
+            return {'message': '; '.join(f"base.{e['field']}: {e['message']}" for e in errors), 'errors': errors}, 400
+        try:
+            result = prediction_service.what_if(base, data['vary'])
+        except ValueError as e:
+            return {'message': str(e)}, 400
         return result, 200
 
 class ForgotPassword(Resource):
+    @admission_controlled('auth')
     def post(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument('email', type=str, required=True)
-        args = parser.parse_args()
-        user = User.query.filter_by(email=args['email']).first()
-        if user:
-            token = user.get_reset_token()
-            msg = Message('Password Reset Request', sender='noreply@demo.com', recipients=[user.email])
-            msg.body = f'To reset your password, please use the following token:\n{token}\nIf you did not make this request then simply ignore this email.'
-            mail.send(msg)
+        args = schemas.FORGOT_PASSWORD.parse()
+        # The account lookup happens in the outbox sender, so this request takes
+        # the same time whether or not the email belongs to an account.
+        mail_outbox.enqueue_password_reset(args['email'])
+        db.session.commit()
+        if current_app.config['MAIL_OUTBOX_WORKER']:
+            mail_outbox.start_worker(current_app._get_current_object())
         return {'message': 'If an account with that email exists, a password reset link has been sent.'}, 200
 
 class ResetPassword(Resource):
+    @admission_controlled('auth')
     def post(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument('token', type=str, required=True)
-        parser.add_argument('password', type=str, required=True)
-        args = parser.parse_args()
+        args = schemas.RESET_PASSWORD.parse()
         user = User.verify_reset_token(args['token'])
         if user is None:
             return {'message': 'That is an invalid or expired token'}, 400
         user.set_password(args['password'])
         db.session.commit()
+        user_cache.invalidate(user.id)
         return {'message': 'Your password has been successfully updated!'}, 200
 
 class DocumentUpload(Resource):
     @jwt_required()
+    @admission_controlled('ocr')
     def post(self):
         if 'document' not in request.files:
             return {'message': 'No document part in the request'}, 400
@@ -123,17 +159,91 @@ class DocumentUpload(Resource):
             return {'message': 'No selected file'}, 400
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            extracted_text = ocr_service.extract_text_from_image(filepath)
-            current_user_id = get_jwt_identity()
-            new_document = MedicalDocument(filename=filename, filepath=filepath, user_id=int(current_user_id), ocr_text=extracted_text)
-            db.session.add(new_document)
-            db.session.commit()
-            return {'message': 'Document uploaded and processed successfully', 'filename': filename, 'extracted_text': extracted_text.strip()}, 201
+            storage.get_storage().save(filename, file.stream)
+            return process_document(int(get_jwt_identity()), filename, filename)
         else:
             return {'message': 'File type not allowed'}, 400
 
+class UploadInit(Resource):
+    """
+    Starts a resumable upload. Body: {"filename", "size", "purpose": "document" |
+    "profile_picture", "sha256" (optional, of the whole file)}. The client then
+    PUTs chunks to /uploads/<id> and finally POSTs /uploads/<id>/complete.
+    """
+    @jwt_required()
+    def post(self):
+        args = schemas.UPLOAD_INIT.parse()
+        if not allowed_file(args['filename']):
+            return {'message': 'File type not allowed'}, 400
+        try:
+            state = upload_service.init_upload(int(get_jwt_identity()), args['filename'], args['size'],
+                                               purpose=args.get('purpose') or 'document', sha256=args.get('sha256'))
+        except upload_service.UploadError as e:
+            return upload_error(e)
+        return state, 201, {'Location': f"/uploads/{state['upload_id']}"}
+
+class UploadChunk(Resource):
+    """
+    GET/HEAD: bytes received so far (Upload-Offset), for resuming after a dropped connection.
+    PUT: appends the raw request body at the Upload-Offset header; an optional
+    'Upload-Checksum: sha256 <hex>' header rejects corrupted chunks.
+    DELETE: abandons the upload.
+    """
+    @jwt_required()
+    def get(self, upload_id):
+        try:
+            state = upload_service.status(upload_service.get_upload(upload_id, int(get_jwt_identity())))
+        except upload_service.UploadError as e:
+            return upload_error(e)
+        return state, 200, {'Upload-Offset': str(state['offset']), 'Cache-Control': 'no-store'}
+
+    @jwt_required()
+    def put(self, upload_id):
+        offset = request.headers.get('Upload-Offset', type=int)
+        if offset is None:
+            return {'message': 'Upload-Offset header is required'}, 400
+        checksum = None
+        if 'Upload-Checksum' in request.headers:
+            algorithm, _, checksum = request.headers['Upload-Checksum'].partition(' ')
+            if algorithm.lower() != 'sha256' or not checksum:
+                return {'message': "Upload-Checksum must be 'sha256 <hex digest>'"}, 400
+        try:
+            meta = upload_service.get_upload(upload_id, int(get_jwt_identity()))
+            # request.stream is read in small pieces; Werkzeug never buffers the body.
+            state = upload_service.append_chunk(meta, offset, request.stream, request.content_length, checksum=checksum)
+        except upload_service.UploadError as e:
+            return upload_error(e)
+        return state, 200, {'Upload-Offset': str(state['offset'])}
+
+    @jwt_required()
+    def delete(self, upload_id):
+        try:
+            upload_service.finish(upload_service.get_upload(upload_id, int(get_jwt_identity())))
+        except upload_service.UploadError as e:
+            return upload_error(e)
+        return {'message': 'Upload cancelled'}, 200
+
+class UploadComplete(Resource):
+    """Verifies a finished upload and processes it exactly like a direct upload."""
+    @jwt_required()
+    @admission_controlled('ocr')
+    def post(self, upload_id):
+        user_id = int(get_jwt_identity())
+        try:
+            meta = upload_service.get_upload(upload_id, user_id)
+            part_path = upload_service.complete_upload(meta)
+        except upload_service.UploadError as e:
+            return upload_error(e)
+        try:
+            if meta['purpose'] == 'profile_picture':
+                return save_profile_picture(user_id, part_path)
+            filename = secure_filename(meta['filename'])
+            # Local storage: a rename, no copy. S3: a multipart upload for large files.
+            storage.get_storage().put_file(filename, part_path)
+            return process_document(user_id, filename, filename)
+        finally:
+            upload_service.finish(meta)
+
 class DocumentList(Resource):
     @jwt_required()
     def get(self):
@@ -144,13 +254,27 @@ class DocumentList(Resource):
         for doc in documents:
             doc_data = {'id': doc.id, 'filename': doc.filename, 'upload_timestamp': doc.upload_timestamp.isoformat(), 'ocr_text': doc.ocr_text}
             output.append(doc_data)
+        # Documents moved out by the retention job are only decoded on request.
+        if request.args.get('include_archived', type=int):
+            for doc in retention_service.archived_rows('medical_document', user_id):
+                output.append({'id': doc['id'], 'filename': doc['filename'], 'upload_timestamp': doc['upload_timestamp'], 'ocr_text': doc['ocr_text'], 'archived': True})
         return jsonify(output)
 
+def archived_document_or_404(user_id, doc_id):
+    """The user's document moved out by the retention job, as (segment, index, row); 404 if there is none."""
+    archived = retention_service.archived_row('medical_document', user_id, doc_id)
+    if archived is None:
+        abort(404)
+    return archived
+
 class DocumentResource(Resource):
     @jwt_required()
     def get(self, doc_id):
         current_user_id = get_jwt_identity()
-        doc = MedicalDocument.query.get_or_404(doc_id)
+        doc = db.session.get(MedicalDocument, doc_id)
+        if doc is None:
+            _, _, doc = archived_document_or_404(int(current_user_id), doc_id)
+            return jsonify({'id': doc['id'], 'filename': doc['filename'], 'upload_timestamp': doc['upload_timestamp'], 'ocr_text': doc['ocr_text'], 'archived': True})
         if str(doc.user_id) != current_user_id:
             return {'message': 'Permission denied'}, 403
         return jsonify({'id': doc.id, 'filename': doc.filename, 'upload_timestamp': doc.upload_timestamp.isoformat(), 'ocr_text': doc.ocr_text})
@@ -158,14 +282,21 @@ class DocumentResource(Resource):
     @jwt_required()
     def delete(self, doc_id):
         current_user_id = get_jwt_identity()
-        doc = MedicalDocument.query.get_or_404(doc_id)
-        if str(doc.user_id) != current_user_id:
+        doc = db.session.get(MedicalDocument, doc_id)
+        if doc is None:
+            segment, index, archived = archived_document_or_404(int(current_user_id), doc_id)
+            filepath = archived['filepath']
+            retention_service.delete_archived_row(segment, index)
+        elif str(doc.user_id) != current_user_id:
             return {'message': 'Permission denied'}, 403
+        else:
+            filepath = doc.filepath
+            db.session.delete(doc)
         try:
-            os.remove(doc.filepath)
-        except OSError as e:
-            print(f"Error deleting file {doc.filepath}: {e}")
-        db.session.delete(doc)
+            files = storage.get_storage()
+            files.delete(files.key(filepath))
+        except (OSError, ValueError) as e:
+            print(f"Error deleting file {filepath}: {e}")
         db.session.commit()
         return {'message': 'Document deleted successfully'}, 200
 
@@ -177,19 +308,56 @@ class PredictionList(Resource):
         predictions = Prediction.query.filter_by(user_id=user_id).order_by(Prediction.timestamp.desc()).all()
         output = []
         for pred in predictions:
-            pred_data = {'id': pred.id, 'prediction_result': pred.prediction_result, 'risk_category': pred.risk_category, 'timestamp': pred.timestamp.isoformat()}
+            pred_data = {'id': pred.id, 'prediction_result': pred.prediction_result, 'risk_category': pred.risk_category, 'probability': pred.probability, 'timestamp': pred.timestamp.isoformat()}
             output.append(pred_data)
+        # Older predictions moved out by the retention job are only decoded on request.
+        if request.args.get('include_archived', type=int):
+            for pred in retention_service.archived_rows('prediction', user_id):
+                output.append({'id': pred['id'], 'prediction_result': pred['prediction_result'], 'risk_category': pred['risk_category'], 'probability': pred['probability'], 'timestamp': pred['timestamp'], 'archived': True})
         return jsonify(output)
 
+class PredictionTrend(Resource):
+    """
+    Time-bucketed risk series for the current user's charts.
+    Query args: bucket=day|week|month (default day), max_points (default 200), since (ISO date).
+    Only the timestamp/probability columns are read; aggregation happens in NumPy.
+    """
+    @jwt_required()
+    def get(self):
+        user_id = int(get_jwt_identity())
+        bucket = request.args.get('bucket', 'day')
+        max_points = min(max(request.args.get('max_points', 200, type=int), 1), 1000)
+
+        query = db.session.query(Prediction.timestamp, Prediction.probability).filter(
+            Prediction.user_id == user_id,
+            Prediction.probability.isnot(None)
+        )
+        since = request.args.get('since')
+        if since:
+            try:
+                query = query.filter(Prediction.timestamp >= datetime.fromisoformat(since))
+            except ValueError:
+                return {'message': "'since' must be an ISO date, e.g. 2025-01-31"}, 400
+        rows = query.order_by(Prediction.timestamp).all()
+
+        try:
+            points = prediction_service.risk_trend(
+                [row.timestamp for row in rows], [row.probability for row in rows],
+                bucket=bucket, max_points=max_points
+            )
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return jsonify({'bucket': bucket, 'total_predictions': len(rows), 'points': points})
+
 class PredictionReport(Resource):
     @jwt_required()
+    @admission_controlled('pdf')
     def get(self, pred_id):
         current_user_id = get_jwt_identity()
         pred = Prediction.query.get_or_404(pred_id)
         if str(pred.user_id) != current_user_id:
             return {'message': 'Permission denied'}, 403
-        user_id = int(current_user_id)
-        user = User.query.get(user_id)
+        user = user_cache.get_user(current_user_id)
         if not user:
              return {'message': 'User not found'}, 404
         pdf_buffer = pdf_service.create_prediction_report(pred, user)
@@ -200,49 +368,136 @@ class UserProfile(Resource):
     def get(self):
         current_user_id = get_jwt_identity()
         user_id = int(current_user_id)
-        user = User.query.get_or_404(user_id)
+        user = user_cache.get_user(user_id)
+        if user is None:
+            abort(404)
 
         # Get all predictions for the user
-        user_predictions = user.predictions.all()
+        user_predictions = Prediction.query.filter_by(user_id=user_id).all()
 
         # Calculate the streak
         streak = prediction_service.calculate_streak(user_predictions)
 
-        # The profile_image_url is no longer returned
         return jsonify({
             'username': user.username, 
             'email': user.email,
-            'prediction_count': len(user_predictions),
+            'profile_image': image_service.urls(user.profile_image),
+            'prediction_count': len(user_predictions) + retention_service.archived_count('prediction', user_id),
             'prediction_streak': streak # Return the new streak data
         })
 
+class Dashboard(Resource):
+    """
+    Everything the profile/dashboard pages need in one response, built from a
+    handful of aggregate queries. Supports conditional GET: the ETag is derived
+    from the user's prediction/document counts and latest timestamps and the
+    risk categories per model version, so an unchanged dashboard costs three
+    index lookups and a 304.
+    """
+    DEFAULT_LIMIT = 5
+    MAX_LIMIT = 50
+
+    @jwt_required()
+    def get(self):
+        user_id = int(get_jwt_identity())
+        user = user_cache.get_user(user_id)
+        if user is None:
+            abort(404)
+        limit = min(max(request.args.get('limit', self.DEFAULT_LIMIT, type=int), 0), self.MAX_LIMIT)
+
+        prediction_count, last_prediction = db.session.query(
+            func.count(Prediction.id), func.max(Prediction.timestamp)
+        ).filter(Prediction.user_id == user_id).one()
+        # Rows moved to the archive by the retention job still count towards the total.
+        prediction_count += retention_service.archived_count('prediction', user_id)
+        document_count, last_document = db.session.query(
+            func.count(MedicalDocument.id), func.max(MedicalDocument.upload_timestamp)
+        ).filter(MedicalDocument.user_id == user_id).one()
+        # Re-scoring rewrites categories and model versions but no count or timestamp
+        # above, so the category mix per model version is part of the ETag too.
+        score_mix = db.session.query(
+            Prediction.risk_category, Prediction.model_version, func.count(Prediction.id)
+        ).filter(Prediction.user_id == user_id).group_by(
+            Prediction.risk_category, Prediction.model_version
+        ).order_by(Prediction.risk_category, Prediction.model_version).all()
+
+        # The streak depends on the current date, so the ETag changes daily as well.
+        etag_source = '|'.join(str(part) for part in (
+            user.username, user.email, user.profile_image, prediction_count, last_prediction,
+            document_count, last_document, [tuple(row) for row in score_mix], limit, datetime.utcnow().date()
+        ))
+        etag = hashlib.sha1(etag_source.encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'})
+
+        risk_counts = {'Low': 0, 'Medium': 0, 'High': 0}
+        for category, _, count in score_mix:
+            if category is not None:
+                risk_counts[category] += count
+        # Like prediction_count, include the rows moved to the archive.
+        for category, count in retention_service.archived_risk_counts(user_id).items():
+            risk_counts[category] = risk_counts.get(category, 0) + count
+
+        # Only the last year of timestamps can contribute to the streak.
+        streak_rows = db.session.query(Prediction.timestamp).filter(
+            Prediction.user_id == user_id,
+            Prediction.timestamp > datetime.utcnow() - timedelta(weeks=52)
+        ).all()
+
+        latest = Prediction.query.filter_by(user_id=user_id).order_by(Prediction.timestamp.desc()).limit(limit).all()
+
+        response = jsonify({
+            'username': user.username,
+            'email': user.email,
+            'profile_image': image_service.urls(user.profile_image),
+            'prediction_count': prediction_count,
+            'prediction_streak': prediction_service.calculate_streak(streak_rows),
+            'risk_counts': risk_counts,
+            'latest_predictions': [
+                {'id': pred.id, 'prediction_result': pred.prediction_result, 'risk_category': pred.risk_category, 'timestamp': pred.timestamp.isoformat()}
+                for pred in latest
+            ],
+            'last_prediction_at': last_prediction.isoformat() if last_prediction else None,
+            'document_count': document_count,
+            'last_document_at': last_document.isoformat() if last_document else None
+        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
 class ProfilePictureUpload(Resource):
     @jwt_required()
     def post(self):
         current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(int(current_user_id))
+        if user_cache.get_user(current_user_id) is None:
+            abort(404)
         if 'picture' not in request.files:
             return {'message': 'No picture part in the request'}, 400
         file = request.files['picture']
         if file.filename == '':
             return {'message': 'No selected file'}, 400
         if file and allowed_file(file.filename):
-            random_hex = secrets.token_hex(8)
-            _, f_ext = os.path.splitext(file.filename)
-            picture_fn = random_hex + f_ext
-            profile_pics_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'profile_pics')
-            os.makedirs(profile_pics_path, exist_ok=True)
-            picture_path = os.path.join(profile_pics_path, picture_fn)
-            output_size = (150, 150)
-            i = Image.open(file)
-            i.thumbnail(output_size)
-            i.save(picture_path)
-            user.profile_image_file = picture_fn
-            db.session.commit()
-            return {'message': 'Profile picture updated!'}, 200
+            return save_profile_picture(current_user_id, file)
         else:
             return {'message': 'File type not allowed'}, 400
         
+class ProfileImage(Resource):
+    """
+    Serves a stored profile picture rendition. URLs are content-addressed and never
+    change, so responses are cacheable for a year; revalidation is answered with
+    304 from the ETag. No authentication: <img> tags cannot send a bearer token,
+    and the URL embeds the SHA-256 of the picture.
+    """
+    def get(self, digest, size, ext):
+        path = image_service.rendition_path(digest, size, ext)
+        if path is None:
+            abort(404)
+        response = send_file(path, mimetype=image_service.FORMATS[ext][1], etag=f'{digest}-{size}.{ext}',
+                             max_age=365 * 24 * 3600, conditional=True)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
 class PatientList(Resource):
     @doctor_required
     def get(self):
@@ -262,6 +517,74 @@ class PatientList(Resource):
             
         return jsonify(output)
 
+class DoctorExport(Resource):
+    """
+    Streams every patient prediction matching the filters as CSV or Parquet.
+    Query parameters: format (csv|parquet), start, end (YYYY-MM-DD or ISO datetime;
+    a date-only end includes that day), risk (e.g. High,Medium), patient_id and
+    include_archived=1. Restricted to doctors.
+    """
+    @doctor_required
+    @admission_controlled('export')
+    def get(self):
+        from app.services import export_service
+        try:
+            filters = export_service.parse_filters(request.args)
+        except export_service.ExportError as e:
+            return {'message': e.message}, e.status
+        mimetype, extension = export_service.FORMATS[filters['format']]
+        chunks = export_service.stream_export(filters, current_app.config['EXPORT_CHUNK_SIZE'])
+        filename = f"predictions_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no'  # Let nginx pass the chunks through as they are produced
+        })
+
+class CohortAnalytics(Resource):
+    """
+    Population-level analytics for the doctor dashboard: risk distribution, risk
+    counts per day or week, and mean |SHAP| per feature. Read from the cohort
+    rollups kept up to date on every prediction write, never from raw predictions.
+    Query args: days (1-366, default 90), bucket=day|week. Restricted to doctors.
+    """
+    @doctor_required
+    def get(self):
+        from app.services import cohort_service
+        days = request.args.get('days', 90, type=int)
+        bucket = request.args.get('bucket', 'day')
+        if not 1 <= days <= 366:
+            return {'message': "'days' must be between 1 and 366"}, 400
+        if bucket not in ('day', 'week'):
+            return {'message': "'bucket' must be 'day' or 'week'"}, 400
+        return jsonify(cohort_service.analytics(days=days, bucket=bucket))
+
+class DriftReport(Resource):
+    """Per-feature drift of live /predict inputs against the training data. Restricted to doctors."""
+    @doctor_required
+    def get(self):
+        from app.services import drift_service
+        report = drift_service.drift_report()
+        if report is None:
+            return {'message': 'Drift monitoring is disabled or no reference statistics are available.'}, 503
+        return report, 200
+
+    @doctor_required
+    def delete(self):
+        from app.services import drift_service
+        drift_service.reset()
+        return {'message': 'Live drift statistics have been reset.'}, 200
+
+class AdmissionStats(Resource):
+    """Running/waiting requests and shed counts per endpoint class (this worker). Restricted to doctors."""
+    @doctor_required
+    def get(self):
+        return admission_control.stats(), 200
+
+def start_deletion_worker():
+    if current_app.config['DELETION_WORKER']:
+        deletion_service.start_worker(current_app._get_current_object())
+
 class PatientResource(Resource):
     @doctor_required
     def delete(self, patient_id):
@@ -269,29 +592,87 @@ class PatientResource(Resource):
         patient = User.query.get_or_404(patient_id)
 
         # Security check: ensure the user being deleted is a 'Patient'
-        if patient.role != 'Patient':
+        if patient.role not in ('Patient', deletion_service.DELETING_ROLE):
             return {'message': 'Cannot delete a user who is not a patient.'}, 403
 
-        # Delete the user from the database
-        db.session.delete(patient)
-        db.session.commit()
-        return {'message': f'Patient {patient.username} has been successfully removed.'}, 200
+        # The account is hidden now; its data is removed by a background job.
+        job = deletion_service.request_deletion([patient], requested_by=int(get_jwt_identity()))[0]
+        start_deletion_worker()
+        return {'message': f'Patient {job.username} is being removed.', 'job': deletion_service.summary(job)}, \
+            202, {'Location': f'/doctor/deletions/{job.id}'}
+
+class PatientBulkDeletion(Resource):
+    """Queues the removal of many patients at once: {"patient_ids": [1, 2, ...]}. Restricted to doctors."""
+    MAX_PATIENTS = 1000
+
+    @doctor_required
+    def post(self):
+        data = request.get_json(silent=True) or {}
+        patient_ids = data.get('patient_ids')
+        if (not isinstance(patient_ids, list) or not patient_ids or len(patient_ids) > self.MAX_PATIENTS
+                or not all(isinstance(i, int) and not isinstance(i, bool) for i in patient_ids)):
+            return {'message': f"'patient_ids' must be a list of 1 to {self.MAX_PATIENTS} user ids"}, 400
+
+        patient_ids = list(dict.fromkeys(patient_ids))
+        users = {user.id: user for user in User.query.filter(User.id.in_(patient_ids))}
+        patients = [users[i] for i in patient_ids if i in users and users[i].role in ('Patient', deletion_service.DELETING_ROLE)]
+        jobs = deletion_service.request_deletion(patients, requested_by=int(get_jwt_identity()))
+        start_deletion_worker()
+        return {
+            'jobs': [deletion_service.summary(job) for job in jobs],
+            'not_found': [i for i in patient_ids if i not in users],
+            'not_patients': [i for i in patient_ids if i in users and users[i] not in patients]
+        }, 202
+
+class DeletionJobList(Resource):
+    """Most recent patient deletion jobs, optionally filtered by ?status=. Restricted to doctors."""
+    @doctor_required
+    def get(self):
+        query = DeletionJob.query
+        if request.args.get('status'):
+            query = query.filter_by(status=request.args['status'])
+        jobs = query.order_by(DeletionJob.id.desc()).limit(request.args.get('limit', 100, type=int)).all()
+        return [deletion_service.summary(job) for job in jobs], 200
+
+class DeletionJobResource(Resource):
+    """Progress of one patient deletion job. Restricted to doctors."""
+    @doctor_required
+    def get(self, job_id):
+        job = db.session.get(DeletionJob, job_id)
+        if job is None:
+            return {'message': 'Deletion job not found'}, 404
+        return deletion_service.summary(job), 200
 
 
 # --- Function to Initialize All Routes ---
 def initialize_routes(api):
     api.add_resource(Home, '/')
+    api.add_resource(Readiness, '/ready')
     api.add_resource(UserRegistration, '/register')
     api.add_resource(UserLogin, '/login')
     api.add_resource(PredictionAPI, '/predict')
+    api.add_resource(WhatIfPrediction, '/predict/what-if')
     api.add_resource(ForgotPassword, '/forgot-password')
     api.add_resource(ResetPassword, '/reset-password')
     api.add_resource(DocumentUpload, '/upload-document')
+    api.add_resource(UploadInit, '/uploads')
+    api.add_resource(UploadChunk, '/uploads/<string:upload_id>')
+    api.add_resource(UploadComplete, '/uploads/<string:upload_id>/complete')
     api.add_resource(DocumentList, '/documents')
     api.add_resource(DocumentResource, '/documents/<int:doc_id>')
     api.add_resource(PredictionList, '/predictions')
+    api.add_resource(PredictionTrend, '/predictions/trend')
     api.add_resource(PredictionReport, '/predictions/<int:pred_id>/export')
     api.add_resource(UserProfile, '/profile')
+    api.add_resource(Dashboard, '/dashboard')
     api.add_resource(ProfilePictureUpload, '/profile/picture')
+    api.add_resource(ProfileImage, '/profile-images/<string:digest>/<int:size>.<string:ext>')
     api.add_resource(PatientList, '/doctor/patients')
     api.add_resource(PatientResource, '/doctor/patients/<int:patient_id>')
+    api.add_resource(PatientBulkDeletion, '/doctor/patients/delete')
+    api.add_resource(DeletionJobList, '/doctor/deletions')
+    api.add_resource(DeletionJobResource, '/doctor/deletions/<int:job_id>')
+    api.add_resource(DoctorExport, '/doctor/export')
+    api.add_resource(CohortAnalytics, '/doctor/analytics')
+    api.add_resource(DriftReport, '/admin/drift')
+    api.add_resource(AdmissionStats, '/admin/admission')
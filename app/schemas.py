@@ -0,0 +1,167 @@
+# app/schemas.py
+
+"""
+Declarative request schemas.
+
+Each schema is compiled once, at import time, into a tuple of per-field
+checker functions, so validating a request is a single pass over the fields
+with no per-request parser construction. Validation collects every problem
+instead of stopping at the first one:
+
+    args = schemas.PREDICTION.parse()   # aborts with 400 and a list of errors
+"""
+
+import math
+
+from flask import request
+from flask_restful import abort
+
+
+class Field:
+    """One expected request field: its type, whether it is required, and its allowed range."""
+
+    def __init__(self, type, required=True, min=None, max=None, blank=True, help=None):
+        self.type = type
+        self.required = required
+        self.min = min
+        self.max = max
+        self.blank = blank
+        self.help = help
+
+
+def _to_int(value):
+    # Accepts 52, 52.0 and "52" (form posts); rejects booleans and 52.5.
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    return int(value)
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise ValueError
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError
+    return value
+
+
+def _to_str(value):
+    if isinstance(value, (dict, list)):
+        raise ValueError
+    return str(value)
+
+
+_CONVERTERS = {int: (_to_int, 'an integer'), float: (_to_float, 'a number'), str: (_to_str, 'a string')}
+
+
+def _compile_field(name, field):
+    """Builds the checker for one field: returns (value, None) or (None, error dict)."""
+    convert, type_name = _CONVERTERS[field.type]
+    required_message = field.help or 'is required'
+    low, high = field.min, field.max
+    if low is not None and high is not None:
+        range_message = f'must be between {low} and {high}'
+    elif low is not None:
+        range_message = f'must be at least {low}'
+    else:
+        range_message = f'must be at most {high}'
+    check_range = low is not None or high is not None
+
+    def check(data):
+        value = data.get(name)
+        if value is None:
+            if field.required:
+                return None, {'field': name, 'message': required_message}
+            return None, None
+        try:
+            value = convert(value)
+        except (TypeError, ValueError, OverflowError):
+            return None, {'field': name, 'message': f'must be {type_name}'}
+        if not field.blank and not value.strip():
+            return None, {'field': name, 'message': field.help or 'cannot be blank'}
+        if check_range and ((low is not None and value < low) or (high is not None and value > high)):
+            return None, {'field': name, 'message': range_message}
+        return value, None
+
+    return name, check
+
+
+class Schema:
+    def __init__(self, **fields):
+        self.fields = fields
+        self._checks = tuple(_compile_field(name, field) for name, field in fields.items())
+
+    def validate(self, data):
+        """Returns (values, errors); `errors` is a list of {'field', 'message'} dicts."""
+        values = {}
+        errors = []
+        for name, check in self._checks:
+            value, error = check(data)
+            if error:
+                errors.append(error)
+            else:
+                values[name] = value
+        return values, errors
+
+    def parse(self):
+        """
+        Validates the current request's JSON body (or form/query values, like
+        reqparse) and aborts with 400 listing every invalid field.
+        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = request.values
+        values, errors = self.validate(data)
+        if errors:
+            abort(400, message='; '.join(f"{e['field']}: {e['message']}" for e in errors), errors=errors)
+        return values
+
+
+# --- Schemas ---
+
+REGISTRATION = Schema(
+    username=Field(str, blank=False, help='Username cannot be blank'),
+    email=Field(str, blank=False, help='Email cannot be blank'),
+    password=Field(str, blank=False, help='Password cannot be blank')
+)
+
+LOGIN = Schema(
+    username=Field(str, blank=False, help='Username cannot be blank'),
+    password=Field(str, blank=False, help='Password cannot be blank')
+)
+
+FORGOT_PASSWORD = Schema(email=Field(str, blank=False))
+
+RESET_PASSWORD = Schema(
+    token=Field(str, blank=False),
+    password=Field(str, blank=False)
+)
+
+UPLOAD_INIT = Schema(
+    filename=Field(str, blank=False),
+    size=Field(int, min=1),
+    purpose=Field(str, required=False),
+    sha256=Field(str, required=False)
+)
+
+# Clinical ranges, wide enough for every plausible measurement (the training
+# data is well inside them) while rejecting typos such as a 1400 cholesterol.
+PREDICTION = Schema(
+    age=Field(int, min=1, max=120),
+    sex=Field(int, min=0, max=1),
+    cp=Field(int, min=0, max=3),
+    trestbps=Field(int, min=50, max=250),    # resting blood pressure, mm Hg
+    chol=Field(int, min=50, max=700),        # serum cholesterol, mg/dl
+    fbs=Field(int, min=0, max=1),
+    restecg=Field(int, min=0, max=2),
+    thalach=Field(int, min=50, max=250),     # maximum heart rate
+    exang=Field(int, min=0, max=1),
+    oldpeak=Field(float, min=-5.0, max=10.0),  # ST depression
+    slope=Field(int, min=0, max=2),
+    ca=Field(int, min=0, max=4),
+    thal=Field(int, min=0, max=3)
+)
@@ -0,0 +1,69 @@
+# app/serialization.py
+
+"""
+Fast JSON responses for both jsonify() and flask-restful resources.
+
+orjson (optional) serializes NumPy scalars and arrays natively, so values such
+as SHAP contributions and the explainer's expected value need no conversion.
+Without orjson, the standard library is used with a default() that converts
+NumPy types. Dates keep Flask's formatting either way.
+"""
+
+import json
+
+from flask import current_app, make_response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _numpy_default(obj):
+    """Converts NumPy scalars/arrays (duck-typed, so NumPy is never imported here)."""
+    if hasattr(obj, 'tolist') and type(obj).__module__ == 'numpy':
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_numpy_default)
+
+    def _options(self, indent):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=None):
+        if orjson is None:
+            return json.dumps(obj, default=self.default, sort_keys=self.sort_keys, indent=indent, ensure_ascii=self.ensure_ascii).encode('utf-8')
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'indent'}:
+            kwargs.setdefault('default', self.default)
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, kwargs.get('indent')).decode('utf-8')
+
+    def _indent(self):
+        return 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj, self._indent()) + b'\n', mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """flask-restful representation for application/json, using the app's JSON provider."""
+    provider = current_app.json
+    if isinstance(provider, FastJSONProvider):
+        body = provider.dumps_bytes(data, provider._indent()) + b'\n'
+    else:
+        body = provider.dumps(data) + '\n'
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    return response
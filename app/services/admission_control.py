@@ -0,0 +1,317 @@
+# app/services/admission_control.py
+
+import json
+import math
+import os
+import threading
+import time
+from flask import current_app
+
+from app.services.file_lock import FileLock
+
+# How often a request waiting for a shared (cross-process) slot polls the lock files.
+SHARED_POLL_INTERVAL = 0.01
+# Local token buckets are pruned (full ones dropped) once this many keys exist.
+MAX_BUCKETS = 10000
+# Weight of the newest observation in the moving averages used for Retry-After.
+EWMA_WEIGHT = 0.2
+
+
+class Overloaded(Exception):
+    """A request turned away: `status` is 429 (per-user rate) or 503 (endpoint overloaded)."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class _QueueFull(Exception):
+    pass
+
+
+# --- Concurrency slots with a bounded wait queue ---
+
+class _LocalSlots:
+    """`concurrency` slots and at most `queue` waiters, within this process."""
+
+    def __init__(self, concurrency, queue):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.running = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        """Returns a token for release(), None on timeout; raises QueueFull if the queue is full."""
+        with self._condition:
+            if self.running < self.concurrency:
+                self.running += 1
+                return True
+            if self.waiting >= self.queue:
+                raise _QueueFull()
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                if not self._condition.wait_for(lambda: self.running < self.concurrency, timeout):
+                    return None
+                self.running += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, token):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+    def depth(self):
+        return self.running, self.waiting
+
+
+class _SharedSlots:
+    """
+    The same limits shared by every worker process on the host: each running
+    request holds one of `concurrency` slot lock files and each waiter one of
+    `queue` queue lock files. Locks die with their process, so a crashed worker
+    never leaks a slot.
+    """
+
+    def __init__(self, directory, name, concurrency, queue):
+        self.concurrency = concurrency
+        self.queue = queue
+        self._slots = [os.path.join(directory, f'{name}.slot{i}') for i in range(concurrency)]
+        self._queue = [os.path.join(directory, f'{name}.queue{i}') for i in range(queue)]
+
+    @staticmethod
+    def _try_any(paths):
+        for path in paths:
+            lock = FileLock(path)
+            if lock.acquire(blocking=False):
+                return lock
+        return None
+
+    def acquire(self, timeout):
+        slot = self._try_any(self._slots)
+        if slot:
+            return slot
+        place = self._try_any(self._queue)
+        if place is None:
+            raise _QueueFull()
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                time.sleep(SHARED_POLL_INTERVAL)
+                slot = self._try_any(self._slots)
+                if slot:
+                    return slot
+            return None
+        finally:
+            place.release()
+
+    def release(self, token):
+        token.release()
+
+    def depth(self):
+        # Probing takes each lock for an instant; a waiter that finds one briefly
+        # held simply tries the next file.
+        def held(paths):
+            count = 0
+            for path in paths:
+                lock = FileLock(path)
+                if lock.acquire(blocking=False):
+                    lock.release()
+                else:
+                    count += 1
+            return count
+        return held(self._slots), held(self._queue)
+
+
+# --- Per-user token buckets ---
+
+class _LocalBuckets:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, updated_at]
+
+    def take(self, key, rate, burst):
+        """Takes one token; returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._prune(now, rate, burst)
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets[key] = [tokens, now]
+                return (1 - tokens) / rate
+            self._buckets[key] = [tokens - 1, now]
+            return 0
+
+    def refund(self, key, burst):
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key][0] = min(burst, self._buckets[key][0] + 1)
+
+    def _prune(self, now, rate, burst):
+        # A bucket that has refilled completely is the same as no bucket.
+        self._buckets = {key: value for key, value in self._buckets.items()
+                         if value[0] + (now - value[1]) * rate < burst}
+
+
+class _SharedBuckets:
+    """Token buckets kept in one JSON file, updated under a file lock by every worker."""
+
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, f'{name}.buckets.json')
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, buckets):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(buckets, f)
+        os.replace(tmp_path, self.path)
+
+    def take(self, key, rate, burst):
+        now = time.time()  # Wall clock: monotonic clocks are not comparable across processes
+        with FileLock(self.path):
+            buckets = {k: v for k, v in self._read().items() if v[0] + (now - v[1]) * rate < burst}
+            tokens, updated = buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            buckets[key] = [tokens - 1 if wait == 0 else tokens, now]
+            self._write(buckets)
+        return wait
+
+    def refund(self, key, burst):
+        with FileLock(self.path):
+            buckets = self._read()
+            if key in buckets:
+                buckets[key][0] = min(burst, buckets[key][0] + 1)
+                self._write(buckets)
+
+
+# --- Endpoint classes ---
+
+class _EndpointClass:
+    def __init__(self, name, limits, shared_dir):
+        self.name = name
+        self.timeout = limits['timeout']
+        self.rate = limits.get('rate')
+        self.burst = limits.get('burst', 1)
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+            self.slots = _SharedSlots(shared_dir, name, limits['concurrency'], limits['queue'])
+            self.buckets = _SharedBuckets(shared_dir, name)
+        else:
+            self.slots = _LocalSlots(limits['concurrency'], limits['queue'])
+            self.buckets = _LocalBuckets()
+        self.lock = threading.Lock()
+        self.stats = {'admitted': 0, 'rate_limited': 0, 'shed_queue_full': 0, 'shed_timeout': 0,
+                      'avg_wait_ms': 0.0, 'avg_service_ms': 0.0}
+
+    def record(self, key, value=None):
+        with self.lock:
+            if value is None:
+                self.stats[key] += 1
+            else:
+                self.stats[key] += EWMA_WEIGHT * (value - self.stats[key])
+
+    def retry_after(self):
+        """Roughly how long until the queue ahead of a new request has drained."""
+        _, waiting = self.slots.depth()
+        service = self.stats['avg_service_ms'] / 1000 or 1.0
+        return service * (waiting + 1) / self.slots.concurrency
+
+
+_lock = threading.Lock()
+_classes = {}
+
+
+def _endpoint_class(name):
+    with _lock:
+        endpoint = _classes.get(name)
+        if endpoint is None:
+            config = current_app.config
+            endpoint = _EndpointClass(name, config['ADMISSION_LIMITS'][name], config['ADMISSION_SHARED_DIR'])
+            _classes[name] = endpoint
+        return endpoint
+
+
+def acquire(name, client_key):
+    """
+    Admits one request of endpoint class `name` for `client_key` (a user id or
+    client address), waiting in the bounded queue if every slot is busy.
+    Returns a ticket for release(); raises Overloaded when the client is over
+    its rate (429) or the endpoint's queue is full or the wait timed out (503).
+    """
+    if not current_app.config['ADMISSION_CONTROL']:
+        return None
+    endpoint = _endpoint_class(name)
+
+    bucket_key = f'{name}:{client_key}'
+    if endpoint.rate:
+        wait = endpoint.buckets.take(bucket_key, endpoint.rate, endpoint.burst)
+        if wait:
+            endpoint.record('rate_limited')
+            raise Overloaded('Too many requests; please slow down.', 429, wait)
+
+    start = time.monotonic()
+    try:
+        token = endpoint.slots.acquire(endpoint.timeout)
+    except _QueueFull:
+        token = None
+        endpoint.record('shed_queue_full')
+    else:
+        if token is None:
+            endpoint.record('shed_timeout')
+    if token is None:
+        # Being turned away for overload does not count against the user's rate.
+        if endpoint.rate:
+            endpoint.buckets.refund(bucket_key, endpoint.burst)
+        raise Overloaded('The server is busy; please try again shortly.', 503, endpoint.retry_after())
+
+    now = time.monotonic()
+    endpoint.record('admitted')
+    endpoint.record('avg_wait_ms', (now - start) * 1000)
+    return endpoint, token, now
+
+
+def release(ticket):
+    if ticket is None:
+        return
+    endpoint, token, started = ticket
+    endpoint.slots.release(token)
+    endpoint.record('avg_service_ms', (time.monotonic() - started) * 1000)
+
+
+def stats():
+    """Per endpoint class: limits, current running/waiting counts and shed counters (this process)."""
+    with _lock:
+        endpoints = list(_classes.values())
+    report = {}
+    for endpoint in endpoints:
+        running, waiting = endpoint.slots.depth()
+        with endpoint.lock:
+            counters = dict(endpoint.stats)
+        counters['avg_wait_ms'] = round(counters['avg_wait_ms'], 1)
+        counters['avg_service_ms'] = round(counters['avg_service_ms'], 1)
+        report[endpoint.name] = dict(counters, running=running, waiting=waiting,
+                                     max_waiting=getattr(endpoint.slots, 'max_waiting', None),
+                                     concurrency=endpoint.slots.concurrency, queue=endpoint.slots.queue,
+                                     shared=isinstance(endpoint.slots, _SharedSlots))
+    return report
+
+
+def reset():
+    """Drops all limiter state, so the next request rebuilds it from the current config."""
+    with _lock:
+        _classes.clear()
@@ -0,0 +1,239 @@
+# app/services/cohort_service.py
+
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Prediction, ArchiveSegment, CohortDailyRisk, CohortFeatureImpact
+from app.services import prediction_service, retention_service
+
+RISK_CATEGORIES = ('Low', 'Medium', 'High')
+
+DAILY_KEYS = ('day', 'risk_category')
+DAILY_VALUES = ('count', 'probability_count', 'probability_sum')
+FEATURE_KEYS = ('feature',)
+FEATURE_VALUES = ('count', 'abs_shap_sum', 'shap_sum')
+
+
+class Delta:
+    """
+    Rollup changes for a set of predictions: per (day, risk category) the count,
+    the number with a probability and their probability sum, and per feature
+    the number of SHAP contributions and the sums of their absolute and signed values.
+    """
+
+    def __init__(self):
+        self.daily = {}     # (date, category) -> [count, probability_count, probability_sum]
+        self.features = {}  # feature -> [count, abs_shap_sum, shap_sum]
+
+    def merge(self, other):
+        for target, source in ((self.daily, other.daily), (self.features, other.features)):
+            for key, values in source.items():
+                totals = target.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return self
+
+
+def aggregate(timestamps, categories, probabilities, vectors):
+    """
+    Computes the Delta for a batch of predictions with a few NumPy passes:
+    rows are grouped by (day, category) with bincount, and the SHAP halves of
+    the packed feature vectors are summed column-wise. Timestamps may be
+    datetimes or ISO strings; rows without a timestamp or a known category are
+    left out of the daily counts.
+    """
+    import numpy as np
+
+    delta = Delta()
+    n_categories = len(RISK_CATEGORIES)
+    days = np.array(timestamps, dtype='datetime64[us]').astype('datetime64[D]')
+    codes = np.array([RISK_CATEGORIES.index(c) if c in RISK_CATEGORIES else -1 for c in categories], dtype=np.int64)
+    probs = np.array([np.nan if p is None else p for p in probabilities], dtype=np.float64)
+    valid = ~np.isnat(days) & (codes >= 0)
+    if valid.any():
+        keys = days[valid].astype(np.int64) * n_categories + codes[valid]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        has_probability = ~np.isnan(probs[valid])
+        counts = np.bincount(inverse)
+        probability_counts = np.bincount(inverse, weights=has_probability)
+        probability_sums = np.bincount(inverse, weights=np.where(has_probability, probs[valid], 0.0))
+        for i, key in enumerate(unique.tolist()):
+            day = np.datetime64(key // n_categories, 'D').item()
+            delta.daily[(day, RISK_CATEGORIES[key % n_categories])] = [
+                int(counts[i]), int(probability_counts[i]), float(probability_sums[i])]
+
+    columns = prediction_service.feature_columns()
+    width = 2 * len(columns) * np.dtype(prediction_service.VECTOR_DTYPE).itemsize
+    packed = [v for v in vectors if v is not None and len(v) == width]
+    if packed:
+        matrix = np.frombuffer(b''.join(packed), dtype=prediction_service.VECTOR_DTYPE).reshape(len(packed), -1)
+        contributions = matrix[:, len(columns):].astype(np.float64)
+        present = ~np.isnan(contributions)  # NaN: re-scored without SHAP
+        counts = present.sum(axis=0)
+        abs_sums = np.where(present, np.abs(contributions), 0.0).sum(axis=0)
+        sums = np.where(present, contributions, 0.0).sum(axis=0)
+        for i, feature in enumerate(columns):
+            if counts[i]:
+                delta.features[feature] = [int(counts[i]), float(abs_sums[i]), float(sums[i])]
+    return delta
+
+
+def _upsert(model, key_names, value_names, entries, sign):
+    """
+    Adds sign * values to the rollup rows with the given keys, inserting missing
+    rows: one INSERT ... ON CONFLICT DO UPDATE for all entries on SQLite and
+    PostgreSQL, an UPDATE-then-INSERT per entry elsewhere.
+    """
+    if not entries:
+        return
+    table = model.__table__
+    rows = [
+        {**dict(zip(key_names, key if isinstance(key, tuple) else (key,))),
+         **{name: sign * value for name, value in zip(value_names, values)}}
+        for key, values in entries.items()
+    ]
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_names],
+            set_={name: table.c[name] + stmt.excluded[name] for name in value_names}
+        )
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        match = [table.c[name] == row[name] for name in key_names]
+        updated = db.session.execute(
+            table.update().where(*match).values({name: table.c[name] + row[name] for name in value_names}))
+        if updated.rowcount == 0:
+            db.session.execute(table.insert().values(row))
+
+
+def apply(delta, sign=1):
+    """Adds (sign=1) or removes (sign=-1) a Delta in the current transaction; the caller commits."""
+    _upsert(CohortDailyRisk, DAILY_KEYS, DAILY_VALUES, delta.daily, sign)
+    _upsert(CohortFeatureImpact, FEATURE_KEYS, FEATURE_VALUES, delta.features, sign)
+
+
+def record(rows, sign=1):
+    """
+    Updates the rollups for predictions being written (sign=1) or removed
+    (sign=-1), in the caller's transaction. `rows` are mappings or row objects
+    with timestamp, risk_category, probability and feature_vector.
+    """
+    if not rows:
+        return
+    get = (lambda row, name: row.get(name)) if isinstance(rows[0], dict) else getattr
+    apply(aggregate(
+        [get(row, 'timestamp') for row in rows], [get(row, 'risk_category') for row in rows],
+        [get(row, 'probability') for row in rows], [get(row, 'feature_vector') for row in rows]
+    ), sign)
+
+
+# --- Rebuild ---
+
+def rebuild(chunk_size=5000, log_every=20):
+    """
+    Recomputes the rollups from scratch: every hot prediction in keyset chunks,
+    then every archived prediction segment, each aggregated with aggregate().
+    The old rollups are replaced in one transaction at the end, so readers
+    never see a partial result. Predictions written while this runs are
+    counted only if the scan reaches them; run it when writes are quiet.
+    Returns the rebuilt Delta.
+    """
+    start = time.perf_counter()
+    totals = Delta()
+    last_id, scanned, chunks = 0, 0, 0
+    while True:
+        rows = db.session.query(
+            Prediction.id, Prediction.timestamp, Prediction.risk_category, Prediction.probability, Prediction.feature_vector
+        ).filter(Prediction.id > last_id).order_by(Prediction.id).limit(chunk_size).all()
+        if not rows:
+            break
+        totals.merge(aggregate([r.timestamp for r in rows], [r.risk_category for r in rows],
+                               [r.probability for r in rows], [r.feature_vector for r in rows]))
+        last_id = rows[-1].id
+        scanned += len(rows)
+        chunks += 1
+        if chunks % log_every == 0:
+            print(f"  ...{scanned} predictions aggregated ({scanned / (time.perf_counter() - start):.0f} rows/s)")
+
+    _, _, _, _, decode = retention_service.ARCHIVES['prediction']
+    segments = db.session.query(ArchiveSegment.payload).filter(ArchiveSegment.kind == 'prediction').execution_options(yield_per=1)
+    for (payload,) in segments:
+        archived = decode(payload)
+        totals.merge(aggregate([p['timestamp'] for p in archived], [p['risk_category'] for p in archived],
+                               [p['probability'] for p in archived], [p['feature_vector'] for p in archived]))
+        scanned += len(archived)
+
+    CohortDailyRisk.query.delete()
+    CohortFeatureImpact.query.delete()
+    apply(totals)
+    db.session.commit()
+    print(f"Cohort rollups rebuilt from {scanned} predictions in {time.perf_counter() - start:.1f}s: "
+          f"{len(totals.daily)} day/category rows, {len(totals.features)} features.")
+    return totals
+
+
+# --- Reading ---
+
+def analytics(days=90, bucket='day'):
+    """
+    Population analytics for the doctor dashboard, read from the rollups only:
+    the overall risk distribution, counts per risk category (and mean probability)
+    per day or week over the last `days` days, and features ranked by mean |SHAP|.
+    """
+    from sqlalchemy import func
+
+    distribution = {category: 0 for category in RISK_CATEGORIES}
+    probability_count, probability_sum = 0, 0.0
+    for category, count, p_count, p_sum in db.session.query(
+        CohortDailyRisk.risk_category, func.sum(CohortDailyRisk.count),
+        func.sum(CohortDailyRisk.probability_count), func.sum(CohortDailyRisk.probability_sum)
+    ).group_by(CohortDailyRisk.risk_category):
+        distribution[category] = int(count or 0)
+        probability_count += int(p_count or 0)
+        probability_sum += p_sum or 0.0
+
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+    if bucket == 'week':
+        since -= timedelta(days=since.weekday())  # Whole weeks, starting on Monday
+    step = timedelta(days=7 if bucket == 'week' else 1)
+    points = {}
+    day = since
+    while day <= today:
+        points[day] = {'date': day.isoformat(), **{c: 0 for c in RISK_CATEGORIES}, '_p': [0, 0.0]}
+        day += step
+    for row in CohortDailyRisk.query.filter(CohortDailyRisk.day >= since):
+        if row.risk_category not in RISK_CATEGORIES or row.day > today:
+            continue
+        point = points[row.day - timedelta(days=row.day.weekday())] if bucket == 'week' else points[row.day]
+        point[row.risk_category] += row.count
+        point['_p'][0] += row.probability_count
+        point['_p'][1] += row.probability_sum
+    trend = []
+    for point in points.values():
+        p_count, p_sum = point.pop('_p')
+        point['mean_probability'] = p_sum / p_count if p_count > 0 else None
+        trend.append(point)
+
+    features = [
+        {'feature': row.feature, 'mean_abs_shap': row.abs_shap_sum / row.count,
+         'mean_shap': row.shap_sum / row.count, 'count': row.count}
+        for row in CohortFeatureImpact.query.filter(CohortFeatureImpact.count > 0)
+    ]
+    features.sort(key=lambda f: f['mean_abs_shap'], reverse=True)
+
+    return {
+        'total_predictions': sum(distribution.values()),
+        'risk_distribution': distribution,
+        'mean_probability': probability_sum / probability_count if probability_count > 0 else None,
+        'trend': {'bucket': bucket, 'since': since.isoformat(), 'points': trend},
+        'feature_importance': features
+    }
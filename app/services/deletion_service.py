@@ -0,0 +1,310 @@
+# app/services/deletion_service.py
+
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from app import db
+from app.models import User, Prediction, MedicalDocument, ArchiveSegment, DeletionJob
+from app.services import cohort_service, image_service, retention_service, storage, upload_service, user_cache
+
+# Role given to an account while its deletion job runs: it can no longer log in
+# and disappears from the doctor's patient list straight away.
+DELETING_ROLE = 'Deleting'
+
+STAGES = ('predictions', 'documents', 'archives', 'uploads', 'account')
+
+# A 'running' job whose progress has not moved for this long belongs to a worker
+# that died; another worker takes it over.
+STALE_AFTER = timedelta(minutes=5)
+
+_worker_thread = None
+_stop_event = threading.Event()
+_wake_event = threading.Event()
+
+
+def summary(job):
+    """JSON-ready progress of a deletion job."""
+    return {
+        'id': job.id,
+        'user_id': job.user_id,
+        'username': job.username,
+        'status': job.status,
+        'stage': job.stage,
+        'rows_deleted': job.rows_deleted,
+        'files_deleted': job.files_deleted,
+        'last_error': job.last_error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def request_deletion(patients, requested_by=None):
+    """
+    Hides each patient account and queues a job that removes it with everything
+    it owns. Patients already being deleted keep their existing job. Commits, and
+    returns the jobs in the order given.
+    """
+    existing = {}
+    if patients:
+        pending = DeletionJob.query.filter(
+            DeletionJob.user_id.in_([patient.id for patient in patients]),
+            DeletionJob.status.in_(('pending', 'running', 'failed'))
+        )
+        existing = {job.user_id: job for job in pending}
+
+    jobs = []
+    for patient in patients:
+        job = existing.get(patient.id)
+        if job is None:
+            job = DeletionJob(user_id=patient.id, username=patient.username, requested_by=requested_by,
+                              status='pending', stage=STAGES[0], rows_deleted=0, files_deleted=0, attempts=0)
+            db.session.add(job)
+        elif job.status == 'failed':
+            job.status = 'pending'  # Asking again retries a failed job
+        patient.role = DELETING_ROLE
+        jobs.append(job)
+    db.session.commit()
+    for patient in patients:
+        user_cache.invalidate(patient.id)
+    return jobs
+
+
+# --- Running a job ---
+
+def _storage_keys(files, paths):
+    """Storage keys of documents' file references; references outside the storage root are skipped."""
+    keys = set()
+    for path in paths:
+        try:
+            keys.add(files.key(path))
+        except ValueError:
+            continue
+    return keys
+
+
+def _remove(files, keys):
+    """Removes the given files from storage. Returns how many were removed."""
+    removed = 0
+    for key in keys:
+        try:
+            removed += files.delete(key)
+        except OSError as e:
+            print(f"Deletion: could not remove {key}: {e}")
+    return removed
+
+
+def _shared_keys(job, files, keys):
+    """
+    Of `keys`, those still referenced by another user's documents, hot or archived.
+    Documents are stored under their original filename, so two patients can share a file.
+    """
+    references = storage.references(keys)
+    shared = _storage_keys(files, (row.filepath for row in db.session.query(MedicalDocument.filepath).filter(
+        MedicalDocument.filepath.in_(references), MedicalDocument.user_id != job.user_id)))
+    _, _, _, _, decode = retention_service.ARCHIVES['medical_document']
+    segments = db.session.query(ArchiveSegment.payload).filter(
+        ArchiveSegment.kind == 'medical_document', ArchiveSegment.user_id != job.user_id
+    ).execution_options(yield_per=1)
+    for (payload,) in segments:
+        shared.update(_storage_keys(files, (doc['filepath'] for doc in decode(payload) if doc['filepath'] in references)))
+    return shared & keys
+
+
+def _prediction_rows(job, limit=None):
+    query = db.session.query(
+        Prediction.id, Prediction.timestamp, Prediction.risk_category, Prediction.probability, Prediction.feature_vector
+    ).filter(Prediction.user_id == job.user_id).order_by(Prediction.id)
+    return query.limit(limit).all() if limit else query.all()
+
+
+def _delete_predictions(job, batch_size):
+    rows = _prediction_rows(job, batch_size)
+    if rows:
+        Prediction.query.filter(Prediction.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        cohort_service.record(rows, sign=-1)
+    return len(rows), []
+
+
+def _delete_documents(job, batch_size):
+    rows = db.session.query(MedicalDocument.id, MedicalDocument.filepath).filter(
+        MedicalDocument.user_id == job.user_id).order_by(MedicalDocument.id).limit(batch_size).all()
+    if rows:
+        MedicalDocument.query.filter(MedicalDocument.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+    return len(rows), [row.filepath for row in rows]
+
+
+def _delete_archives(job, batch_size):
+    # Segments hold up to RETENTION_BATCH_SIZE rows each, so a few per transaction.
+    segments = ArchiveSegment.query.filter_by(user_id=job.user_id).order_by(ArchiveSegment.id).limit(
+        max(1, batch_size // 100)).all()
+    paths = []
+    for segment in segments:
+        _, _, _, _, decode = retention_service.ARCHIVES[segment.kind]
+        if segment.kind == 'medical_document':
+            paths.extend(doc['filepath'] for doc in decode(segment.payload))
+        elif segment.kind == 'prediction':
+            cohort_service.record(decode(segment.payload), sign=-1)
+    if segments:
+        ArchiveSegment.query.filter(ArchiveSegment.id.in_([s.id for s in segments])).delete(synchronize_session=False)
+    return sum(segment.row_count for segment in segments), paths
+
+
+def _remove_unshared(job, files, paths):
+    """Removes the files of deleted documents that no other user's documents reference, and records the count."""
+    if not paths:
+        return
+    keys = _storage_keys(files, paths)
+    job.files_deleted += _remove(files, keys - _shared_keys(job, files, keys))
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+
+
+BATCH_STEPS = {'predictions': _delete_predictions, 'documents': _delete_documents, 'archives': _delete_archives}
+
+
+def _finish_account(job):
+    """
+    Deletes the user row, sweeping up predictions and documents written for the
+    account while the job ran (by requests already past authentication when it
+    was queued). Returns (rows deleted, file paths of the swept documents).
+    """
+    late = _prediction_rows(job)
+    if late:
+        Prediction.query.filter(Prediction.id.in_([row.id for row in late])).delete(synchronize_session=False)
+        cohort_service.record(late, sign=-1)
+    late_documents = db.session.query(MedicalDocument.id, MedicalDocument.filepath).filter(
+        MedicalDocument.user_id == job.user_id).all()
+    if late_documents:
+        MedicalDocument.query.filter(MedicalDocument.id.in_([row.id for row in late_documents])).delete(synchronize_session=False)
+    user = db.session.get(User, job.user_id)
+    if user is not None:
+        db.session.delete(user)
+    job.status = 'finished'
+    job.finished_at = datetime.utcnow()
+    return len(late) + len(late_documents), [row.filepath for row in late_documents]
+
+
+def run_job(job, batch_size=None, pause=None):
+    """
+    Works through a job's stages in batches of `batch_size` rows, one short
+    transaction each (DELETE ... WHERE id IN), sleeping `pause` seconds between
+    batches so live requests get the write lock. Files are removed from storage
+    after the batch that referenced them is committed. Progress is saved with every batch,
+    so an interrupted job resumes where it stopped.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['DELETION_BATCH_SIZE']
+    pause = config['DELETION_PAUSE'] if pause is None else pause
+    files = storage.get_storage()
+
+    job.attempts += 1
+    db.session.commit()
+    while job.stage != 'account':
+        step = BATCH_STEPS.get(job.stage)
+        if step is None:  # 'uploads': unfinished resumable uploads
+            job.files_deleted += upload_service.discard_user_sessions(job.user_id)
+            job.stage = 'account'
+            db.session.commit()
+            continue
+        rows, paths = step(job, batch_size)
+        if rows == 0:
+            job.stage = STAGES[STAGES.index(job.stage) + 1]
+        job.rows_deleted += rows
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        _remove_unshared(job, files, paths)
+        time.sleep(pause)
+
+    user = db.session.get(User, job.user_id)
+    picture = user.profile_image if user is not None else None
+    rows, paths = _finish_account(job)
+    job.rows_deleted += rows
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+    user_cache.invalidate(job.user_id)
+    _remove_unshared(job, files, paths)
+    # Resumable uploads started after the 'uploads' stage.
+    job.files_deleted += upload_service.discard_user_sessions(job.user_id)
+    db.session.commit()
+    if picture:
+        # Content-addressed: kept if another account uses the same picture.
+        job.files_deleted += image_service.release(picture)
+        db.session.commit()
+    return job
+
+
+def _claim_next():
+    """Atomically marks the oldest runnable job as running and returns it (None if there is none)."""
+    now = datetime.utcnow()
+    runnable = or_(DeletionJob.status == 'pending',
+                   and_(DeletionJob.status == 'running', DeletionJob.updated_at < now - STALE_AFTER))
+    while True:
+        job = DeletionJob.query.filter(runnable).order_by(DeletionJob.id).first()
+        if job is None:
+            return None
+        # Conditional UPDATE: if another worker claimed the job first, no row matches.
+        claimed = DeletionJob.query.filter(DeletionJob.id == job.id, runnable).update(
+            {'status': 'running', 'updated_at': now}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            db.session.refresh(job)
+            return job
+
+
+def process_pending(limit=None):
+    """Runs queued jobs (oldest first) until none are left. Returns how many ran."""
+    done = 0
+    while limit is None or done < limit:
+        job = _claim_next()
+        if job is None:
+            break
+        try:
+            run_job(job)
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.last_error = str(e)[:1000]
+            db.session.commit()
+            print(f"Deletion: job {job.id} for user {job.user_id} failed: {e}")
+        done += 1
+    return done
+
+
+def run_worker(app, stop_event=None):
+    """Runs queued deletion jobs as they arrive until stop_event is set."""
+    stop_event = stop_event or _stop_event
+    interval = app.config['DELETION_POLL_INTERVAL']
+    while not stop_event.is_set():
+        _wake_event.clear()
+        with app.app_context():
+            try:
+                process_pending()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Deletion: worker loop error: {e}")
+            finally:
+                db.session.remove()
+        _wake_event.wait(interval)
+
+
+def start_worker(app):
+    """Starts this process's background deletion thread (idempotent) and wakes it up."""
+    global _worker_thread
+    _wake_event.set()
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return _worker_thread
+    _stop_event.clear()
+    _worker_thread = threading.Thread(target=run_worker, args=(app,), name='deletion-worker', daemon=True)
+    _worker_thread.start()
+    return _worker_thread
+
+
+def stop_worker(timeout=5):
+    """Signals the background deletion thread to stop and waits for it."""
+    _stop_event.set()
+    _wake_event.set()
+    if _worker_thread is not None:
+        _worker_thread.join(timeout)
@@ -0,0 +1,273 @@
+# app/services/drift_service.py
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+from app.services.file_lock import FileLock
+
+# This module is only imported when a prediction is scored or the drift report is
+# requested, so numpy stays off the app startup path.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(os.path.dirname(BASE_DIR), 'ml_models')
+REFERENCE_STATS_PATH = os.path.join(MODEL_DIR, 'reference_stats.json')
+
+# Number of histogram bins per feature in the reference statistics.
+REFERENCE_BINS = 10
+# Avoids log(0) / division by zero for bins that are empty on one side.
+EPSILON = 1e-4
+
+# Read from the app config on first use (see _ensure_configured).
+_configured = False
+state_path = None
+flush_rows = 100
+flush_seconds = 30.0
+
+reference = None  # {'features', 'cuts', 'proportions', 'mean', 'std', 'count'}
+_lock = threading.Lock()
+_pending = None  # This process's sketch since the last flush to the shared file
+_last_flush = time.monotonic()
+
+
+# --- Reference statistics (computed at training time) ---
+
+def build_reference_stats(X, bins=REFERENCE_BINS):
+    """
+    Computes per-feature reference statistics from a training DataFrame: quantile
+    cut points, the proportion of rows in each resulting bin, mean and std.
+    Features with few distinct values (e.g. 'sex', 'cp') simply get fewer cuts.
+    """
+    values = X.to_numpy(dtype=np.float64)
+    cut_lists = []
+    for column in values.T:
+        cuts = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1], method='lower'))
+        # A cut at the minimum would only create an always-empty first bin.
+        cut_lists.append(cuts[cuts > column.min()])
+
+    cuts = _pad_cuts(cut_lists, bins - 1)
+    counts = _bin_counts(values, cuts)
+    return {
+        'features': list(X.columns),
+        'cuts': [c.tolist() for c in cut_lists],
+        'proportions': (counts / values.shape[0]).tolist(),
+        'mean': values.mean(axis=0).tolist(),
+        'std': values.std(axis=0).tolist(),
+        'count': int(values.shape[0])
+    }
+
+
+def save_reference_stats(stats, path=REFERENCE_STATS_PATH):
+    with open(path, 'w') as f:
+        json.dump(stats, f)
+
+
+def _pad_cuts(cut_lists, width):
+    """Pads ragged cut lists with +inf into one (features, width) array; +inf bins stay empty."""
+    cuts = np.full((len(cut_lists), width), np.inf)
+    for i, c in enumerate(cut_lists):
+        cuts[i, :len(c)] = c
+    return cuts
+
+
+def _bin_counts(values, cuts):
+    """Histogram counts, shape (features, width + 1), for a (rows, features) matrix in one pass."""
+    # A value's bin index is the number of cut points it is >= to.
+    index = (values[:, :, None] >= cuts[None, :, :]).sum(axis=2)
+    counts = np.zeros((values.shape[1], cuts.shape[1] + 1))
+    np.add.at(counts, (np.broadcast_to(np.arange(values.shape[1]), index.shape), index), 1)
+    return counts
+
+
+# --- Streaming sketches ---
+
+class Sketch:
+    """
+    O(1)-memory summary of a stream of feature rows: Welford count/mean/M2 per
+    feature plus fixed-bin histogram counts. Two sketches merge exactly, so
+    per-worker sketches can be combined through the shared state file.
+    """
+
+    def __init__(self, n_features, n_bins):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.counts = np.zeros((n_features, n_bins))
+
+    def update(self, values, cuts):
+        batch = Sketch(values.shape[1], self.counts.shape[1])
+        batch.count = values.shape[0]
+        batch.mean = values.mean(axis=0)
+        batch.m2 = ((values - batch.mean) ** 2).sum(axis=0)
+        batch.counts = _bin_counts(values, cuts)
+        self.merge(batch)
+
+    def merge(self, other):
+        """Chan et al.'s parallel combination of two Welford states, plus histogram addition."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / total)
+        self.count = total
+        self.counts = self.counts + other.counts
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean.tolist(), 'm2': self.m2.tolist(), 'counts': self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        counts = np.asarray(data['counts'], dtype=np.float64)
+        sketch = cls(counts.shape[0], counts.shape[1])
+        sketch.count = int(data['count'])
+        sketch.mean = np.asarray(data['mean'], dtype=np.float64)
+        sketch.m2 = np.asarray(data['m2'], dtype=np.float64)
+        sketch.counts = counts
+        return sketch
+
+
+def _ensure_configured():
+    """On first use, reads the drift settings from the app config and loads the reference statistics."""
+    global _configured, state_path, flush_rows, flush_seconds, reference, _pending
+    if _configured:
+        return
+    with _lock:
+        if _configured:
+            return
+        config = current_app.config
+        state_path = config['DRIFT_STATE_PATH']
+        flush_rows = config['DRIFT_FLUSH_ROWS']
+        flush_seconds = config['DRIFT_FLUSH_SECONDS']
+
+        if not config['DRIFT_MONITORING']:
+            reference = None
+        elif not os.path.exists(REFERENCE_STATS_PATH):
+            print(f"Drift monitoring disabled: '{REFERENCE_STATS_PATH}' not found. Run the training script to create it.")
+            reference = None
+        else:
+            with open(REFERENCE_STATS_PATH, 'r') as f:
+                stats = json.load(f)
+            stats['cuts_array'] = _pad_cuts([np.asarray(c) for c in stats['cuts']], REFERENCE_BINS - 1)
+            stats['proportions'] = np.asarray(stats['proportions'])
+            reference = stats
+            _pending = Sketch(len(stats['features']), REFERENCE_BINS)
+        _configured = True
+
+
+def observe(values):
+    """
+    Adds scored rows (a (rows, features) array in model_columns order) to this
+    process's sketch. Cheap enough to run on every request; every `flush_rows`
+    rows or `flush_seconds` the sketch is merged into the shared state file.
+    """
+    global _last_flush
+    _ensure_configured()
+    if reference is None:
+        return
+    values = np.asarray(values, dtype=np.float64).reshape(-1, len(reference['features']))
+    with _lock:
+        _pending.update(values, reference['cuts_array'])
+        due = _pending.count >= flush_rows or time.monotonic() - _last_flush >= flush_seconds
+    if due:
+        try:
+            flush()
+        except OSError as e:
+            print(f"Drift monitor: could not update '{state_path}': {e}")
+
+
+# --- Shared state file (merged across gunicorn workers) ---
+
+def _read_shared():
+    if state_path and os.path.exists(state_path):
+        with open(state_path, 'r') as f:
+            return Sketch.from_dict(json.load(f))
+    return Sketch(len(reference['features']), REFERENCE_BINS)
+
+
+def flush():
+    """Merges this process's pending sketch into the shared state file and resets it (only once the merge is written)."""
+    global _pending, _last_flush
+    _ensure_configured()
+    if reference is None or not state_path:
+        return
+    with _lock:
+        pending, _pending = _pending, Sketch(len(reference['features']), REFERENCE_BINS)
+        _last_flush = time.monotonic()
+    if pending.count == 0:
+        return
+    try:
+        with FileLock(state_path):
+            shared = _read_shared()
+            shared.merge(pending)
+            tmp_path = state_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(shared.to_dict(), f)
+            os.replace(tmp_path, state_path)
+    except Exception:
+        # Nothing reached the shared file: keep the rows for the next flush (merging is order-independent).
+        with _lock:
+            pending.merge(_pending)
+            _pending = pending
+        raise
+
+
+def reset():
+    """Clears the shared live statistics (e.g. after retraining on fresh data)."""
+    global _pending
+    _ensure_configured()
+    if reference is None:
+        return
+    with _lock:
+        _pending = Sketch(len(reference['features']), REFERENCE_BINS)
+    if state_path:
+        with FileLock(state_path):
+            if os.path.exists(state_path):
+                os.remove(state_path)
+
+
+# --- Drift scores ---
+
+def drift_report():
+    """
+    Returns per-feature drift scores of the live inputs (all workers) against the
+    training reference: PSI, a KS-style statistic (max CDF gap over the bins) and
+    the mean shift in reference standard deviations.
+    """
+    _ensure_configured()
+    if reference is None:
+        return None
+    with FileLock(state_path):
+        live = _read_shared()
+    with _lock:
+        live.merge(_pending)
+
+    report = {'live_count': live.count, 'reference_count': reference['count'], 'features': {}}
+    if live.count == 0:
+        return report
+
+    expected = reference['proportions']
+    actual = live.counts / live.count
+    live_std = np.sqrt(live.m2 / live.count)
+    for i, feature in enumerate(reference['features']):
+        n_bins = len(reference['cuts'][i]) + 1
+        e = np.clip(expected[i, :n_bins], EPSILON, None)
+        a = np.clip(actual[i, :n_bins], EPSILON, None)
+        psi = float(np.sum((a - e) * np.log(a / e)))
+        ks = float(np.max(np.abs(np.cumsum(actual[i, :n_bins]) - np.cumsum(expected[i, :n_bins]))))
+        ref_std = reference['std'][i] or 1.0
+        report['features'][feature] = {
+            'psi': round(psi, 4),
+            'ks': round(ks, 4),
+            'mean_shift_std': round(float((live.mean[i] - reference['mean'][i]) / ref_std), 4),
+            'live_mean': round(float(live.mean[i]), 4),
+            'live_std': round(float(live_std[i]), 4),
+            'reference_mean': round(reference['mean'][i], 4),
+            # Common PSI rule of thumb: < 0.1 stable, 0.1-0.25 moderate, > 0.25 significant.
+            'status': 'significant' if psi > 0.25 else 'moderate' if psi > 0.1 else 'stable'
+        }
+    return report
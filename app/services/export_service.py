@@ -0,0 +1,259 @@
+# app/services/export_service.py
+
+import csv
+import io
+import struct
+from datetime import datetime, time as datetime_time, timedelta
+
+from app import db
+from app.models import User, Prediction, ArchiveSegment
+from app.services import prediction_service, retention_service
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+RISK_CATEGORIES = ('Low', 'Medium', 'High')
+
+BASE_COLUMNS = ['prediction_id', 'timestamp', 'patient_id', 'patient_username', 'patient_email',
+                'prediction_result', 'risk_category', 'probability', 'model_version', 'archived']
+
+
+class ExportError(Exception):
+    """Invalid export parameters; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _parse_bound(value, name, end=False):
+    """Accepts YYYY-MM-DD (a whole day; inclusive for 'end') or an ISO datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"'{name}' must be a date (YYYY-MM-DD) or an ISO datetime")
+    if end and len(value) == 10:
+        parsed = datetime.combine(parsed.date(), datetime_time.min) + timedelta(days=1)
+        return parsed, False  # Exclusive upper bound: the next midnight
+    return parsed, True
+
+
+def parse_filters(args):
+    """Validates the query string of /doctor/export into a filters dict."""
+    fmt = (args.get('format') or 'csv').lower()
+    if fmt not in FORMATS:
+        raise ExportError(f"'format' must be one of: {', '.join(FORMATS)}")
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError('Parquet export requires pyarrow on the server; use format=csv.', 501)
+
+    start = _parse_bound(args.get('start'), 'start')
+    end = _parse_bound(args.get('end'), 'end', end=True)
+    risks = None
+    if args.get('risk'):
+        risks = [r.strip().capitalize() for r in args['risk'].split(',') if r.strip()]
+        unknown = [r for r in risks if r not in RISK_CATEGORIES]
+        if unknown:
+            raise ExportError(f"'risk' must be a comma-separated list of: {', '.join(RISK_CATEGORIES)}")
+    patient_id = args.get('patient_id')
+    if patient_id is not None:
+        try:
+            patient_id = int(patient_id)
+        except ValueError:
+            raise ExportError("'patient_id' must be an integer")
+    return {
+        'format': fmt,
+        'start': start[0] if start else None,
+        'end': end[0] if end else None,
+        'end_inclusive': end[1] if end else True,
+        'risks': risks,
+        'patient_id': patient_id,
+        'include_archived': args.get('include_archived') in ('1', 'true', 'yes')
+    }
+
+
+# --- Reading rows in chunks ---
+
+def _decoder(n_features):
+    """Returns a function mapping a packed feature_vector to its input features (or Nones)."""
+    layout = struct.Struct(f'<{n_features}f')
+    missing = (None,) * n_features
+
+    def decode(blob):
+        if not blob or len(blob) < layout.size:
+            return missing
+        return layout.unpack_from(blob)
+    return decode
+
+
+def _hot_chunks(filters, chunk_size, decode):
+    """Yields lists of rows from the predictions table, streamed from a server-side cursor."""
+    stmt = db.select(
+        Prediction.id, Prediction.timestamp, User.id, User.username, User.email,
+        Prediction.prediction_result, Prediction.risk_category, Prediction.probability,
+        Prediction.model_version, Prediction.feature_vector
+    ).join(User, Prediction.user_id == User.id).where(User.role == 'Patient')
+    if filters['start']:
+        stmt = stmt.where(Prediction.timestamp >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(Prediction.timestamp <= filters['end'] if filters['end_inclusive'] else Prediction.timestamp < filters['end'])
+    if filters['risks']:
+        stmt = stmt.where(Prediction.risk_category.in_(filters['risks']))
+    if filters['patient_id'] is not None:
+        stmt = stmt.where(Prediction.user_id == filters['patient_id'])
+    stmt = stmt.order_by(Prediction.id).execution_options(yield_per=chunk_size)
+
+    for partition in db.session.execute(stmt).partitions():
+        yield [(*row[:9], False, decode(row[9])) for row in partition]
+
+
+def _archived_chunks(filters, decode):
+    """Yields the matching rows of each archive segment in turn (one decoded segment in memory)."""
+    stmt = db.select(ArchiveSegment.payload, User.id, User.username, User.email).join(
+        User, ArchiveSegment.user_id == User.id
+    ).where(ArchiveSegment.kind == 'prediction', User.role == 'Patient')
+    # Segments entirely outside the date range are skipped without decoding them.
+    if filters['start']:
+        stmt = stmt.where(ArchiveSegment.end_timestamp >= filters['start'])
+    if filters['end']:
+        stmt = stmt.where(ArchiveSegment.start_timestamp <= filters['end'])
+    if filters['patient_id'] is not None:
+        stmt = stmt.where(ArchiveSegment.user_id == filters['patient_id'])
+    stmt = stmt.order_by(ArchiveSegment.id).execution_options(yield_per=1)
+
+    _, _, _, _, decode_segment = retention_service.ARCHIVES['prediction']
+    for payload, user_id, username, email in db.session.execute(stmt):
+        rows = []
+        for pred in sorted(decode_segment(payload), key=lambda p: p['id']):
+            timestamp = datetime.fromisoformat(pred['timestamp']) if pred['timestamp'] else None
+            if filters['start'] and (timestamp is None or timestamp < filters['start']):
+                continue
+            if filters['end'] and timestamp is not None and (
+                    timestamp > filters['end'] if filters['end_inclusive'] else timestamp >= filters['end']):
+                continue
+            if filters['risks'] and pred['risk_category'] not in filters['risks']:
+                continue
+            rows.append((pred['id'], timestamp, user_id, username, email, pred['prediction_result'],
+                         pred['risk_category'], pred['probability'], pred['model_version'], True,
+                         decode(pred['feature_vector'])))
+        if rows:
+            yield rows
+
+
+# --- Writers ---
+
+class _CsvWriter:
+    # Features are stored as float32: 7 significant digits round-trip them.
+    _format_feature = '{:.7g}'.format
+
+    def __init__(self, columns):
+        self._n_features = len(columns) - len(BASE_COLUMNS)
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+        self._csv.writerow(columns)
+
+    def _drain(self):
+        data = self._buffer.getvalue().encode('utf-8')
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def start(self):
+        return self._drain()
+
+    def write(self, rows):
+        for row in rows:
+            timestamp = row[1].isoformat() if row[1] else ''
+            probability = '' if row[7] is None else f'{row[7]:.6g}'
+            features = [''] * self._n_features if row[10][0] is None else map(self._format_feature, row[10])
+            self._csv.writerow([row[0], timestamp, *row[2:7], probability, row[8] or '', int(row[9]), *features])
+        return self._drain()
+
+    def close(self):
+        return b''
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands its contents back on drain(), for incremental Parquet output."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class _ParquetWriter:
+    """Writes each chunk as one Parquet row group, so only the current chunk is held in memory."""
+
+    def __init__(self, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._features = columns[len(BASE_COLUMNS):]
+        self._schema = pa.schema(
+            [('prediction_id', pa.int64()), ('timestamp', pa.timestamp('us')), ('patient_id', pa.int64()),
+             ('patient_username', pa.string()), ('patient_email', pa.string()), ('prediction_result', pa.int8()),
+             ('risk_category', pa.string()), ('probability', pa.float64()), ('model_version', pa.string()),
+             ('archived', pa.bool_())] + [(name, pa.float32()) for name in self._features]
+        )
+        self._sink = _Sink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression='zstd')
+
+    def start(self):
+        return self._sink.drain()
+
+    def write(self, rows):
+        columns = [list(values) for values in zip(*(row[:10] for row in rows))]
+        features = list(zip(*(row[10] for row in rows)))
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(columns + features, self._schema)],
+            schema=self._schema
+        )
+        self._writer.write_table(table)
+        return self._sink.drain()
+
+    def close(self):
+        self._writer.close()
+        return self._sink.drain()
+
+
+WRITERS = {'csv': _CsvWriter, 'parquet': _ParquetWriter}
+
+
+def stream_export(filters, chunk_size):
+    """
+    Generates the export file piece by piece: the header first (so the download
+    starts at once), then one piece per chunk of rows read from the cursor, then
+    archived rows if requested. Memory use depends on `chunk_size`, not on the
+    number of rows exported.
+    """
+    features = prediction_service.feature_columns()
+    decode = _decoder(len(features))
+    writer = WRITERS[filters['format']](BASE_COLUMNS + features)
+    yield writer.start()
+
+    chunks = _hot_chunks(filters, chunk_size, decode)
+    for chunk in chunks:
+        yield writer.write(chunk)
+    if filters['include_archived']:
+        for chunk in _archived_chunks(filters, decode):
+            yield writer.write(chunk)
+    yield writer.close()
@@ -0,0 +1,51 @@
+# app/services/file_lock.py
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a sidecar .lock file (fcntl on POSIX, msvcrt on Windows).
+    The OS releases it if the holding process dies, so it never needs cleaning up.
+    """
+
+    def __init__(self, path):
+        self.path = path + '.lock'
+        self.handle = None
+
+    def acquire(self, blocking=True):
+        """Takes the lock; with blocking=False returns False instead of waiting if it is held."""
+        self.handle = open(self.path, 'a+b')
+        try:
+            if fcntl:
+                fcntl.flock(self.handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            self.handle.close()
+            self.handle = None
+            if blocking:
+                raise
+            return False
+        return True
+
+    def release(self):
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+        self.handle = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
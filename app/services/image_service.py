@@ -0,0 +1,201 @@
+# app/services/image_service.py
+
+"""
+Profile pictures. An upload is checked from its header alone (format and pixel
+count, so a decompression bomb is rejected before any pixel is decoded), then
+rendered in a small worker pool: JPEGs are decoded in draft mode at the smallest
+libjpeg scale that still covers the largest size, and every size in
+PROFILE_IMAGE_SIZES is cropped square and encoded as JPEG and WebP.
+
+Renditions are stored content-addressed under profile_pics/ in the storage
+backend, keyed by the SHA-256 of the uploaded file. The same picture is
+therefore only rendered once, and a URL's content never changes.
+/profile-images/<digest>/<size>.<ext> is served from a local file (the file
+itself, or storage's read-through cache) with a one-year immutable
+Cache-Control and an ETag, and never touches PIL.
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+from app import db
+from app.models import User
+from app.services import storage, user_cache
+
+# URL extension -> (PIL format, MIME type, encoder options)
+FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+# Formats accepted for upload (as identified by PIL, not by file extension).
+INPUT_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ImageError(Exception):
+    """An uploaded picture that cannot be used; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _directory(digest):
+    return f'profile_pics/{digest[:2]}/{digest}'
+
+
+def _key(digest, size, ext):
+    return f'{_directory(digest)}/{size}.{ext}'
+
+
+def _executor():
+    """The process-wide render pool, created on first use with PROFILE_IMAGE_WORKERS threads."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=current_app.config['PROFILE_IMAGE_WORKERS'],
+                                           thread_name_prefix='profile-image')
+    return _pool
+
+
+def check(data, max_pixels):
+    """Identifies an upload from its header only. Raises ImageError for unsupported or oversized images."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        raise ImageError(f'The image is too large; the limit is {max_pixels} pixels', 413)
+    except (UnidentifiedImageError, OSError):
+        raise ImageError('The file is not a supported image')
+    if image_format not in INPUT_FORMATS:
+        raise ImageError(f'{image_format} images are not supported')
+    if width * height > max_pixels:
+        raise ImageError(f'The image is too large ({width}x{height}); the limit is {max_pixels} pixels', 413)
+
+
+def render(data, sizes):
+    """
+    Decodes an image once and returns {(size, ext): encoded bytes} for each square
+    size and output format. Runs in the worker pool; uses no app state.
+    """
+    from PIL import Image, ImageOps
+
+    largest = max(sizes)
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale, keeping both
+        # sides at least `largest` so the square crop needs no upscaling.
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+    rendered = {}
+    for size in sorted(sizes, reverse=True):
+        # Each size is cut from the previous (larger) one: cheaper, and the same crop.
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for ext, (image_format, _, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format, **options)
+            rendered[(size, ext)] = buffer.getvalue()
+    return rendered
+
+
+def _store(digest, rendered):
+    """Writes renditions to storage; each file appears atomically."""
+    files = storage.get_storage()
+    for (size, ext), data in rendered.items():
+        files.save(_key(digest, size, ext), io.BytesIO(data))
+
+
+def _is_rendered(digest, sizes):
+    files = storage.get_storage()
+    return all(files.exists(_key(digest, size, ext)) for size in sizes for ext in FORMATS)
+
+
+def urls(digest):
+    """{size: {ext: URL}} of a picture's renditions (None if the user has no picture)."""
+    if not digest:
+        return None
+    return {
+        size: {ext: f'/profile-images/{digest}/{size}.{ext}' for ext in FORMATS}
+        for size in current_app.config['PROFILE_IMAGE_SIZES']
+    }
+
+
+def rendition_path(digest, size, ext):
+    """Local path of a stored rendition, or None if the request does not name one."""
+    if not DIGEST_PATTERN.match(digest) or ext not in FORMATS or size not in current_app.config['PROFILE_IMAGE_SIZES']:
+        return None
+    try:
+        # Content-addressed, so a cached copy never needs revalidating.
+        return storage.get_storage().local_path(_key(digest, size, ext), verify=False)
+    except FileNotFoundError:
+        return None
+
+
+def release(digest):
+    """
+    Removes a picture's renditions unless some user still has it as their
+    profile picture. Returns the number of files removed.
+    """
+    if not digest or not DIGEST_PATTERN.match(digest):
+        return 0
+    if db.session.query(User.id).filter(User.profile_image == digest).first() is not None:
+        return 0
+    files = storage.get_storage()
+    # Listed rather than derived from PROFILE_IMAGE_SIZES: older sizes may be stored too.
+    return sum(files.delete(key) for key in list(files.keys(_directory(digest))))
+
+
+def save_profile_picture(user_id, source):
+    """
+    Makes an uploaded picture (a file object or a path) the user's profile
+    picture: renders it unless that exact file was rendered before, points the
+    user at it and drops their previous picture if nobody else uses it.
+    Returns the new picture's URLs. Raises ImageError for unusable uploads.
+    """
+    config = current_app.config
+    sizes = config['PROFILE_IMAGE_SIZES']
+    limit = config['PROFILE_IMAGE_MAX_BYTES']
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            data = f.read(limit + 1)
+    else:
+        data = source.read(limit + 1)
+    if len(data) > limit:
+        raise ImageError(f'Profile pictures are limited to {limit // (1024 * 1024)} MB', 413)
+    digest = hashlib.sha256(data).hexdigest()
+
+    if not _is_rendered(digest, sizes):
+        check(data, config['PROFILE_IMAGE_MAX_PIXELS'])
+        try:
+            rendered = _executor().submit(render, data, sizes).result()
+        except OSError:  # Truncated or corrupt past the header
+            raise ImageError('The image could not be decoded')
+        _store(digest, rendered)
+
+    user = db.session.get(User, int(user_id))
+    previous, user.profile_image = user.profile_image, digest
+    db.session.commit()
+    user_cache.invalidate(user.id)
+    if previous and previous != digest:
+        release(previous)
+    return urls(digest)
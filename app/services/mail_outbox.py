@@ -0,0 +1,188 @@
+# app/services/mail_outbox.py
+
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import and_
+
+from app import db, mail
+from app.models import User, EmailOutbox
+
+DEFAULT_SENDER = 'noreply@demo.com'
+
+_worker_thread = None
+_stop_event = threading.Event()
+
+
+def enqueue(recipient, subject, body):
+    """Queues a plain email. The caller is responsible for committing the session."""
+    message = EmailOutbox(template='plain', recipient=recipient, subject=subject, body=body)
+    db.session.add(message)
+    return message
+
+
+def enqueue_password_reset(email):
+    """
+    Queues a password reset email for whatever address was submitted.
+
+    The account lookup and token generation happen later in the sender, so the
+    request that calls this does exactly the same work (one INSERT) whether or
+    not an account with that email exists.
+    """
+    message = EmailOutbox(template='password_reset', recipient=email)
+    db.session.add(message)
+    return message
+
+
+def _render(outbox_row):
+    """Builds a flask_mail Message for an outbox row, or returns None if it should be dropped."""
+    if outbox_row.template == 'password_reset':
+        user = User.query.filter_by(email=outbox_row.recipient).first()
+        if user is None:
+            return None
+        token = user.get_reset_token()
+        msg = Message('Password Reset Request', sender=DEFAULT_SENDER, recipients=[user.email])
+        msg.body = f'To reset your password, please use the following token:\n{token}\nIf you did not make this request then simply ignore this email.'
+        return msg
+
+    msg = Message(outbox_row.subject, sender=DEFAULT_SENDER, recipients=[outbox_row.recipient])
+    msg.body = outbox_row.body
+    return msg
+
+
+def _schedule_retry(outbox_row, error, now):
+    """Records a failed attempt and backs off exponentially, giving up after MAIL_OUTBOX_MAX_ATTEMPTS."""
+    config = current_app.config
+    outbox_row.attempts += 1
+    outbox_row.last_error = str(error)[:1000]
+    if outbox_row.attempts >= config['MAIL_OUTBOX_MAX_ATTEMPTS']:
+        outbox_row.status = 'failed'
+    else:
+        outbox_row.status = 'pending'
+        delay = min(config['MAIL_OUTBOX_BACKOFF_BASE'] * (2 ** (outbox_row.attempts - 1)),
+                    config['MAIL_OUTBOX_BACKOFF_MAX'])
+        outbox_row.next_attempt_at = now + timedelta(seconds=delay)
+
+
+def _claim(batch_size, now):
+    """
+    Marks up to `batch_size` due messages as 'sending' for this sender and returns
+    them. Every web process may run a sender, so each row is taken with a
+    conditional UPDATE: a row another sender claimed first no longer matches.
+    The claim is a lease of MAIL_OUTBOX_LEASE seconds (kept in next_attempt_at);
+    rows of a sender that died mid-batch become due again when it runs out, so
+    such a message may be sent twice, but never by two live senders.
+    """
+    due = and_(EmailOutbox.status.in_(('pending', 'sending')), EmailOutbox.next_attempt_at <= now)
+    candidates = [row.id for row in db.session.query(EmailOutbox.id).filter(due).order_by(EmailOutbox.id).limit(batch_size)]
+    lease_until = now + timedelta(seconds=current_app.config['MAIL_OUTBOX_LEASE'])
+    claimed = [
+        message_id for message_id in candidates
+        if EmailOutbox.query.filter(EmailOutbox.id == message_id, due).update(
+            {'status': 'sending', 'next_attempt_at': lease_until}, synchronize_session=False)
+    ]
+    db.session.commit()
+    if not claimed:
+        return []
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+
+
+def deliver_pending(batch_size=None):
+    """
+    Claims one batch of due messages and sends it over a single SMTP connection.
+    Returns a dict with the number of messages sent, dropped and retried.
+    """
+    batch_size = batch_size or current_app.config['MAIL_OUTBOX_BATCH_SIZE']
+    now = datetime.utcnow()
+    batch = _claim(batch_size, now)
+
+    result = {'sent': 0, 'dropped': 0, 'retried': 0}
+    if not batch:
+        return result
+
+    sent_ids = []
+    dropped_ids = []
+    retried_ids = []
+    try:
+        # mail.connect() opens one SMTP session (handshake, STARTTLS, login)
+        # and reuses it for every message in the batch.
+        with mail.connect() as conn:
+            for outbox_row in batch:
+                msg = _render(outbox_row)
+                if msg is None:
+                    dropped_ids.append(outbox_row.id)
+                    continue
+                try:
+                    conn.send(msg)
+                    sent_ids.append(outbox_row.id)
+                except Exception as e:
+                    _schedule_retry(outbox_row, e, now)
+                    retried_ids.append(outbox_row.id)
+    except Exception as e:
+        # The connection itself failed; everything not yet sent is retried later.
+        print(f"Email outbox: SMTP connection error: {e}")
+        handled = set(sent_ids) | set(dropped_ids) | set(retried_ids)
+        for outbox_row in batch:
+            if outbox_row.id not in handled:
+                _schedule_retry(outbox_row, e, now)
+                retried_ids.append(outbox_row.id)
+
+    if sent_ids:
+        EmailOutbox.query.filter(EmailOutbox.id.in_(sent_ids)).update(
+            {'status': 'sent', 'sent_at': now}, synchronize_session=False)
+    if dropped_ids:
+        EmailOutbox.query.filter(EmailOutbox.id.in_(dropped_ids)).update(
+            {'status': 'dropped'}, synchronize_session=False)
+    db.session.commit()
+
+    result['sent'] = len(sent_ids)
+    result['dropped'] = len(dropped_ids)
+    result['retried'] = len(retried_ids)
+    return result
+
+
+def drain(batch_size=None):
+    """Delivers batches until no due messages remain. Returns the summed counters."""
+    totals = {'sent': 0, 'dropped': 0, 'retried': 0}
+    while True:
+        result = deliver_pending(batch_size)
+        for key in totals:
+            totals[key] += result[key]
+        if not any(result.values()):
+            return totals
+
+
+def run_worker(app, stop_event=None):
+    """Polls the outbox and delivers due messages until stop_event is set."""
+    stop_event = stop_event or _stop_event
+    interval = app.config['MAIL_OUTBOX_POLL_INTERVAL']
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                result = deliver_pending()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Email outbox: delivery loop error: {e}")
+                result = {}
+        # Keep going immediately while there is a backlog, otherwise wait.
+        if not result.get('sent') and not result.get('dropped'):
+            stop_event.wait(interval)
+
+
+def start_worker(app):
+    """Starts the background sender thread for this process (idempotent)."""
+    global _worker_thread
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return _worker_thread
+    _stop_event.clear()
+    _worker_thread = threading.Thread(target=run_worker, args=(app,), name='mail-outbox', daemon=True)
+    _worker_thread.start()
+    return _worker_thread
+
+
+def stop_worker(timeout=5):
+    """Signals the background sender thread to stop and waits for it."""
+    _stop_event.set()
+    if _worker_thread is not None:
+        _worker_thread.join(timeout)
@@ -0,0 +1,206 @@
+# app/services/model_variants.py
+
+"""
+Compact variants of the heart disease model, built by train_model.py next to
+the full pipeline: a few trees picked from a larger forest by greedy ensemble
+selection, depth-capped forests, and a logistic regression. Each is saved as a
+Pipeline (scaler + classifier) with its own SHAP explainer, and the manifest
+records its test accuracy/AUC and the p50/p99 latency of one /predict request
+(probability plus SHAP explanation).
+
+prediction_service loads the most accurate variant whose p99 fits the
+MODEL_LATENCY_BUDGET_MS setting. `flask model-variants` prints the report with
+the Pareto frontier, and `--profile` re-measures latency on the current host.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'ml_models')
+VARIANTS_DIR = os.path.join(MODEL_DIR, 'variants')
+MANIFEST_PATH = os.path.join(VARIANTS_DIR, 'manifest.json')
+
+# The full model trained by train_model.py; always part of the family.
+FULL = 'full'
+
+PROFILE_REQUESTS = 200
+PROFILE_INPUT_ROWS = 50
+
+
+# --- Building variants ---
+
+def greedy_tree_selection(forest, X_val, y_val, sizes):
+    """
+    Greedy forward selection of trees from a fitted random forest: starting from
+    an empty ensemble, repeatedly add the tree that most improves validation AUC
+    (ties broken by Brier score). Returns {size: compact forest with those trees}.
+    """
+    import copy
+    import numpy as np
+    from sklearn.metrics import roc_auc_score
+
+    y_val = np.asarray(y_val)
+    positive = list(forest.classes_).index(1)
+    tree_probs = np.array([tree.predict_proba(X_val)[:, positive] for tree in forest.estimators_])
+
+    selected, remaining, total = [], list(range(len(tree_probs))), np.zeros(len(y_val))
+    compact = {}
+    for size in range(1, max(sizes) + 1):
+        def score(i):
+            probs = (total + tree_probs[i]) / size
+            return roc_auc_score(y_val, probs), -np.mean((probs - y_val) ** 2)
+        best = max(remaining, key=score)
+        remaining.remove(best)
+        selected.append(best)
+        total += tree_probs[best]
+        if size in sizes:
+            model = copy.deepcopy(forest)
+            model.estimators_ = [forest.estimators_[i] for i in selected]
+            model.n_estimators = len(selected)
+            compact[size] = model
+    return compact
+
+
+def evaluate(pipeline, X_test, y_test):
+    """Test-set accuracy and ROC AUC of a fitted pipeline."""
+    from sklearn.metrics import roc_auc_score
+
+    probs = pipeline.predict_proba(X_test)[:, list(pipeline.classes_).index(1)]
+    return {'accuracy': float(pipeline.score(X_test, y_test)), 'auc': float(roc_auc_score(y_test, probs))}
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def profile(pipeline, explainer, inputs, requests=PROFILE_REQUESTS):
+    """
+    Latency of single-row requests, replaying `inputs` (a DataFrame in
+    model_columns order) one row at a time as /predict does: predict_proba, then
+    the SHAP explanation. Returns p50/p99 in milliseconds for both.
+    """
+    import inspect
+
+    rows = [inputs.iloc[[i % len(inputs)]] for i in range(requests)]
+    scaler = pipeline.named_steps['scaler']
+    # Timing only: skip SHAP's additivity self-check, which float32 threshold ties can trip.
+    options = {'check_additivity': False} if 'check_additivity' in inspect.signature(explainer.shap_values).parameters else {}
+    for row in rows[:5]:  # Warm-up: first-call setup is not part of steady-state latency
+        pipeline.predict_proba(row)
+        explainer.shap_values(scaler.transform(row), **options)
+
+    predict_ms, total_ms = [], []
+    for row in rows:
+        start = time.perf_counter()
+        pipeline.predict_proba(row)
+        scored = time.perf_counter()
+        explainer.shap_values(scaler.transform(row), **options)
+        done = time.perf_counter()
+        predict_ms.append((scored - start) * 1000)
+        total_ms.append((done - start) * 1000)
+    return {
+        'predict_p50_ms': round(_percentile(predict_ms, 50), 3), 'predict_p99_ms': round(_percentile(predict_ms, 99), 3),
+        'p50_ms': round(_percentile(total_ms, 50), 3), 'p99_ms': round(_percentile(total_ms, 99), 3)
+    }
+
+
+def make_explainer(pipeline, background):
+    """SHAP explainer for a pipeline's classifier, like the full model's (Tree or Linear, picked by SHAP)."""
+    import shap
+    return shap.Explainer(pipeline.named_steps['classifier'], background)
+
+
+# --- Manifest, frontier and selection ---
+
+def pareto_frontier(variants):
+    """Names of the variants no other variant beats on both AUC and p99 latency."""
+    frontier = []
+    for v in variants:
+        dominated = any(
+            o['auc'] >= v['auc'] and o['p99_ms'] <= v['p99_ms'] and (o['auc'] > v['auc'] or o['p99_ms'] < v['p99_ms'])
+            for o in variants
+        )
+        if not dominated:
+            frontier.append(v['name'])
+    return frontier
+
+
+def save_manifest(variants, profile_inputs):
+    """Writes the manifest (variants sorted by p99, Pareto flags set) and returns it."""
+    frontier = set(pareto_frontier(variants))
+    for v in variants:
+        v['pareto'] = v['name'] in frontier
+    manifest = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'profile_requests': PROFILE_REQUESTS,
+        # A few test rows (inputs only), so latency can be re-measured on another host.
+        'profile_inputs': profile_inputs.head(PROFILE_INPUT_ROWS).values.tolist(),
+        'variants': sorted(variants, key=lambda v: v['p99_ms'])
+    }
+    os.makedirs(VARIANTS_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest():
+    """The variant manifest, or None if train_model.py has not produced one."""
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def select_variant(manifest, budget_ms):
+    """
+    The most accurate variant (highest AUC, then lowest p99) whose p99 request
+    latency fits `budget_ms`; the fastest one if none fits.
+    """
+    variants = manifest['variants']
+    fitting = [v for v in variants if v['p99_ms'] <= budget_ms]
+    if not fitting:
+        return min(variants, key=lambda v: v['p99_ms'])
+    return max(fitting, key=lambda v: (v['auc'], -v['p99_ms']))
+
+
+def artifact_paths(variant):
+    """Absolute (pipeline, explainer) paths of a manifest entry."""
+    return os.path.join(MODEL_DIR, variant['pipeline']), os.path.join(MODEL_DIR, variant['explainer'])
+
+
+def reprofile(manifest, columns):
+    """Re-measures every variant's latency on this host and rewrites the manifest."""
+    import pickle
+    import pandas as pd
+
+    inputs = pd.DataFrame(manifest['profile_inputs'], columns=columns)
+    for v in manifest['variants']:
+        pipeline_path, explainer_path = artifact_paths(v)
+        with open(pipeline_path, 'rb') as f:
+            pipeline = pickle.load(f)
+        with open(explainer_path, 'rb') as f:
+            explainer = pickle.load(f)
+        v.update(profile(pipeline, explainer, inputs))
+    return save_manifest(manifest['variants'], inputs)
+
+
+def format_report(manifest, budget_ms=None):
+    """Text table of the variants, fastest first, marking the Pareto frontier (*) and the selection (>)."""
+    selected = select_variant(manifest, budget_ms)['name'] if budget_ms is not None else FULL
+    lines = [
+        f"Model variants (profiled {manifest['created_at']}, {manifest['profile_requests']} single-row requests)",
+        f"  {'variant':22}{'accuracy':>9}{'AUC':>8}{'proba p99':>11}{'p50':>9}{'p99':>9}{'size':>9}",
+    ]
+    for v in manifest['variants']:
+        marker = ('>' if v['name'] == selected else ' ') + ('*' if v['pareto'] else ' ')
+        lines.append(
+            f"{marker}{v['name']:22}{v['accuracy']:9.4f}{v['auc']:8.4f}{v['predict_p99_ms']:9.2f}ms"
+            f"{v['p50_ms']:7.2f}ms{v['p99_ms']:7.2f}ms{v['size_bytes'] / 1024:7.0f}KB"
+        )
+    lines.append("  * Pareto frontier (no other variant is both more accurate and faster)")
+    lines.append(f"  > served with MODEL_LATENCY_BUDGET_MS={budget_ms}")
+    return '\n'.join(lines)
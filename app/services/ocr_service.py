@@ -1,21 +1,24 @@
 # app/services/ocr_service.py
 
-import pytesseract
-from PIL import Image
 from flask import current_app
 
 def configure_pytesseract():
     """Configures pytesseract to use the path from the app's config."""
+    import pytesseract
     pytesseract.pytesseract.tesseract_cmd = current_app.config['TESSERACT_CMD']
 
-def extract_text_from_image(filepath):
+def extract_text_from_image(source):
     """
-    Extracts text from an image file using Tesseract OCR.
+    Extracts text from an image using Tesseract OCR. `source` is a path or a
+    seekable binary file object, such as one from storage.open().
     Returns the extracted text as a string.
     """
     try:
+        # Imported here so the app starts without loading PIL/pytesseract.
+        import pytesseract
+        from PIL import Image
         configure_pytesseract()
-        text = pytesseract.image_to_string(Image.open(filepath))
+        text = pytesseract.image_to_string(Image.open(source))
         return text
     except Exception as e:
         print(f"An error occurred during OCR processing: {e}")
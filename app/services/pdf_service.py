@@ -1,10 +1,14 @@
 # app/services/pdf_service.py
 
-from fpdf import FPDF
 import io
 
-def create_prediction_report(prediction, user):
-    """Generates a PDF report for a given prediction and returns it as bytes."""
+def create_prediction_report(prediction, user, out=None):
+    """
+    Generates a PDF report for a given prediction and writes it to `out`, any
+    writable binary stream (a new BytesIO by default). Returns the stream,
+    rewound if it is seekable.
+    """
+    from fpdf import FPDF  # Imported on first export to keep app startup light
     
     pdf = FPDF()
     pdf.add_page()
@@ -26,9 +30,13 @@ def create_prediction_report(prediction, user):
     pdf.set_font('Helvetica', '', 12)
     pdf.cell(0, 10, f"Risk Category: {prediction.risk_category}", 0, 1)
     
-    # --- THIS IS THE FIX ---
-    # The .output('S') method returns bytes directly. The .encode() call is removed.
+    # fpdf2 returns bytes; PyFPDF 1.x returns a latin-1 str.
     pdf_bytes = pdf.output(dest='S')
-    # ---------------------
-    
-    return io.BytesIO(pdf_bytes)
\ No newline at end of file
+    if isinstance(pdf_bytes, str):
+        pdf_bytes = pdf_bytes.encode('latin-1')
+
+    out = io.BytesIO() if out is None else out
+    out.write(pdf_bytes)
+    if out.seekable():
+        out.seek(0)
+    return out
\ No newline at end of file
@@ -0,0 +1,171 @@
+# app/services/prediction_log.py
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime
+from flask import current_app
+
+from app import db
+from app.models import Prediction
+from app.services import cohort_service
+
+# Rows waiting for the background writer: (fields, Future or None).
+_queue = None
+_worker_thread = None
+_stop_event = threading.Event()
+_start_lock = threading.Lock()
+_stats = {'written': 0, 'batches': 0, 'max_batch': 0, 'failed': 0, 'direct': 0}
+
+
+class PredictionLogError(Exception):
+    """The prediction could not be confirmed as stored; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=503):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def save(**fields):
+    """
+    Stores one Prediction row according to PREDICTION_LOG_MODE:
+      'sync'  - INSERT and commit now, in the request's session.
+      'group' - hand the row to the background writer and wait until the batch
+                containing it is committed (one commit for many requests).
+      'async' - hand the row to the background writer and return immediately.
+    """
+    config = current_app.config
+    mode = config['PREDICTION_LOG_MODE']
+    # Stamped now rather than at flush time, so history order matches request order.
+    fields.setdefault('timestamp', datetime.utcnow())
+    if mode == 'sync':
+        _insert(fields)
+        return
+
+    start_worker(current_app._get_current_object())
+    timeout = config['PREDICTION_LOG_FLUSH_TIMEOUT']
+    future = Future() if mode == 'group' else None
+    # Blocks when the queue is full, which applies back-pressure instead of growing without bound.
+    try:
+        _queue.put((fields, future), timeout=timeout)
+    except queue.Full:
+        # The writer is stuck or gone: store the row in the request rather than hang.
+        _stats['direct'] += 1
+        _insert(fields)
+        return
+    if future is not None:
+        try:
+            future.result(timeout)
+        except FutureTimeout:
+            # The row is still queued and may yet be written, so inserting it here could duplicate it.
+            raise PredictionLogError('The prediction could not be saved in time; please try again shortly.')
+
+
+def _insert(fields):
+    """INSERT and commit one row in the request's session."""
+    db.session.add(Prediction(**fields))
+    cohort_service.record([fields])
+    db.session.commit()
+
+
+def _collect_batch(batch_size, linger):
+    """Waits for a first row, then gathers more for up to `linger` seconds or until the batch is full."""
+    try:
+        batch = [_queue.get(timeout=0.5)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + linger
+    while len(batch) < batch_size:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(_queue.get(timeout=remaining) if remaining > 0 else _queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write_batch(batch):
+    """Inserts a batch (and its cohort rollup update) in one transaction and resolves the waiting requests."""
+    try:
+        rows = [fields for fields, _ in batch]
+        db.session.bulk_insert_mappings(Prediction, rows)
+        cohort_service.record(rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if len(batch) > 1:
+            # Retry row by row, so one bad row does not fail every request in its group.
+            for item in batch:
+                _write_batch([item])
+            return
+        _stats['failed'] += 1
+        print(f"Prediction log: could not write a prediction: {e}")
+        _, future = batch[0]
+        if future is not None:
+            # The same 503 as a timeout; the request does not see the database error.
+            future.set_exception(PredictionLogError('The prediction could not be saved; please try again shortly.'))
+        return
+    _stats['written'] += len(batch)
+    _stats['batches'] += 1
+    _stats['max_batch'] = max(_stats['max_batch'], len(batch))
+    for _, future in batch:
+        if future is not None:
+            future.set_result(None)
+
+
+def run_worker(app, stop_event=None):
+    """Commits queued rows in groups until stop_event is set and the queue is empty."""
+    stop_event = stop_event or _stop_event
+    batch_size = app.config['PREDICTION_LOG_BATCH_SIZE']
+    linger = app.config['PREDICTION_LOG_FLUSH_INTERVAL']
+    while not (stop_event.is_set() and _queue.empty()):
+        # While stopping, flush whatever is left without lingering.
+        batch = _collect_batch(batch_size, 0 if stop_event.is_set() else linger)
+        if batch:
+            with app.app_context():
+                _write_batch(batch)
+
+
+def start_worker(app):
+    """Starts the background writer thread for this process (idempotent)."""
+    global _queue, _worker_thread
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return _worker_thread
+    with _start_lock:
+        if _worker_thread is not None and _worker_thread.is_alive():
+            return _worker_thread
+        if _queue is None:
+            _queue = queue.Queue(maxsize=app.config['PREDICTION_LOG_MAX_QUEUE'])
+            atexit.register(stop_worker)
+        _stop_event.clear()
+        _worker_thread = threading.Thread(target=run_worker, args=(app,), name='prediction-log', daemon=True)
+        _worker_thread.start()
+    return _worker_thread
+
+
+def stop_worker(timeout=30):
+    """Flushes every queued row and stops the writer. Runs automatically at interpreter exit."""
+    _stop_event.set()
+    if _worker_thread is not None:
+        _worker_thread.join(timeout)
+    if _queue is None or _queue.empty():
+        return
+    # Whatever the writer did not get to is lost; fail the requests still waiting on it.
+    lost = 0
+    while True:
+        try:
+            _, future = _queue.get_nowait()
+        except queue.Empty:
+            break
+        lost += 1
+        if future is not None and not future.done():
+            future.set_exception(PredictionLogError('The prediction log is shutting down; the prediction was not saved.'))
+    _stats['failed'] += lost
+    print(f"Prediction log: {lost} predictions were not written before shutdown.")
+
+
+def stats():
+    return dict(_stats, pending=_queue.qsize() if _queue is not None else 0)
@@ -1,10 +1,15 @@
 import pickle
 import json
 import os
-import pandas as pd
-import shap
+import hashlib
+import threading
 from datetime import datetime, timedelta
 
+# pandas (and shap, which unpickling the explainer pulls in) are imported on first
+# use rather than here, so processes that never predict (CLI commands such as
+# `flask db upgrade`, or a worker that has not finished warming up) do not pay
+# seconds of import time.
+
 # Define paths to model artifacts
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_DIR = os.path.join(os.path.dirname(BASE_DIR), 'ml_models')
@@ -15,6 +20,23 @@ SHAP_EXPLAINER_PATH = os.path.join(MODEL_DIR, 'shap_explainer.pkl')
 pipeline = None
 model_columns = None
 explainer = None
+model_version = None  # Short hash of the pipeline artifact, stored with each prediction
+
+# Compact model variants (see model_variants): with a latency budget set (by
+# create_app, from MODEL_LATENCY_BUDGET_MS), load_models() serves the most
+# accurate variant whose profiled p99 request latency fits it.
+latency_budget_ms = None
+variant_name = None
+_explainer_checks_additivity = True
+
+# Layout of Prediction.feature_vector: little-endian float32, the input features
+# in model_columns order followed by their SHAP contributions in the same order.
+# Contributions are NaN when they were not computed (see rescoring_service).
+VECTOR_DTYPE = '<f4'
+
+_load_lock = threading.Lock()
+_warm_up_thread = None
+warm_up_error = None
 
 # --- === NEW: RECOMMENDATION MAPPING === ---
 # This maps feature names to actionable advice.
@@ -30,63 +52,220 @@ RECOMMENDATION_MAP = {
 }
 # ---------------------------------------------
 
+# Upper bound on the number of values per varied feature in a what-if request,
+# so a single request scores at most MAX_WHAT_IF_STEPS ** 2 rows.
+MAX_WHAT_IF_STEPS = 100
+
 def calculate_streak(predictions):
     """
-    Calculates the user's prediction streak.
-    (This function is unchanged)
+    Calculates the user's prediction streak: the number of consecutive 7-day
+    periods, counting back from now, that contain at least one prediction.
+    Accepts anything with a `.timestamp` attribute (model instances or query rows).
     """
     if not predictions:
         return 0
 
     today = datetime.utcnow()
+    week = timedelta(days=7)
+
+    # Bucket every prediction into "weeks ago" once, instead of rescanning the
+    # whole history for each of the 52 weekly windows.
+    weeks_with_prediction = set()
+    for p in predictions:
+        age = today - p.timestamp
+        if age >= timedelta(0):
+            weeks_with_prediction.add(age // week)
+
     streak = 0
+    while streak < 52 and streak in weeks_with_prediction: # Check up to a year of weeks
+        streak += 1
 
-    # We check week by week, going backwards from today
-    for i in range(52): # Check up to a year of weeks
-        start_of_period = today - timedelta(days=7 * (i + 1))
-        end_of_period = today - timedelta(days=7 * i)
+    return streak
 
-        # Check if there was any prediction within this 7-day window
-        has_prediction_in_period = any(
-            start_of_period < p.timestamp <= end_of_period
-            for p in predictions
-        )
+def configure(budget_ms):
+    """Sets the per-request latency budget used to pick a model variant on the next load."""
+    global latency_budget_ms
+    latency_budget_ms = budget_ms
 
-        if has_prediction_in_period:
-            streak += 1
-        else:
-            # If we find a week with no prediction, the streak is broken
-            break 
+def _artifact_paths():
+    """(variant name, pipeline path, explainer path) to load for the current latency budget."""
+    from app.services import model_variants
 
-    return streak
+    if latency_budget_ms is not None:
+        manifest = model_variants.load_manifest()
+        if manifest is not None:
+            variant = model_variants.select_variant(manifest, latency_budget_ms)
+            return (variant['name'],) + model_variants.artifact_paths(variant)
+        print("No model variants found (run train_model.py); serving the full model.")
+    return model_variants.FULL, PIPELINE_PATH, SHAP_EXPLAINER_PATH
 
 def load_models():
     """Loads the pipeline, model columns, and SHAP explainer from disk."""
-    global pipeline, model_columns, explainer
+    global pipeline, model_columns, explainer, model_version, variant_name, _explainer_checks_additivity
+    import inspect
+    from app.services import model_variants
 
     try:
+        name, pipeline_path, explainer_path = _artifact_paths()
         # Load saved ML model pipeline
-        with open(PIPELINE_PATH, 'rb') as f:
-            pipeline = pickle.load(f)
+        with open(pipeline_path, 'rb') as f:
+            pipeline_bytes = f.read()
+        pipeline = pickle.loads(pipeline_bytes)
+        model_version = hashlib.sha256(pipeline_bytes).hexdigest()[:12]
 
         with open(COLUMNS_PATH, 'r') as f:
             model_columns = json.load(f)
             
         # Load the SHAP explainer
-        with open(SHAP_EXPLAINER_PATH, 'rb') as f:
+        with open(explainer_path, 'rb') as f:
             explainer = pickle.load(f)
+        # Tree explainers take check_additivity; the logistic variant's linear explainer does not.
+        _explainer_checks_additivity = 'check_additivity' in inspect.signature(explainer.shap_values).parameters
+        variant_name = name
 
-        print("Prediction pipeline, columns, and SHAP explainer loaded successfully.")
+        if name == model_variants.FULL:
+            print("Prediction pipeline, columns, and SHAP explainer loaded successfully.")
+        else:
+            print(f"Prediction pipeline, columns, and SHAP explainer loaded successfully (variant '{name}', "
+                  f"latency budget {latency_budget_ms} ms).")
     except FileNotFoundError as e:
         print(f"Error loading model artifacts: {e}. Please run the training script first.")
         raise
 
+def models_loaded():
+    """Returns True once the pipeline, columns and explainer are all in memory."""
+    return pipeline is not None and model_columns is not None and explainer is not None
+
+def ensure_models_loaded():
+    """Loads the model artifacts on first use. Safe to call from several threads at once."""
+    if models_loaded():
+        return
+    with _load_lock:
+        if not models_loaded():
+            load_models()
+
+def feature_columns():
+    """Input feature names in feature_vector order, read without loading the model."""
+    if model_columns is not None:
+        return list(model_columns)
+    with open(COLUMNS_PATH, 'r') as f:
+        return json.load(f)
+
+def warm_up():
+    """
+    Loads the models and runs one throwaway prediction, so the first real request
+    does not pay for the lazy imports or SHAP's first-call setup.
+    """
+    ensure_models_loaded()
+    # Not a real patient, so keep it out of the drift statistics.
+    predict_with_record({col: 0 for col in model_columns}, monitor=False)
+
+def start_warm_up():
+    """Runs warm_up() in a background thread (idempotent). Check models_loaded() for readiness."""
+    global _warm_up_thread
+
+    def run():
+        global warm_up_error
+        try:
+            warm_up()
+        except Exception as e:
+            warm_up_error = str(e)
+            print(f"Model warm-up failed: {e}")
+
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=run, name='model-warm-up', daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
+
+def risk_category(probability):
+    """Maps a probability of heart disease to the Low/Medium/High risk category."""
+    if probability < 0.3:
+        return "Low"
+    elif probability < 0.7:
+        return "Medium"
+    else:
+        return "High"
+
+def _positive_class_contributions(input_scaled, check_additivity=True):
+    """SHAP contributions towards class 1, shape (rows, features), for any loaded explainer."""
+    import numpy as np
+
+    if _explainer_checks_additivity:
+        values = explainer.shap_values(input_scaled, check_additivity=check_additivity)
+    else:
+        values = explainer.shap_values(input_scaled)
+    values = np.asarray(values)
+    # Tree explainers return one slice per class; the linear one returns class 1 (log-odds) only.
+    return values[:, :, 1] if values.ndim == 3 else values
+
+def base_value():
+    """The explainer's expected value for class 1."""
+    import numpy as np
+    return np.ravel(explainer.expected_value)[-1]
+
+def score_matrix(matrix, with_contributions=True):
+    """
+    Scores many rows at once (a (rows, features) array in model_columns order) with a
+    single predict_proba call, and optionally one vectorized SHAP call.
+    Returns a dict of arrays: prediction, probability, risk_category, contributions.
+    Nothing is added to the drift statistics; use this for stored or synthetic inputs.
+    """
+    import numpy as np
+    import pandas as pd
+
+    ensure_models_loaded()
+    df = pd.DataFrame(np.asarray(matrix, dtype=np.float64), columns=model_columns)
+    proba = pipeline.predict_proba(df)
+    probabilities = proba[:, 1]
+
+    result = {
+        "prediction": pipeline.classes_.take(np.argmax(proba, axis=1)).astype(int),
+        "probability": probabilities,
+        "risk_category": np.select([probabilities < 0.3, probabilities < 0.7], ["Low", "Medium"], "High"),
+        "contributions": None
+    }
+    if with_contributions:
+        input_scaled = pipeline.named_steps['scaler'].transform(df)
+        # A single row failing SHAP's additivity self-check (float32 threshold ties)
+        # must not abort the whole batch.
+        result["contributions"] = _positive_class_contributions(input_scaled, check_additivity=False)
+    return result
+
+def observe_inputs(values):
+    """Adds scored input rows (single or batch, model_columns order) to the drift statistics."""
+    from app.services import drift_service
+    drift_service.observe(values)
+
+def pack_vector(features, contributions):
+    """Packs input features and SHAP contributions into the fixed float32 layout (VECTOR_DTYPE)."""
+    import numpy as np
+    return np.concatenate([
+        np.asarray(features, dtype=VECTOR_DTYPE),
+        np.asarray(contributions, dtype=VECTOR_DTYPE)
+    ]).tobytes()
+
+def unpack_vector(blob):
+    """Returns (features, contributions) as float32 arrays from a packed feature_vector."""
+    import numpy as np
+    values = np.frombuffer(blob, dtype=VECTOR_DTYPE)
+    half = values.size // 2
+    return values[:half], values[half:]
+
 def predict(data):
     """
     Performs a prediction, generates explanations, and provides recommendations.
     """
-    if not pipeline or not model_columns or not explainer:
-        raise RuntimeError("Models are not loaded. Call load_models() first.")
+    return predict_with_record(data)[0]
+
+def predict_with_record(data, monitor=True):
+    """
+    Same as predict(), but also returns the fields to persist on the Prediction
+    row: probability, model_version and the packed feature/contribution vector.
+    With `monitor`, the scored inputs are added to the drift statistics.
+    """
+    import pandas as pd
+
+    ensure_models_loaded()
 
     # Convert the input data dictionary to a pandas DataFrame
     df = pd.DataFrame(data, index=[0])
@@ -97,26 +276,22 @@ def predict(data):
             df[col] = 0
     df = df[model_columns]
 
+    if monitor:
+        observe_inputs(df.values)
+
     # --- Standard Prediction Logic ---
     prediction_raw = pipeline.predict(df)[0]
     prediction_proba = pipeline.predict_proba(df)[0][1] 
 
     # Implement prediction logic with risk categorization
-    if prediction_proba < 0.3:
-        risk = "Low"
-    elif prediction_proba < 0.7:
-        risk = "Medium"
-    else:
-        risk = "High"
+    risk = risk_category(prediction_proba)
 
     # --- Generate SHAP Explanation ---
     scaler = pipeline.named_steps['scaler']
     input_scaled = scaler.transform(df)
 
-    # Get SHAP values
-    shap_values = explainer.shap_values(input_scaled)
-    # Get values for class 1 (High Risk)
-    shap_values_for_class_1 = shap_values[0, :, 1]
+    # Get SHAP values for class 1 (High Risk)
+    shap_values_for_class_1 = _positive_class_contributions(input_scaled)[0]
         
     # Map feature names to their SHAP values
     feature_contributions = dict(zip(model_columns, shap_values_for_class_1))
@@ -157,12 +332,130 @@ def predict(data):
                 added_advice.add(feature)
     # ---------------------------------------------
 
+    record = {
+        "probability": float(prediction_proba),
+        "model_version": model_version,
+        "feature_vector": pack_vector(df.values[0], shap_values_for_class_1)
+    }
+
     # --- 9. Updated Return Dictionary ---
     return {
         "prediction": int(prediction_raw),
         "probability": float(prediction_proba),
         "risk_category": risk,
         "explanations": explanation_list,
-        "base_value": explainer.expected_value[1],
+        "base_value": base_value(),
         "recommendations": recommendations  # <--- ADDED
-    }
\ No newline at end of file
+    }, record
+
+def _what_if_axis(feature, spec):
+    """Returns the 1-D array of values to try for one varied feature."""
+    import numpy as np
+
+    if not isinstance(spec, dict):
+        raise ValueError(f"'{feature}' must be an object with 'values' or 'min'/'max'/'steps'.")
+    if 'values' in spec:
+        try:
+            values = np.asarray(spec['values'], dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{feature}' values must be numeric.")
+    else:
+        try:
+            values = np.linspace(float(spec['min']), float(spec['max']), int(spec.get('steps', 20)))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"'{feature}' needs either 'values' or numeric 'min', 'max' and optional 'steps'.")
+    if values.ndim != 1 or not 1 <= values.size <= MAX_WHAT_IF_STEPS:
+        raise ValueError(f"'{feature}' must have between 1 and {MAX_WHAT_IF_STEPS} values.")
+    return values
+
+def what_if(base, vary):
+    """
+    Scores a base patient with one or two features swept over a range or grid.
+
+    All variants are assembled into one NumPy matrix and scored with a single
+    predict_proba call (no SHAP, nothing persisted), so a 50x50 grid costs one
+    vectorized pass instead of 2,500 predictions.
+
+    `base` maps every model feature to a value; `vary` maps one or two feature
+    names to {'min', 'max', 'steps'} or {'values': [...]}. Raises ValueError on
+    invalid input.
+    """
+    import numpy as np
+    import pandas as pd
+
+    ensure_models_loaded()
+
+    missing = [col for col in model_columns if col not in base]
+    if missing:
+        raise ValueError(f"Missing base features: {', '.join(missing)}")
+    if not isinstance(vary, dict) or not 1 <= len(vary) <= 2:
+        raise ValueError("'vary' must name one or two features.")
+    unknown = [feature for feature in vary if feature not in model_columns]
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(unknown)}")
+
+    try:
+        base_row = np.array([float(base[col]) for col in model_columns])
+    except (TypeError, ValueError):
+        raise ValueError("Base features must be numeric.")
+
+    features = list(vary)
+    axes = [_what_if_axis(feature, vary[feature]) for feature in features]
+    grids = np.meshgrid(*axes, indexing='ij')
+
+    # One row per variant, plus the unchanged base row at the end.
+    matrix = np.tile(base_row, (grids[0].size + 1, 1))
+    for feature, grid in zip(features, grids):
+        matrix[:-1, model_columns.index(feature)] = grid.ravel()
+
+    probabilities = pipeline.predict_proba(pd.DataFrame(matrix, columns=model_columns))[:, 1]
+
+    return {
+        "features": features,
+        "values": {feature: axis.tolist() for feature, axis in zip(features, axes)},
+        "probabilities": np.round(probabilities[:-1].reshape(grids[0].shape), 6).tolist(),
+        "base_probability": float(probabilities[-1])
+    }
+
+# Bucket sizes supported by risk_trend(), as numpy datetime64 units.
+TREND_BUCKETS = {'day': 'D', 'week': 'W', 'month': 'M'}
+
+def risk_trend(timestamps, probabilities, bucket='day', max_points=200):
+    """
+    Aggregates a time-ordered probability series into calendar buckets
+    (mean/min/max/count per bucket), then merges adjacent buckets until at most
+    `max_points` remain, so charts stay small however long the history is.
+    """
+    import numpy as np
+
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(TREND_BUCKETS)}")
+    if len(timestamps) == 0:
+        return []
+
+    times = np.asarray(timestamps, dtype='datetime64[s]')
+    probs = np.asarray(probabilities, dtype=np.float64)
+
+    if bucket == 'week':
+        # Monday-based weeks (the epoch, 1970-01-01, was a Thursday).
+        days = times.astype('datetime64[D]').astype(np.int64)
+        keys = ((days + 3) // 7 * 7 - 3).astype('datetime64[D]')
+    else:
+        keys = times.astype(f'datetime64[{TREND_BUCKETS[bucket]}]').astype('datetime64[D]')
+
+    # Input is ordered by timestamp, so each bucket is a contiguous run.
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    if starts.size > max_points:
+        # Merge runs of adjacent buckets so that max_points groups remain.
+        starts = starts[np.linspace(0, starts.size, max_points, endpoint=False).astype(np.int64)]
+
+    counts = np.diff(np.r_[starts, probs.size])
+    means = np.add.reduceat(probs, starts) / counts
+    mins = np.minimum.reduceat(probs, starts)
+    maxs = np.maximum.reduceat(probs, starts)
+
+    return [
+        {"start": str(start), "mean": round(float(mean), 4), "min": round(float(low), 4),
+         "max": round(float(high), 4), "count": int(count)}
+        for start, mean, low, high, count in zip(keys[starts], means, mins, maxs, counts)
+    ]
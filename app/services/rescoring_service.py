@@ -0,0 +1,118 @@
+# app/services/rescoring_service.py
+
+import time
+from datetime import datetime
+
+from app import db
+from app.models import Prediction, RescoreJob
+from app.services import cohort_service, prediction_service
+
+
+def _get_or_create_job(model_version):
+    """Resumes the unfinished job for this model version, or starts a new one."""
+    job = RescoreJob.query.filter_by(model_version=model_version, status='running').order_by(RescoreJob.id.desc()).first()
+    if job is None:
+        job = RescoreJob(model_version=model_version, status='running', last_id=0, rows_rescored=0, rows_changed=0)
+        db.session.add(job)
+        db.session.commit()
+    return job
+
+
+def rescore_chunk(job, chunk_size, with_contributions=True):
+    """
+    Re-scores the next keyset chunk (ids after job.last_id) and advances the
+    checkpoint in the same transaction as the updates, so a crash can never skip
+    or double-count a chunk. Returns (rows_in_chunk, rows_rescored).
+    """
+    import numpy as np
+
+    rows = db.session.query(
+        Prediction.id, Prediction.timestamp, Prediction.feature_vector, Prediction.risk_category,
+        Prediction.probability, Prediction.model_version
+    ).filter(
+        Prediction.id > job.last_id
+    ).order_by(Prediction.id).limit(chunk_size).all()
+    if not rows:
+        return 0, 0
+
+    # Rows without stored inputs (made before they were persisted) cannot be
+    # re-scored, and rows already scored by this model are left alone.
+    todo = [row for row in rows if row.feature_vector is not None and row.model_version != job.model_version]
+    changed = 0
+    if todo:
+        features = np.vstack([prediction_service.unpack_vector(row.feature_vector)[0] for row in todo])
+        scores = prediction_service.score_matrix(features, with_contributions=with_contributions)
+        contributions = scores['contributions']
+        if contributions is None:
+            contributions = np.full(features.shape, np.nan)
+        mappings = []
+        for i, row in enumerate(todo):
+            category = str(scores['risk_category'][i])
+            changed += category != row.risk_category
+            mappings.append({
+                'id': row.id,
+                'prediction_result': int(scores['prediction'][i]),
+                'probability': float(scores['probability'][i]),
+                'risk_category': category,
+                'model_version': job.model_version,
+                'feature_vector': prediction_service.pack_vector(features[i], contributions[i])
+            })
+        db.session.bulk_update_mappings(Prediction, mappings)
+        # Swap the old scores for the new ones in the cohort rollups.
+        cohort_service.record(todo, sign=-1)
+        cohort_service.record([dict(mapping, timestamp=row.timestamp) for mapping, row in zip(mappings, todo)])
+
+    job.last_id = rows[-1].id
+    job.rows_rescored += len(todo)
+    job.rows_changed += changed
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+    return len(rows), len(todo)
+
+
+def rescore_predictions(chunk_size=500, max_rows_per_second=None, pause=0.05, with_contributions=True, log_every=10):
+    """
+    Re-scores all historical predictions with the currently loaded model, in
+    keyset-ordered chunks with one vectorized scoring call per chunk.
+
+    Progress is checkpointed in the rescore_job table after every chunk, so running
+    this again after a crash resumes where it stopped. Between chunks it sleeps for
+    at least `pause` seconds (letting live requests take the database write lock)
+    and, with `max_rows_per_second`, long enough to stay under that rate.
+    SHAP is by far the most expensive part; without `with_contributions` the stored
+    contributions are set to NaN and only the scores are refreshed.
+    Returns the finished RescoreJob.
+    """
+    prediction_service.ensure_models_loaded()
+    job = _get_or_create_job(prediction_service.model_version)
+    print(f"Re-scoring predictions with model {job.model_version}, resuming after id {job.last_id}.")
+
+    start = time.perf_counter()
+    scanned = 0
+    chunks = 0
+    while True:
+        chunk_start = time.perf_counter()
+        rows, _ = rescore_chunk(job, chunk_size, with_contributions)
+        if rows == 0:
+            break
+        scanned += rows
+        chunks += 1
+
+        elapsed = time.perf_counter() - chunk_start
+        delay = pause
+        if max_rows_per_second:
+            delay = max(delay, rows / max_rows_per_second - elapsed)
+        if chunks % log_every == 0:
+            rate = scanned / (time.perf_counter() - start)
+            print(f"  ...{scanned} rows scanned, {job.rows_rescored} re-scored in total, last id {job.last_id} ({rate:.0f} rows/s)")
+        time.sleep(delay)
+
+    job.status = 'finished'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    total = time.perf_counter() - start
+    rate = scanned / total if total else 0.0
+    print(f"Re-scoring finished: {scanned} rows scanned in {total:.1f}s ({rate:.0f} rows/s), "
+          f"{job.rows_rescored} re-scored, {job.rows_changed} changed risk category.")
+    return job
@@ -0,0 +1,374 @@
+# app/services/retention_service.py
+
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import User, Prediction, MedicalDocument, ArchiveSegment
+from app.services import storage
+
+# Images are recompressed in place; other uploads (PDFs) are left untouched.
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+# --- Columnar archive payloads ---
+
+def _pack_blobs(blobs):
+    """Concatenates variable-length byte strings into (data, offsets); None is stored as zero length."""
+    import numpy as np
+
+    lengths = [len(blob) if blob else 0 for blob in blobs]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    data = np.frombuffer(b''.join(blob or b'' for blob in blobs), dtype=np.uint8)
+    return data, offsets
+
+
+def _unpack_blobs(data, offsets):
+    raw = data.tobytes()
+    return [raw[start:end] or None for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _pack(columns):
+    """Stores named NumPy columns as one deflate-compressed .npz payload."""
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    return buffer.getvalue()
+
+
+def _unpack(payload):
+    import numpy as np
+
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _timestamps(values):
+    import numpy as np
+    return np.array([value if value is not None else 'NaT' for value in values], dtype='datetime64[us]')
+
+
+def _isoformat(value):
+    import numpy as np
+    return None if np.isnat(value) else value.astype(datetime).isoformat()
+
+
+def _encode_predictions(rows):
+    import numpy as np
+
+    vectors, vector_offsets = _pack_blobs([row.feature_vector for row in rows])
+    return _pack({
+        'id': np.array([row.id for row in rows], dtype=np.int64),
+        'timestamp': _timestamps([row.timestamp for row in rows]),
+        'prediction_result': np.array([row.prediction_result for row in rows], dtype=np.int8),
+        'risk_category': np.array([row.risk_category or '' for row in rows]),
+        'probability': np.array([np.nan if row.probability is None else row.probability for row in rows], dtype=np.float64),
+        'model_version': np.array([row.model_version or '' for row in rows]),
+        'feature_vector': vectors,
+        'feature_vector_offsets': vector_offsets
+    })
+
+
+def _decode_predictions(payload):
+    columns = _unpack(payload)
+    vectors = _unpack_blobs(columns['feature_vector'], columns['feature_vector_offsets'])
+    return [
+        {
+            'id': int(columns['id'][i]),
+            'prediction_result': int(columns['prediction_result'][i]),
+            'risk_category': str(columns['risk_category'][i]) or None,
+            'probability': None if columns['probability'][i] != columns['probability'][i] else float(columns['probability'][i]),
+            'model_version': str(columns['model_version'][i]) or None,
+            'feature_vector': vectors[i],
+            'timestamp': _isoformat(columns['timestamp'][i])
+        }
+        for i in range(len(columns['id']))
+    ]
+
+
+def _encode_documents(rows):
+    import numpy as np
+
+    texts, text_offsets = _pack_blobs([row.ocr_text.encode('utf-8') if row.ocr_text else None for row in rows])
+    return _pack({
+        'id': np.array([row.id for row in rows], dtype=np.int64),
+        'upload_timestamp': _timestamps([row.upload_timestamp for row in rows]),
+        'filename': np.array([row.filename for row in rows]),
+        'filepath': np.array([row.filepath for row in rows]),
+        'compacted': np.array([bool(row.compacted) for row in rows]),
+        'ocr_text': texts,
+        'ocr_text_offsets': text_offsets
+    })
+
+
+def _decode_documents(payload):
+    columns = _unpack(payload)
+    texts = _unpack_blobs(columns['ocr_text'], columns['ocr_text_offsets'])
+    return [
+        {
+            'id': int(columns['id'][i]),
+            'filename': str(columns['filename'][i]),
+            'filepath': str(columns['filepath'][i]),
+            'upload_timestamp': _isoformat(columns['upload_timestamp'][i]),
+            'ocr_text': texts[i].decode('utf-8') if texts[i] else None
+        }
+        for i in range(len(columns['id']))
+    ]
+
+
+ARCHIVES = {
+    'prediction': (Prediction, Prediction.timestamp, 'timestamp', _encode_predictions, _decode_predictions),
+    'medical_document': (MedicalDocument, MedicalDocument.upload_timestamp, 'upload_timestamp', _encode_documents, _decode_documents),
+}
+
+
+# --- Reading archived rows ---
+
+def archived_rows(kind, user_id):
+    """Decodes every archived row of `kind` for a user, newest first."""
+    _, _, timestamp_field, _, decode = ARCHIVES[kind]
+    rows = []
+    for segment in ArchiveSegment.query.filter_by(kind=kind, user_id=user_id):
+        rows.extend(decode(segment.payload))
+    rows.sort(key=lambda row: row[timestamp_field] or '', reverse=True)
+    return rows
+
+
+def archived_count(kind, user_id):
+    """Number of rows of `kind` archived for a user, without decoding any payload."""
+    return db.session.query(func.coalesce(func.sum(ArchiveSegment.row_count), 0)).filter(
+        ArchiveSegment.kind == kind, ArchiveSegment.user_id == user_id
+    ).scalar()
+
+
+def _risk_counts(categories):
+    counts = {}
+    for category in categories:
+        if category:
+            counts[category] = counts.get(category, 0) + 1
+    return counts
+
+
+def archived_risk_counts(user_id):
+    """Archived predictions per risk category for a user, from the segments' stored counts."""
+    totals = {}
+    for segment_id, counts in db.session.query(ArchiveSegment.id, ArchiveSegment.risk_counts).filter(
+        ArchiveSegment.kind == 'prediction', ArchiveSegment.user_id == user_id
+    ):
+        if counts is None:
+            # Archived before the counts were stored: decode this segment once.
+            payload = db.session.get(ArchiveSegment, segment_id).payload
+            counts = _risk_counts(row['risk_category'] for row in _decode_predictions(payload))
+        for category, count in counts.items():
+            totals[category] = totals.get(category, 0) + count
+    return totals
+
+
+def archived_row(kind, user_id, row_id):
+    """Finds one of a user's archived rows by its original id. Returns (segment, index, row) or None."""
+    _, _, _, _, decode = ARCHIVES[kind]
+    segments = ArchiveSegment.query.filter(
+        ArchiveSegment.kind == kind, ArchiveSegment.user_id == user_id,
+        ArchiveSegment.first_id <= row_id, ArchiveSegment.last_id >= row_id
+    )
+    for segment in segments:
+        for index, row in enumerate(decode(segment.payload)):
+            if row['id'] == row_id:
+                return segment, index, row
+    return None
+
+
+def _without_row(columns, index):
+    """Drops row `index` from unpacked payload columns, including the variable-length ones."""
+    import numpy as np
+
+    kept = {}
+    for name, values in columns.items():
+        if name.endswith('_offsets'):
+            continue
+        if name + '_offsets' in columns:
+            blobs = _unpack_blobs(values, columns[name + '_offsets'])
+            del blobs[index]
+            kept[name], kept[name + '_offsets'] = _pack_blobs(blobs)
+        else:
+            kept[name] = np.delete(values, index)
+    return kept
+
+
+def delete_archived_row(segment, index):
+    """Rewrites a segment without one of its rows, or deletes it with its last row. The caller commits."""
+    import numpy as np
+
+    if segment.row_count <= 1:
+        db.session.delete(segment)
+        return
+    _, _, timestamp_field, _, _ = ARCHIVES[segment.kind]
+    columns = _without_row(_unpack(segment.payload), index)
+    timestamps = columns[timestamp_field][~np.isnat(columns[timestamp_field])]
+    segment.row_count = len(columns['id'])
+    segment.first_id, segment.last_id = int(columns['id'].min()), int(columns['id'].max())
+    segment.start_timestamp = timestamps.min().astype(datetime) if len(timestamps) else None
+    segment.end_timestamp = timestamps.max().astype(datetime) if len(timestamps) else None
+    if segment.kind == 'prediction':
+        segment.risk_counts = _risk_counts(str(category) for category in columns['risk_category'])
+    segment.payload = _pack(columns)
+
+
+# --- Retention job ---
+
+def _cutoff(role, key, now):
+    days = current_app.config['RETENTION_POLICIES'].get(role, {}).get(key)
+    return None if days is None else now - timedelta(days=days)
+
+
+def archive_batch(kind, role, cutoff, batch_size):
+    """
+    Moves up to `batch_size` rows of `kind` older than `cutoff`, owned by users
+    with `role`, into archive segments (one per user) and deletes them from the
+    hot table, in one transaction. Returns the number of rows moved.
+    """
+    model, timestamp_column, timestamp_field, encode, _ = ARCHIVES[kind]
+    # Ordered by owner so a batch yields a few large segments rather than many small ones.
+    rows = model.query.join(User, model.user_id == User.id).filter(
+        User.role == role, timestamp_column < cutoff
+    ).order_by(model.user_id, model.id).limit(batch_size).all()
+    if not rows:
+        return 0
+
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row.user_id, []).append(row)
+    for user_id, user_rows in by_user.items():
+        timestamps = [getattr(row, timestamp_field) for row in user_rows if getattr(row, timestamp_field)]
+        db.session.add(ArchiveSegment(
+            kind=kind, user_id=user_id, row_count=len(user_rows),
+            first_id=user_rows[0].id, last_id=user_rows[-1].id,
+            start_timestamp=min(timestamps, default=None), end_timestamp=max(timestamps, default=None),
+            risk_counts=_risk_counts(row.risk_category for row in user_rows) if kind == 'prediction' else None,
+            payload=encode(user_rows)
+        ))
+    model.query.filter(model.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+    db.session.commit()
+    return len(rows)
+
+
+def _recompress(files, key, quality):
+    """Re-encodes one stored image if that makes it smaller. Returns the bytes saved."""
+    from PIL import Image
+
+    tmp_path = files.temp_path(key)
+    try:
+        with files.open(key) as f, Image.open(f) as image:
+            before = files.size(key)
+            if image.format == 'JPEG':
+                image.save(tmp_path, format='JPEG', quality=quality, optimize=True, progressive=True)
+            elif image.format == 'PNG':
+                image.save(tmp_path, format='PNG', optimize=True)
+            else:
+                return 0
+        after = os.path.getsize(tmp_path)
+        if after >= before:
+            return 0
+        files.put_file(key, tmp_path)
+        return before - after
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def compact_images_batch(role, cutoff, batch_size, quality):
+    """Recompresses up to `batch_size` old, not yet compacted image uploads. Returns (documents, bytes saved)."""
+    documents = MedicalDocument.query.join(User, MedicalDocument.user_id == User.id).filter(
+        User.role == role,
+        MedicalDocument.upload_timestamp < cutoff,
+        MedicalDocument.compacted.is_(False)
+    ).order_by(MedicalDocument.id).limit(batch_size).all()
+
+    files = storage.get_storage()
+    saved = 0
+    for document in documents:
+        if document.filepath.lower().endswith(IMAGE_EXTENSIONS):
+            try:
+                saved += _recompress(files, files.key(document.filepath), quality)
+            except (OSError, ValueError) as e:
+                print(f"Retention: could not recompress {document.filepath}: {e}")
+        # Marked either way, so non-images and unreadable files are not retried every run.
+        document.compacted = True
+    db.session.commit()
+    return len(documents), saved
+
+
+def _database_bytes():
+    """Size of the SQLite database file including its WAL, or None for other databases."""
+    if db.engine.dialect.name != 'sqlite' or not db.engine.url.database or db.engine.url.database == ':memory:':
+        return None
+    path = db.engine.url.database
+    return sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p))
+
+
+def _hot_counts():
+    return {
+        'prediction': db.session.query(func.count(Prediction.id)).scalar(),
+        'medical_document': db.session.query(func.count(MedicalDocument.id)).scalar(),
+        'archive_segment': db.session.query(func.count(ArchiveSegment.id)).scalar()
+    }
+
+
+def maintain_database(vacuum=False):
+    """Runs ANALYZE (and optionally VACUUM, which rewrites the whole file) outside a transaction."""
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if vacuum:
+            conn.exec_driver_sql('VACUUM')
+        conn.exec_driver_sql('ANALYZE')
+        if db.engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def run_retention(batch_size=None, pause=0.05, vacuum=False, now=None):
+    """
+    Applies RETENTION_POLICIES in small batches: recompresses old uploaded
+    images, archives old predictions and documents per owner role, then analyzes
+    (and optionally vacuums) the database. Each batch is its own transaction, so
+    the job can be interrupted and simply run again. Returns a report dict.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['RETENTION_BATCH_SIZE']
+    now = now or datetime.utcnow()
+    start = time.perf_counter()
+
+    report = {'hot_before': _hot_counts(), 'db_bytes_before': _database_bytes(),
+              'archived': {kind: 0 for kind in ARCHIVES}, 'images_compacted': 0, 'image_bytes_saved': 0}
+
+    for role in config['RETENTION_POLICIES']:
+        # Images first: compaction only sees hot documents, and the oldest images
+        # are exactly the ones about to be archived.
+        cutoff = _cutoff(role, 'images', now)
+        while cutoff is not None:
+            documents, saved = compact_images_batch(role, cutoff, batch_size, config['RETENTION_IMAGE_QUALITY'])
+            if documents == 0:
+                break
+            report['images_compacted'] += documents
+            report['image_bytes_saved'] += saved
+            time.sleep(pause)
+
+        for kind, key in (('prediction', 'predictions'), ('medical_document', 'documents')):
+            cutoff = _cutoff(role, key, now)
+            while cutoff is not None:
+                moved = archive_batch(kind, role, cutoff, batch_size)
+                if moved == 0:
+                    break
+                report['archived'][kind] += moved
+                time.sleep(pause)
+
+    maintain_database(vacuum=vacuum)
+    report['hot_after'] = _hot_counts()
+    report['db_bytes_after'] = _database_bytes()
+    report['seconds'] = time.perf_counter() - start
+    return report
@@ -0,0 +1,435 @@
+# app/services/storage.py
+
+"""
+Where uploaded files live. Documents and profile picture renditions are stored
+under keys, paths relative to the storage root such as 'scan.png' or
+'profile_pics/ab/<digest>/150.webp'. STORAGE_BACKEND selects the backend:
+
+  'local' - files under UPLOAD_FOLDER (the default: one node, or several
+            sharing a volume)
+  's3'    - an S3-compatible bucket (AWS, MinIO, ...). Each process keeps one
+            boto3 client with a pool of STORAGE_S3_MAX_CONNECTIONS connections.
+            Files larger than STORAGE_MULTIPART_THRESHOLD go up as parallel
+            multipart uploads. Reads go through a disk cache under
+            STORAGE_CACHE_DIR (least recently used entries are dropped beyond
+            STORAGE_CACHE_MAX_BYTES), so OCR and PIL get a seekable local file
+            and a repeated read costs at most a HEAD request.
+
+Both backends copy in COPY_BUFFER_SIZE pieces and never hold a whole file in
+memory. Document rows written before this module store an absolute path
+under UPLOAD_FOLDER. key() maps such a path to its key, so those rows keep
+working on either backend; `flask storage-sync` copies existing local files
+into the bucket.
+"""
+
+import os
+import posixpath
+import shutil
+import threading
+from flask import current_app
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+_lock = threading.Lock()
+
+
+def get_storage():
+    """The app's storage backend, created from its config on first use."""
+    app = current_app._get_current_object()
+    storage = app.extensions.get('storage')
+    if storage is None:
+        with _lock:
+            storage = app.extensions.get('storage')
+            if storage is None:
+                storage = app.extensions['storage'] = _create(app.config)
+    return storage
+
+
+def _create(config):
+    backend = config['STORAGE_BACKEND']
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        if not config['STORAGE_S3_BUCKET']:
+            raise RuntimeError("STORAGE_BACKEND is 's3' but STORAGE_S3_BUCKET is not set")
+        return S3Storage(
+            config['STORAGE_S3_BUCKET'], prefix=config['STORAGE_S3_PREFIX'],
+            endpoint_url=config['STORAGE_S3_ENDPOINT_URL'], region=config['STORAGE_S3_REGION'],
+            max_connections=config['STORAGE_S3_MAX_CONNECTIONS'],
+            multipart_threshold=config['STORAGE_MULTIPART_THRESHOLD'],
+            multipart_chunk_size=config['STORAGE_MULTIPART_CHUNK_SIZE'],
+            cache_dir=config['STORAGE_CACHE_DIR'], cache_max_bytes=config['STORAGE_CACHE_MAX_BYTES'],
+            legacy_root=config['UPLOAD_FOLDER']
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {backend!r}; expected 'local' or 's3'")
+
+
+def references(keys):
+    """
+    Every value a document row may hold for these keys: the key itself or, for
+    rows written before the storage layer, its absolute path under UPLOAD_FOLDER.
+    """
+    root = current_app.config['UPLOAD_FOLDER']
+    values = set(keys)
+    values.update(os.path.join(root, *key.split('/')) for key in keys)
+    values.update(os.path.join(os.path.realpath(root), *key.split('/')) for key in keys)
+    return values
+
+
+def _copy(source, target):
+    """Copies a readable binary stream into a writable one. Returns the bytes copied."""
+    copied = 0
+    for buffer in iter(lambda: source.read(COPY_BUFFER_SIZE), b''):
+        target.write(buffer)
+        copied += len(buffer)
+    return copied
+
+
+def _temp_path(path):
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def _move(path, target):
+    """Moves a file into place atomically: a rename, or a copy then rename across filesystems."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.replace(path, target)
+    except OSError:
+        tmp_path = _temp_path(target)
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+        os.remove(path)
+
+
+class Storage:
+    """
+    Interface shared by the backends. Missing keys raise FileNotFoundError;
+    keys that leave the storage root raise ValueError.
+    """
+
+    name = None
+
+    def __init__(self, legacy_root):
+        self.legacy_root = os.path.realpath(legacy_root)
+
+    def key(self, value):
+        """Normalizes a stored file reference (a key, or a pre-storage absolute path) to a key."""
+        if os.path.isabs(value):
+            value = os.path.relpath(os.path.realpath(value), self.legacy_root)
+        value = posixpath.normpath(value.replace(os.sep, '/'))
+        if value in ('.', '..') or value.startswith(('../', '/')):
+            raise ValueError(f'{value!r} is not a storage key')
+        return value
+
+    def save(self, key, stream):
+        """Stores everything read from a binary stream under `key`, replacing any previous file. Returns its size."""
+        raise NotImplementedError
+
+    def put_file(self, key, path):
+        """Stores a local file under `key`, taking ownership of it: the file is moved, not copied, where possible."""
+        raise NotImplementedError
+
+    def open(self, key, verify=True):
+        """A seekable binary file object with the stored content."""
+        return open(self.local_path(key, verify=verify), 'rb')
+
+    def local_path(self, key, verify=True):
+        """
+        A local path holding the stored content, for code that needs a real
+        file (send_file, sendfile). Treat it as read-only. With verify=False a
+        cached copy is used without asking the backend whether it changed, which
+        is right for content-addressed keys.
+        """
+        raise NotImplementedError
+
+    def stream(self, key, chunk_size=COPY_BUFFER_SIZE):
+        """An iterator over the stored content in pieces of at most chunk_size bytes, bypassing any cache."""
+        raise NotImplementedError
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        try:
+            self.size(key)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete(self, key):
+        """Removes a stored file. Returns whether it existed."""
+        raise NotImplementedError
+
+    def keys(self, prefix):
+        """The keys of every stored file under a directory-like prefix such as 'profile_pics/ab/'."""
+        raise NotImplementedError
+
+    def temp_path(self, key):
+        """A scratch path from which put_file(key, ...) can rename instead of copying."""
+        raise NotImplementedError
+
+
+class LocalStorage(Storage):
+    """Files under a local (or shared) directory; keys are paths relative to it."""
+
+    name = 'local'
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.root = self.legacy_root
+
+    def path(self, key):
+        return os.path.join(self.root, *self.key(key).split('/'))
+
+    def save(self, key, stream):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = _temp_path(path)
+        try:
+            with open(tmp_path, 'wb') as f:
+                size = _copy(stream, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size
+
+    def put_file(self, key, path):
+        _move(path, self.path(key))
+
+    def local_path(self, key, verify=True):
+        path = self.path(key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(key)
+        return path
+
+    def stream(self, key, chunk_size=COPY_BUFFER_SIZE):
+        f = open(self.local_path(key), 'rb')
+
+        def chunks():
+            with f:
+                yield from iter(lambda: f.read(chunk_size), b'')
+        return chunks()
+
+    def size(self, key):
+        return os.path.getsize(self.local_path(key))
+
+    def delete(self, key):
+        path = self.path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        # Drops directories left empty (e.g. a profile picture's), up to the root.
+        parent = os.path.dirname(path)
+        while parent != self.root and parent.startswith(self.root + os.sep):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+        return True
+
+    def keys(self, prefix):
+        directory = self.path(prefix)
+        for parent, _, names in os.walk(directory):
+            for name in names:
+                if not name.endswith('.tmp'):
+                    yield posixpath.relpath(os.path.join(parent, name), self.root).replace(os.sep, '/')
+
+    def temp_path(self, key):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _temp_path(path)
+
+
+class S3Storage(Storage):
+    """Objects in an S3-compatible bucket under `prefix`, read through a local disk cache."""
+
+    name = 's3'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, max_connections=20,
+                 multipart_threshold=16 * 1024 * 1024, multipart_chunk_size=16 * 1024 * 1024,
+                 cache_dir='storage_cache', cache_max_bytes=1024 * 1024 * 1024, legacy_root='uploads'):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config as BotoConfig
+
+        super().__init__(legacy_root)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        # boto3 clients are thread-safe; one per process shares its connection pool
+        # between request threads and the multipart transfer threads.
+        self.client = boto3.session.Session().client(
+            's3', endpoint_url=endpoint_url or None, region_name=region or None,
+            config=BotoConfig(max_pool_connections=max_connections, retries={'max_attempts': 5, 'mode': 'standard'})
+        )
+        self.transfer = TransferConfig(multipart_threshold=multipart_threshold, multipart_chunksize=multipart_chunk_size,
+                                       max_concurrency=max(1, min(10, max_connections // 2)), io_chunksize=COPY_BUFFER_SIZE)
+        self.cache_dir = os.path.realpath(cache_dir)
+        self.cache_max_bytes = cache_max_bytes
+        self._cache_bytes = None  # Counted on the first cache write
+        self._cache_lock = threading.Lock()
+
+    def _object(self, key):
+        return self.prefix + self.key(key)
+
+    def _missing(self, error):
+        from botocore.exceptions import ClientError
+        return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except Exception as e:
+            if self._missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    # --- Disk cache: <cache_dir>/<key>, with the object's ETag in <key>.etag ---
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, *self.key(key).split('/'))
+
+    def _cached_etag(self, path):
+        try:
+            with open(path + '.etag', 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _cache_insert(self, path, tmp_path, etag):
+        """Moves a downloaded or uploaded file into the cache, then trims the cache to its size limit."""
+        _move(tmp_path, path)
+        with open(path + '.etag', 'w') as f:
+            f.write(etag or '')
+        with self._cache_lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = self._cache_usage()[0]
+            else:
+                self._cache_bytes += os.path.getsize(path)
+            if self._cache_bytes > self.cache_max_bytes:
+                self._trim()
+
+    def _cache_usage(self):
+        total, entries = 0, []
+        for directory, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(('.etag', '.tmp')):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return total, entries
+
+    def _trim(self):
+        # Hits refresh the entry's mtime, so the oldest mtime is the least recently used.
+        total, entries = self._cache_usage()
+        for _, size, path in sorted(entries):
+            if total <= self.cache_max_bytes * 0.9:
+                break
+            for p in (path, path + '.etag'):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+        self._cache_bytes = total
+
+    def _evict(self, key):
+        path = self._cache_path(key)
+        for p in (path, path + '.etag'):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    # --- Interface ---
+
+    def save(self, key, stream):
+        # Spooled into the cache first: the upload can then be multipart from a
+        # seekable file, and the next read of this key is a cache hit.
+        tmp_path = self.temp_path(key)
+        try:
+            with open(tmp_path, 'wb') as f:
+                size = _copy(stream, f)
+            self.put_file(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return size
+
+    def put_file(self, key, path):
+        self.client.upload_file(path, self.bucket, self._object(key), Config=self.transfer)
+        self._cache_insert(self._cache_path(key), path, self._head(key)['ETag'])
+
+    def local_path(self, key, verify=True):
+        path = self._cache_path(key)
+        etag = None
+        if os.path.exists(path):
+            if not verify:
+                os.utime(path)
+                return path
+            etag = self._head(key)['ETag']
+            if etag == self._cached_etag(path):
+                os.utime(path)
+                return path
+        tmp_path = self.temp_path(key)
+        try:
+            response = self._get(key)
+            with open(tmp_path, 'wb') as f:
+                for buffer in response['Body'].iter_chunks(COPY_BUFFER_SIZE):
+                    f.write(buffer)
+            self._cache_insert(path, tmp_path, response['ETag'])
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def _get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object(key))
+        except Exception as e:
+            if self._missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def stream(self, key, chunk_size=COPY_BUFFER_SIZE):
+        body = self._get(key)['Body']
+
+        def chunks():
+            try:
+                yield from body.iter_chunks(chunk_size)
+            finally:
+                body.close()
+        return chunks()
+
+    def size(self, key):
+        return self._head(key)['ContentLength']
+
+    def delete(self, key):
+        self._evict(key)
+        try:
+            self._head(key)
+        except FileNotFoundError:
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+        return True
+
+    def keys(self, prefix):
+        start = len(self.prefix)
+        pages = self.client.get_paginator('list_objects_v2').paginate(
+            Bucket=self.bucket, Prefix=self.prefix + self.key(prefix) + '/')
+        for page in pages:
+            for item in page.get('Contents', ()):
+                yield item['Key'][start:]
+
+    def temp_path(self, key):
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _temp_path(path)
@@ -0,0 +1,254 @@
+# app/services/upload_service.py
+
+import hashlib
+import json
+import os
+import secrets
+import time
+from flask import current_app
+
+from app.services.file_lock import FileLock
+
+# Request bodies are copied to disk in pieces of this size, so memory use per
+# upload stays flat no matter how large the file is.
+COPY_BUFFER_SIZE = 64 * 1024
+
+PURPOSES = ('document', 'profile_picture')
+
+
+class UploadError(Exception):
+    """An upload request that cannot be honoured; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+def _sessions_dir():
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], '.partial')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(upload_id):
+    # Ids are generated by token_hex, so anything else cannot name a session.
+    if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+        raise UploadError('Upload not found', 404)
+    base = os.path.join(_sessions_dir(), upload_id)
+    return base + '.json', base + '.part'
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _discard(upload_id):
+    for path in _paths(upload_id):
+        for p in (path, path + '.lock'):
+            if os.path.exists(p):
+                os.remove(p)
+
+
+def _expire_stale_sessions():
+    """Removes sessions not touched for UPLOAD_SESSION_TTL seconds."""
+    cutoff = time.time() - current_app.config['UPLOAD_SESSION_TTL']
+    directory = _sessions_dir()
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    _discard(name[:-len('.json')])
+            except OSError:
+                pass  # Completed or removed concurrently
+
+
+def discard_user_sessions(user_id):
+    """Removes every unfinished upload of a user (when the account is deleted). Returns how many."""
+    directory = _sessions_dir()
+    removed = 0
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r') as f:
+                owner = json.load(f).get('user_id')
+        except (OSError, ValueError):
+            continue  # Completed or removed concurrently
+        if owner == user_id:
+            _discard(name[:-len('.json')])
+            removed += 1
+    return removed
+
+
+def init_upload(user_id, filename, size, purpose='document', sha256=None):
+    """
+    Starts a resumable upload and returns its state. `size` is the total number
+    of bytes the client will send; `sha256` (optional) is checked on completion.
+    """
+    if purpose not in PURPOSES:
+        raise UploadError(f"'purpose' must be one of: {', '.join(PURPOSES)}")
+    max_size = current_app.config['UPLOAD_MAX_FILE_SIZE']
+    if size <= 0 or size > max_size:
+        raise UploadError(f'File size must be between 1 and {max_size} bytes', 413 if size > max_size else 400)
+    if sha256 is not None and (len(sha256) != 64 or not all(c in '0123456789abcdef' for c in sha256.lower())):
+        raise UploadError("'sha256' must be a hex SHA-256 digest")
+
+    _expire_stale_sessions()
+    upload_id = secrets.token_hex(16)
+    meta_path, part_path = _paths(upload_id)
+    open(part_path, 'wb').close()
+    meta = {
+        'upload_id': upload_id, 'user_id': user_id, 'filename': filename, 'size': size,
+        'purpose': purpose, 'sha256': sha256.lower() if sha256 else None, 'created_at': time.time()
+    }
+    _write_meta(meta_path, meta)
+    return status(meta)
+
+
+def get_upload(upload_id, user_id):
+    """Loads a session's metadata, hiding other users' uploads behind a 404."""
+    meta_path, _ = _paths(upload_id)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise UploadError('Upload not found', 404)
+    if meta['user_id'] != user_id:
+        raise UploadError('Upload not found', 404)
+    return meta
+
+
+def status(meta):
+    _, part_path = _paths(meta['upload_id'])
+    return {
+        'upload_id': meta['upload_id'],
+        'offset': os.path.getsize(part_path),
+        'size': meta['size'],
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']
+    }
+
+
+def _check_chunk(meta, part_path, offset, length):
+    """Validates a chunk against the bytes received so far (held under the file lock). Returns that count."""
+    current = os.path.getsize(part_path)
+    if offset != current:
+        raise UploadError('Offset does not match the bytes received so far', 409, offset=current)
+    if length is None:
+        raise UploadError('Content-Length is required', 411)
+    if current + length > meta['size']:
+        raise UploadError('Chunk would exceed the declared file size', 400, offset=current)
+    return current
+
+
+def _reject_chunk(f, current, written, length):
+    # Incomplete or corrupted chunk: roll back so the client can resend it.
+    f.truncate(current)
+    message = 'Chunk checksum mismatch' if written == length else 'Chunk ended early'
+    raise UploadError(message, 400 if written == length else 408, offset=current)
+
+
+def append_chunk(meta, offset, stream, length, checksum=None):
+    """
+    Appends `length` bytes from `stream` at `offset`, copying in small buffers.
+    The offset must equal the bytes already received (409 otherwise, with the
+    current offset so the client can resume). With `checksum` (hex SHA-256 of
+    the chunk), a mismatching chunk is discarded. Returns the new status.
+    """
+    meta_path, part_path = _paths(meta['upload_id'])
+    with FileLock(part_path):
+        current = _check_chunk(meta, part_path, offset, length)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(part_path, 'r+b') as f:
+                f.seek(current)
+                while written < length:
+                    buffer = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                    if not buffer:
+                        break
+                    f.write(buffer)
+                    digest.update(buffer)
+                    written += len(buffer)
+                if written != length or (checksum and digest.hexdigest() != checksum.lower()):
+                    _reject_chunk(f, current, written, length)
+        except OSError:
+            with open(part_path, 'r+b') as f:
+                f.truncate(current)
+            raise
+        os.utime(meta_path)  # Keeps an active upload from expiring
+    return status(meta)
+
+
+async def append_chunk_async(meta, offset, stream, length, checksum=None):
+    """
+    append_chunk for the ASGI server: `stream` is an async iterator of body
+    pieces (ending early if the client disconnects), so a slow client costs a
+    suspended coroutine rather than a thread.
+    The lock is polled instead of waited on, to keep the event loop free.
+    """
+    import anyio
+
+    meta_path, part_path = _paths(meta['upload_id'])
+    lock = FileLock(part_path)
+    while not lock.acquire(blocking=False):
+        await anyio.sleep(0.01)
+    try:
+        current = _check_chunk(meta, part_path, offset, length)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(part_path, 'r+b') as f:
+                f.seek(current)
+                try:
+                    async for buffer in stream:
+                        if written + len(buffer) > length:
+                            raise UploadError('Request body is longer than Content-Length', 400, offset=current)
+                        f.write(buffer)
+                        digest.update(buffer)
+                        written += len(buffer)
+                except UploadError:
+                    f.truncate(current)
+                    raise
+                if written != length or (checksum and digest.hexdigest() != checksum.lower()):
+                    _reject_chunk(f, current, written, length)
+        except OSError:
+            with open(part_path, 'r+b') as f:
+                f.truncate(current)
+            raise
+        os.utime(meta_path)
+    finally:
+        lock.release()
+    return status(meta)
+
+
+def complete_upload(meta):
+    """
+    Verifies the assembled file (size and optional whole-file SHA-256, hashed in
+    a streaming pass) and returns the path of the finished temp file. The caller
+    moves it into place and deletes the session with finish().
+    """
+    _, part_path = _paths(meta['upload_id'])
+    with FileLock(part_path):
+        received = os.path.getsize(part_path)
+        if received != meta['size']:
+            raise UploadError('Upload is incomplete', 409, offset=received)
+        if meta['sha256']:
+            digest = hashlib.sha256()
+            with open(part_path, 'rb') as f:
+                for buffer in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(buffer)
+            if digest.hexdigest() != meta['sha256']:
+                _discard(meta['upload_id'])
+                raise UploadError('File checksum mismatch; the upload has been discarded', 400)
+    return part_path
+
+
+def finish(meta):
+    """Deletes what is left of a session (after completion or when the client aborts)."""
+    _discard(meta['upload_id'])
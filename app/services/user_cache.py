@@ -0,0 +1,103 @@
+# app/services/user_cache.py
+
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+
+# A lightweight, read-only copy of the fields that authorization and the
+# resources actually read. It is safe to share across requests and threads,
+# unlike a SQLAlchemy instance which is bound to one session.
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'email', 'role', 'profile_image'])
+
+_lock = threading.Lock()
+_entries = {}  # user_id -> (expires_at, CachedUser or None)
+# Bumped by invalidate() (per user) and clear() (all users). A lookup only stores
+# what it loaded if neither changed while it was reading the database, so an
+# invalidation racing with a load cannot leave the old row cached for a full TTL.
+_generations = {}  # user_id -> int
+_epoch = 0
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _ttl():
+    return current_app.config.get('USER_CACHE_TTL', 300)
+
+
+def _load(user_id):
+    from app.models import User
+    user = User.query.get(user_id)
+    if user is None:
+        return None
+    return CachedUser(id=user.id, username=user.username, email=user.email, role=user.role, profile_image=user.profile_image)
+
+
+def get_user(user_id):
+    """
+    Returns a CachedUser for the given id, or None if no such user exists.
+    The database is only queried on a miss or after the entry's TTL expires.
+    Missing users are cached too, so repeated lookups of a deleted account
+    do not hit the database either.
+    """
+    user_id = int(user_id)
+    ttl = _ttl()
+    now = time.monotonic()
+
+    if ttl > 0:
+        with _lock:
+            entry = _entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                _stats['hits'] += 1
+                return entry[1]
+            _stats['misses'] += 1
+            generation = (_epoch, _generations.get(user_id, 0))
+    else:
+        # A TTL of 0 disables caching entirely (useful for benchmarking).
+        with _lock:
+            _stats['misses'] += 1
+        return _load(user_id)
+
+    user = _load(user_id)
+    with _lock:
+        if generation == (_epoch, _generations.get(user_id, 0)):
+            _entries[user_id] = (now + ttl, user)
+    return user
+
+
+def get_role(user_id):
+    """Returns the role of the given user, or None if the user does not exist."""
+    user = get_user(user_id)
+    return user.role if user else None
+
+
+def invalidate(user_id):
+    """Drops a single user from the cache. Call this whenever a user is updated or deleted."""
+    user_id = int(user_id)
+    with _lock:
+        _entries.pop(user_id, None)
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        _stats['invalidations'] += 1
+
+
+def clear():
+    """Drops every cached user and resets the counters."""
+    global _epoch
+    with _lock:
+        _entries.clear()
+        _generations.clear()
+        _epoch += 1
+        for key in _stats:
+            _stats[key] = 0
+
+
+def stats():
+    """Returns the hit/miss counters and the current hit rate."""
+    with _lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {
+            'size': len(_entries),
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+            'invalidations': _stats['invalidations'],
+            'hit_rate': (_stats['hits'] / lookups) if lookups else 0.0
+        }
@@ -0,0 +1,7 @@
+# asgi.py
+# ASGI entry point: async handlers for the I/O-bound endpoints, the rest of the
+# Flask app on bounded thread pools (see app/asgi.py). Run with e.g.
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,169 @@
+# benchmarks/bench_admission_control.py
+
+"""
+Latency of cheap endpoints during an OCR flood, with and without admission
+control. The server is modelled as a fixed pool of worker threads (like
+gunicorn's gthread workers): a few users fire document uploads far faster than
+OCR can keep up, while a probe client calls /predict and /dashboard at a steady
+pace. Probe latency includes the time spent waiting for a free worker.
+
+Without admission control every worker ends up inside OCR and the probes queue
+behind the flood; with it, surplus uploads are turned away at once with
+429/503 and the probes keep their latency.
+
+If Tesseract is not installed, OCR is replaced by a stand-in that waits
+OCR_SECONDS, as pytesseract does while the tesseract subprocess runs.
+
+Usage (from the project root):
+    python benchmarks/bench_admission_control.py [seconds] [workers]
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from app.services import admission_control, ocr_service
+from config import Config
+
+OCR_SECONDS = 0.5
+FLOOD_USERS = 4
+PROBE_USERS = 5       # Probe traffic is spread so each user stays within its own rate
+FLOOD_RATE = 40        # uploads per second, across all flooding users
+PROBE_INTERVAL = 0.05  # seconds between probe requests
+
+PREDICT_BODY = {"age": 54, "sex": 1, "cp": 3, "trestbps": 140, "chol": 239, "fbs": 0, "restecg": 1,
+                "thalach": 160, "exang": 0, "oldpeak": 1.2, "slope": 2, "ca": 0, "thal": 2}
+
+
+def tesseract_available(app):
+    import pytesseract
+    with app.app_context():
+        ocr_service.configure_pytesseract()
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def make_app(upload_dir, admission):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(upload_dir, 'bench.db')
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 32, 'max_overflow': 0}
+        TESTING = True
+        MAIL_OUTBOX_WORKER = False
+        DRIFT_MONITORING = False
+        UPLOAD_FOLDER = upload_dir
+        ADMISSION_CONTROL = admission
+
+    app = create_app(BenchConfig, model_loading='eager')
+    with app.app_context():
+        db.create_all()
+        headers = []
+        for i in range(FLOOD_USERS + PROBE_USERS):
+            user = User(username=f'bench{i}', email=f'bench{i}@bench.local')
+            user.password_hash = 'x'
+            db.session.add(user)
+            db.session.commit()
+            headers.append({'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'})
+    return app, headers
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000 if values else float('nan')
+
+
+def run(admission, seconds, workers, image):
+    upload_dir = tempfile.mkdtemp(prefix='bench_admission_')
+    try:
+        admission_control.reset()
+        app, headers = make_app(upload_dir, admission)
+        probe_headers, flood_headers = headers[:PROBE_USERS], headers[PROBE_USERS:]
+        local = threading.local()
+
+        def client():
+            if not hasattr(local, 'client'):
+                local.client = app.test_client()
+            return local.client
+
+        def upload(i):
+            response = client().post('/upload-document', headers=flood_headers[i % FLOOD_USERS],
+                                     data={'document': (io.BytesIO(image), f'scan_{i}.png')},
+                                     content_type='multipart/form-data')
+            return response.status_code
+
+        def probe(submitted, path, n):
+            auth = probe_headers[n % PROBE_USERS]
+            if path == '/predict':
+                response = client().post(path, json=PREDICT_BODY, headers=auth)
+            else:
+                response = client().get(path, headers=auth)
+            return response.status_code, time.perf_counter() - submitted
+
+        pool = ThreadPoolExecutor(max_workers=workers)
+        uploads, probes = [], []
+        start = time.perf_counter()
+        next_upload = next_probe = start
+        i = 0
+        while time.perf_counter() - start < seconds:
+            now = time.perf_counter()
+            if now >= next_upload:
+                uploads.append(pool.submit(upload, i))
+                i += 1
+                next_upload += 1 / FLOOD_RATE
+            if now >= next_probe:
+                path = '/predict' if len(probes) % 2 == 0 else '/dashboard'
+                probes.append((path, pool.submit(probe, now, path, len(probes) // 2)))
+                next_probe += PROBE_INTERVAL
+            time.sleep(0.001)
+        pool.shutdown(wait=True)
+
+        latencies = {'/predict': [], '/dashboard': []}
+        for path, future in probes:
+            status, latency = future.result()
+            assert status == 200, status
+            latencies[path].append(latency)
+        codes = [future.result() for future in uploads]
+        return latencies, codes
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 200), 'white').save(buffer, 'PNG')
+    image = buffer.getvalue()
+
+    probe_app = create_app(Config, model_loading='lazy')
+    if not tesseract_available(probe_app):
+        print(f"Tesseract not found: OCR is simulated with a {OCR_SECONDS}s wait per document.")
+        ocr_service.extract_text_from_image = lambda source: time.sleep(OCR_SECONDS) or ''
+
+    print(f"\n--- {FLOOD_USERS} users uploading {FLOOD_RATE}/s for {seconds:.0f}s on {workers} workers ---")
+    print(f"{'admission':12}{'/predict p50':>14}{'p95':>9}{'/dashboard p50':>16}{'p95':>9}"
+          f"{'OCR done':>10}{'429':>6}{'503':>6}")
+    for admission in (False, True):
+        latencies, codes = run(admission, seconds, workers, image)
+        print(f"{'on' if admission else 'off':12}"
+              f"{percentile(latencies['/predict'], 50):12.0f}ms{percentile(latencies['/predict'], 95):7.0f}ms"
+              f"{percentile(latencies['/dashboard'], 50):14.0f}ms{percentile(latencies['/dashboard'], 95):7.0f}ms"
+              f"{codes.count(201):10d}{codes.count(429):6d}{codes.count(503):6d}")
+
+
+if __name__ == '__main__':
+    main()
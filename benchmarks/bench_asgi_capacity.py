@@ -0,0 +1,193 @@
+# benchmarks/bench_asgi_capacity.py
+
+"""
+Compares how many slow, concurrent I/O-bound connections the WSGI and ASGI
+deployments hold, and what that costs them.
+
+For each server (the threaded Werkzeug server running the Flask app, and
+uvicorn running app.asgi) --connections clients each open an upload session
+and PUT one chunk, trickling its bytes over --hold seconds the way a phone on
+a poor network does. Meanwhile a probe client lists its documents every
+--probe-interval seconds. Reported per server: chunks accepted, failed
+connections, probe latency while the uploads are in flight, and the peak
+thread count and RSS of the server process (from /proc).
+
+Usage (from the project root):
+    python benchmarks/bench_asgi_capacity.py [--connections 500] [--hold 10]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import PASSWORD, free_port, start_server, _cpu_and_rss, _process_tree, _percentile
+
+
+def _threads(pid):
+    total = 0
+    for p in _process_tree(pid):
+        try:
+            total += len(os.listdir(f'/proc/{p}/task'))
+        except OSError:
+            continue
+    return total
+
+
+async def request(port, method, path, body=b'', headers=None):
+    """One request on a fresh connection; returns (status, headers, body)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        lines = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: close', f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+        return await _response(reader)
+    finally:
+        writer.close()
+
+
+async def _response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        response_headers[name.strip().lower()] = value.strip()
+    if 'content-length' in response_headers:
+        body = await reader.readexactly(int(response_headers['content-length']))
+    else:
+        body = await reader.read()
+    return int(status_line.split()[1]), response_headers, body
+
+
+async def wait_until_ready(port, timeout=120):
+    """Waits for /ready, so the model's background load is not part of the measurement."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await request(port, 'GET', '/ready'))[0] == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def slow_chunk(port, headers, upload_id, size, hold, steps=20):
+    """PUTs `size` bytes as one chunk, sent in `steps` pieces spread over `hold` seconds."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        head = [f'PUT /uploads/{upload_id} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: close',
+                f'Content-Length: {size}', 'Upload-Offset: 0', 'Content-Type: application/offset+octet-stream']
+        head += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode())
+        piece = size // steps
+        for i in range(steps):
+            writer.write(b'x' * (piece if i < steps - 1 else size - piece * (steps - 1)))
+            await writer.drain()
+            await asyncio.sleep(hold / steps)
+        return (await _response(reader))[0]
+    finally:
+        writer.close()
+
+
+async def probe(port, headers, interval, latencies, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            status, _, _ = await asyncio.wait_for(request(port, 'GET', '/documents', headers=headers), 30)
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(interval)
+
+
+async def sample(pid, peaks, stop):
+    while not stop.is_set():
+        peaks['threads'] = max(peaks['threads'], _threads(pid))
+        peaks['rss'] = max(peaks['rss'], _cpu_and_rss(pid)[1])
+        await asyncio.sleep(0.2)
+
+
+async def measure(server, args):
+    run_dir = tempfile.mkdtemp(prefix='bench_asgi_')
+    port = free_port()
+    options = argparse.Namespace(server=server, workers=1, threads=1, accounts=2, admission=False)
+    process = start_server(options, run_dir, port)
+    try:
+        await wait_until_ready(port)
+        _, _, body = await request(port, 'POST', '/login', json.dumps({'username': 'load_user_0', 'password': PASSWORD}).encode(),
+                                   {'Content-Type': 'application/json'})
+        headers = {'Authorization': f"Bearer {json.loads(body)['access_token']}"}
+        upload_ids = []
+        for _ in range(args.connections):
+            _, _, body = await request(port, 'POST', '/uploads', json.dumps(
+                {'filename': 'scan.png', 'size': args.chunk_bytes, 'purpose': 'document'}).encode(),
+                dict(headers, **{'Content-Type': 'application/json'}))
+            upload_ids.append(json.loads(body)['upload_id'])
+
+        idle_threads, idle_rss = _threads(process.pid), _cpu_and_rss(process.pid)[1]
+        peaks = {'threads': idle_threads, 'rss': idle_rss}
+        latencies, stop = [], asyncio.Event()
+        background = [asyncio.create_task(probe(port, headers, args.probe_interval, latencies, stop)),
+                      asyncio.create_task(sample(process.pid, peaks, stop))]
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(slow_chunk(port, headers, upload_id, args.chunk_bytes, args.hold) for upload_id in upload_ids),
+            return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*background)
+
+        latencies.sort()
+        return {
+            'accepted': sum(1 for r in results if r == 200),
+            'rejected': sum(1 for r in results if isinstance(r, int) and r != 200),
+            'failed': sum(1 for r in results if isinstance(r, BaseException)),
+            'seconds': elapsed,
+            'probe_p50': _percentile(latencies, 50) if latencies else None,
+            'probe_p95': _percentile(latencies, 95) if latencies else None,
+            'idle_threads': idle_threads,
+            'peak_threads': peaks['threads'],
+            'idle_rss_mb': idle_rss / 1024 / 1024,
+            'peak_rss_mb': peaks['rss'] / 1024 / 1024,
+        }
+    finally:
+        process.terminate()
+        process.wait(30)
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--connections', type=int, default=500, help='Concurrent slow upload connections.')
+    parser.add_argument('--hold', type=float, default=10.0, help='Seconds each chunk takes to send.')
+    parser.add_argument('--chunk-bytes', type=int, default=64 * 1024, help='Size of each chunk.')
+    parser.add_argument('--probe-interval', type=float, default=0.25, help='Seconds between probe requests.')
+    args = parser.parse_args()
+
+    print(f"{args.connections} connections, each sending {args.chunk_bytes // 1024} KB over {args.hold:.0f}s")
+    print(f"{'server':10} {'accepted':>8} {'rejected':>8} {'failed':>6} {'seconds':>7} {'probe p50':>10} {'probe p95':>10} "
+          f"{'threads':>13} {'RSS MB':>15}")
+    for server in ('werkzeug', 'uvicorn'):
+        r = asyncio.run(measure(server, args))
+        p50 = f"{r['probe_p50']:.1f} ms" if r['probe_p50'] is not None else '-'
+        p95 = f"{r['probe_p95']:.1f} ms" if r['probe_p95'] is not None else '-'
+        print(f"{server:10} {r['accepted']:>8} {r['rejected']:>8} {r['failed']:>6} {r['seconds']:>7.1f} {p50:>10} {p95:>10} "
+              f"{r['idle_threads']:>5} -> {r['peak_threads']:<5} {r['idle_rss_mb']:>6.0f} -> {r['peak_rss_mb']:<6.0f}")
+
+
+if __name__ == '__main__':
+    main()
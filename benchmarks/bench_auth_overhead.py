@@ -0,0 +1,88 @@
+# benchmarks/bench_auth_overhead.py
+
+"""
+Measures the per-request overhead of authentication/authorization with the
+user cache disabled (every lookup hits the database) and enabled.
+
+Usage (from the project root):
+    python benchmarks/bench_auth_overhead.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from app.services import user_cache
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    TESTING = True
+
+
+def run(app, iterations):
+    client = app.test_client()
+    with app.app_context():
+        doctor_id = str(User.query.filter_by(username='bench_doctor').first().id)
+        patient_id = str(User.query.filter_by(username='bench_patient').first().id)
+        doctor_headers = {'Authorization': f'Bearer {create_access_token(identity=doctor_id)}'}
+        patient_headers = {'Authorization': f'Bearer {create_access_token(identity=patient_id)}'}
+
+    timings = {}
+    for label, path, headers in (
+        ('token issuance', None, None),
+        ('GET /profile', '/profile', patient_headers),
+        ('GET /doctor/patients', '/doctor/patients', doctor_headers),
+    ):
+        start = time.perf_counter()
+        if path is None:
+            with app.app_context():
+                for _ in range(iterations):
+                    create_access_token(identity=patient_id)
+        else:
+            for _ in range(iterations):
+                response = client.get(path, headers=headers)
+                assert response.status_code == 200, response.get_data(as_text=True)
+        timings[label] = (time.perf_counter() - start) / iterations * 1e6
+    return timings
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = create_app(BenchConfig)
+
+    with app.app_context():
+        db.create_all()
+        doctor = User(username='bench_doctor', email='doctor@bench.local', role='Doctor')
+        patient = User(username='bench_patient', email='patient@bench.local')
+        doctor.password_hash = patient.password_hash = 'x'
+        db.session.add_all([doctor, patient])
+        db.session.commit()
+
+    results = {}
+    for mode, ttl in (('before (no cache)', 0), ('after (cached)', 300)):
+        app.config['USER_CACHE_TTL'] = ttl
+        user_cache.clear()
+        results[mode] = run(app, iterations)
+        results[mode]['_stats'] = user_cache.stats()
+
+    print(f"\n--- Authenticated request overhead ({iterations} iterations, mean us/request) ---")
+    labels = [label for label in results['before (no cache)'] if not label.startswith('_')]
+    print(f"{'':24}{'before':>12}{'after':>12}{'speedup':>10}")
+    for label in labels:
+        before = results['before (no cache)'][label]
+        after = results['after (cached)'][label]
+        print(f"{label:24}{before:12.1f}{after:12.1f}{before / after:9.2f}x")
+
+    stats = results['after (cached)']['_stats']
+    print(f"\nCache: {stats['hits']} hits, {stats['misses']} misses, hit rate {stats['hit_rate']:.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_mail_outbox.py
+
+"""
+Measures email outbox throughput against a local SMTP stand-in, and the
+latency of /forgot-password for existing vs. unknown addresses.
+
+Requires aiosmtpd (pip install aiosmtpd), which provides the local SMTP sink.
+
+Usage (from the project root):
+    python benchmarks/bench_mail_outbox.py [messages]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+
+from app import create_app, db
+from app.models import User, EmailOutbox
+from app.services import mail_outbox
+from config import Config
+
+SMTP_PORT = 8025
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    MAIL_SERVER = '127.0.0.1'
+    MAIL_PORT = SMTP_PORT
+    MAIL_USE_TLS = False
+    MAIL_USERNAME = None
+    MAIL_PASSWORD = None
+    MAIL_OUTBOX_WORKER = False
+    MAIL_OUTBOX_BATCH_SIZE = 500
+    ADMISSION_CONTROL = False  # Measures throughput, not load shedding
+
+
+def time_forgot_password(client, email, iterations=200):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.post('/forgot-password', json={'email': email})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=SMTP_PORT)
+    controller.start()
+
+    app = create_app(BenchConfig)
+    client = app.test_client()
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench_user', email='user@bench.local')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+
+        print("\n--- /forgot-password latency (ms, median / p99) ---")
+        for label, email in (('existing account', 'user@bench.local'), ('unknown address', 'nobody@bench.local')):
+            median, p99 = time_forgot_password(client, email)
+            print(f"{label:18} {median:8.2f} / {p99:8.2f}")
+
+        with app.app_context():
+            EmailOutbox.query.delete()
+            db.session.commit()
+            for i in range(total):
+                mail_outbox.enqueue(f'patient{i}@bench.local', 'Benchmark message', f'Message number {i}')
+            db.session.commit()
+
+            start = time.perf_counter()
+            totals = mail_outbox.drain()
+            elapsed = time.perf_counter() - start
+
+        print(f"\n--- Outbox delivery of {total} queued messages ---")
+        print(f"Sent: {totals['sent']}  Retried: {totals['retried']}  Received by SMTP sink: {handler.received}")
+        print(f"Elapsed: {elapsed:.2f}s  Throughput: {totals['sent'] / elapsed:.0f} messages/s")
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
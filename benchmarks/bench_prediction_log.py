@@ -0,0 +1,147 @@
+# benchmarks/bench_prediction_log.py
+
+"""
+Sustained throughput with 16 concurrent clients for each way of storing
+predictions, on a file-backed SQLite database:
+
+  baseline      - commit per request, rollback journal, synchronous=FULL (the old setup)
+  sync/<level>  - commit per request, WAL
+  group/<level> - group commit with WAL; each request waits for its batch
+  async/NORMAL  - write-behind with WAL; requests return before the commit
+
+FULL fsyncs every commit, which is where group commit pays off; NORMAL only
+fsyncs at WAL checkpoints.
+
+Two numbers per mode: the prediction-log write path alone (what the commit mode
+changes) and end-to-end POST /predict, where model scoring and SHAP usually
+dominate.
+
+Usage (from the project root):
+    python benchmarks/bench_prediction_log.py [seconds_per_run] [clients]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User, Prediction
+from app.services import prediction_log, prediction_service
+from config import Config
+
+MODES = (
+    ('baseline', 'sync', False, 'FULL'),
+    ('sync/FULL', 'sync', True, 'FULL'),
+    ('group/FULL', 'group', True, 'FULL'),
+    ('sync/NORMAL', 'sync', True, 'NORMAL'),
+    ('group/NORMAL', 'group', True, 'NORMAL'),
+    ('async/NORMAL', 'async', True, 'NORMAL'),
+)
+
+PREDICT_BODY = {"age": 54, "sex": 1, "cp": 3, "trestbps": 140, "chol": 239, "fbs": 0, "restecg": 1,
+                "thalach": 160, "exang": 0, "oldpeak": 1.2, "slope": 2, "ca": 0, "thal": 2}
+
+
+def make_app(db_path, mode, wal, synchronous):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 20, 'max_overflow': 0}
+        TESTING = True
+        MAIL_OUTBOX_WORKER = False
+        DRIFT_MONITORING = False
+        PREDICTION_LOG_MODE = mode
+        SQLITE_WAL = wal
+        SQLITE_SYNCHRONOUS = synchronous
+        ADMISSION_CONTROL = False  # Measures throughput, not load shedding
+
+    app = create_app(BenchConfig, model_loading='lazy')
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@bench.local')
+        user.password_hash = 'x'
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    return app, user_id
+
+
+def sustained(clients, seconds, work):
+    """Runs `work()` in a loop on `clients` threads for `seconds`; returns completed calls per second."""
+    counts = [0] * clients
+    stop = threading.Event()
+
+    def client(i):
+        while not stop.is_set():
+            work()
+            counts[i] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def run_mode(label, mode, wal, synchronous, seconds, clients, record):
+    tmp_dir = tempfile.mkdtemp(prefix='bench_prediction_log_')
+    try:
+        app, user_id = make_app(os.path.join(tmp_dir, 'bench.db'), mode, wal, synchronous)
+
+        def write_only():
+            with app.app_context():
+                prediction_log.save(user_id=user_id, prediction_result=1, risk_category='High', **record)
+
+        with app.app_context():
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        local = threading.local()
+
+        def predict():
+            if not hasattr(local, 'client'):
+                local.client = app.test_client()
+            response = local.client.post('/predict', json=PREDICT_BODY, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        log_rate = sustained(clients, seconds, write_only)
+        predict_rate = sustained(clients, seconds, predict)
+        prediction_log.stop_worker()  # Flushes the queue, as on shutdown
+        log_stats = prediction_log.stats()
+
+        with app.app_context():
+            stored = Prediction.query.count()
+            db.session.remove()
+            db.engine.dispose()
+        return log_rate, predict_rate, stored, log_stats
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    prediction_service.load_models()
+    _, record = prediction_service.predict_with_record(PREDICT_BODY, monitor=False)
+
+    print(f"\n--- Prediction storage throughput ({clients} clients, {seconds:.0f}s per run, requests/s) ---")
+    print(f"{'':14}{'log writes':>12}{'/predict':>12}{'stored':>10}{'avg batch':>11}")
+    for label, mode, wal, synchronous in MODES:
+        before = prediction_log.stats()
+        log_rate, predict_rate, stored, after = run_mode(label, mode, wal, synchronous, seconds, clients, record)
+        batches = after['batches'] - before['batches']
+        written = after['written'] - before['written']
+        avg_batch = f"{written / batches:.1f}" if batches else '-'
+        print(f"{label:14}{log_rate:12.0f}{predict_rate:12.1f}{stored:10d}{avg_batch:>11}")
+
+
+if __name__ == '__main__':
+    main()
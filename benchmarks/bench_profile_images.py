@@ -0,0 +1,101 @@
+# benchmarks/bench_profile_images.py
+
+"""
+Measures the profile picture pipeline on a synthetic phone-camera photo:
+rendering every size as JPEG and WebP with and without draft-mode decoding,
+the upload request, and serving a stored rendition (plain and revalidated
+with its ETag).
+
+Usage (from the project root):
+    python benchmarks/bench_profile_images.py [iterations]
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from app.services import image_service
+from config import Config
+
+
+def photo(width=4032, height=3024):
+    """A noisy 12 MP JPEG, roughly what a phone uploads."""
+    from PIL import Image
+    image = Image.effect_noise((width, height), 64).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def render_full_decode(data, sizes):
+    """image_service.render without draft mode: every pixel of the source is decoded."""
+    from PIL import Image, ImageOps
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    for size in sorted(sizes, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for image_format, _, options in image_service.FORMATS.values():
+            image.save(io.BytesIO(), format=image_format, **options)
+
+
+def timed(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    upload_dir = tempfile.mkdtemp(prefix='bench_profile_images_')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+        TESTING = True
+        UPLOAD_FOLDER = upload_dir
+        MAIL_OUTBOX_WORKER = False
+        ADMISSION_CONTROL = False
+
+    try:
+        app = create_app(BenchConfig, model_loading='lazy')
+        data = photo()
+        sizes = app.config['PROFILE_IMAGE_SIZES']
+        print(f"Source: 4032x3024 JPEG, {len(data) / 1024:.0f} KB")
+        print(f"  {len(sizes)} sizes x {len(image_service.FORMATS)} formats, full decode:  "
+              f"{timed(lambda: render_full_decode(data, sizes), iterations):8.1f} ms")
+        print(f"  {len(sizes)} sizes x {len(image_service.FORMATS)} formats, draft decode: "
+              f"{timed(lambda: image_service.render(data, sizes), iterations):8.1f} ms")
+
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench_patient', email='bench_patient@bench.local')
+            user.set_password('pw')
+            db.session.add(user)
+            db.session.commit()
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/profile/picture', headers=headers, content_type='multipart/form-data',
+                               data={'picture': (io.BytesIO(data), 'photo.jpg')})
+        print(f"  POST /profile/picture (first upload): {(time.perf_counter() - start) * 1000:8.1f} ms")
+        url = response.get_json()['profile_image'][str(min(sizes))]['webp']
+
+        requests = iterations * 200
+        etag = client.get(url).headers['ETag']
+        print(f"  GET rendition:                        {timed(lambda: client.get(url).close(), requests):8.3f} ms")
+        print(f"  GET rendition, If-None-Match (304):   "
+              f"{timed(lambda: client.get(url, headers={'If-None-Match': etag}).close(), requests):8.3f} ms")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_request_overhead.py
+
+"""
+Measures request parsing and response serialization overhead: a per-request
+flask-restful RequestParser against the compiled schemas, and the stock
+flask-restful/stdlib JSON output against the fast JSON provider, on a /predict
+body, a /predict response (NumPy SHAP values) and a 500-row /predictions list.
+
+Usage (from the project root):
+    python benchmarks/bench_request_overhead.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask_restful import reqparse
+from flask_restful.representations.json import output_json as restful_output_json
+
+from app import create_app, schemas
+from app.serialization import output_json
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    TESTING = True
+
+
+PREDICT_BODY = {"age": 54, "sex": 1, "cp": 3, "trestbps": 140, "chol": 239, "fbs": 0, "restecg": 1,
+                "thalach": 160, "exang": 0, "oldpeak": 1.2, "slope": 2, "ca": 0, "thal": 2}
+
+INT_FEATURES = [name for name in PREDICT_BODY if name != 'oldpeak']
+
+
+def reqparse_parse():
+    # What PredictionAPI did before: a new parser and 13 arguments per request.
+    parser = reqparse.RequestParser()
+    for name in INT_FEATURES:
+        parser.add_argument(name, type=int, required=True)
+    parser.add_argument('oldpeak', type=float, required=True)
+    return parser.parse_args()
+
+
+def predict_response():
+    rng = np.random.default_rng(0)
+    impacts = rng.normal(scale=0.05, size=len(PREDICT_BODY))
+    return {
+        'prediction': 1,
+        'probability': np.float64(0.91),
+        'risk_category': 'High',
+        'explanations': [
+            {'feature': name, 'value_provided': str(value), 'impact': impact,
+             'description': f"Your value of '{value}' for '{name}' increased your risk."}
+            for (name, value), impact in zip(PREDICT_BODY.items(), impacts)
+        ],
+        'base_value': np.float64(0.461),
+        'recommendations': [{'feature': 'chol', 'advice': 'Reduce saturated fats.'}]
+    }
+
+
+def prediction_list():
+    return [
+        {'id': i, 'prediction_result': i % 2, 'risk_category': ('Low', 'Medium', 'High')[i % 3],
+         'probability': 0.5 + (i % 50) / 100, 'timestamp': '2026-10-19T12:00:00.000000'}
+        for i in range(500)
+    ]
+
+
+def to_builtin(obj):
+    # The stock encoder cannot serialize every NumPy type, so callers converted by hand.
+    if isinstance(obj, dict):
+        return {key: to_builtin(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [to_builtin(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = create_app(BenchConfig, model_loading='lazy')
+
+    rows = []
+    with app.test_request_context('/predict', method='POST', json=PREDICT_BODY):
+        assert reqparse_parse() == schemas.PREDICTION.parse()
+        rows.append(('parse /predict body', timed(reqparse_parse, iterations), timed(schemas.PREDICTION.parse, iterations)))
+
+        for label, payload in (('serialize /predict response', predict_response()),
+                               ('serialize 500 predictions', prediction_list())):
+            rows.append((
+                label,
+                timed(lambda: restful_output_json(to_builtin(payload), 200), iterations),
+                timed(lambda: output_json(payload, 200), iterations)
+            ))
+
+    print(f"\n--- Request parse + serialize overhead ({iterations} iterations, mean us/call) ---")
+    print(f"{'':30}{'before':>12}{'after':>12}{'speedup':>10}")
+    for label, before, after in rows:
+        print(f"{label:30}{before:12.1f}{after:12.1f}{before / after:9.2f}x")
+    total_before = rows[0][1] + rows[1][1]
+    total_after = rows[0][2] + rows[1][2]
+    print(f"{'/predict parse + serialize':30}{total_before:12.1f}{total_after:12.1f}{total_before / total_after:9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
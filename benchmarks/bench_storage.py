@@ -0,0 +1,91 @@
+# benchmarks/bench_storage.py
+
+"""
+Measures the configured storage backend (STORAGE_BACKEND and friends, read from
+the environment like the app does) on one large file:
+
+  save         - streaming a generated file in (multipart above STORAGE_MULTIPART_THRESHOLD on S3)
+  stream       - reading it back through stream(), bypassing the cache
+  open, cold   - open() with an empty read-through cache (S3: a full download)
+  open, warm   - open() again (S3: one HEAD request to revalidate)
+  open, pinned - open(verify=False), as content-addressed renditions are read
+
+Each step reports its throughput and the traced Python heap peak, which
+should stay at a few copy buffers (plus the multipart parts in flight on S3)
+however large the file is.
+
+Usage (from the project root):
+    python benchmarks/bench_storage.py [size_mb]
+    STORAGE_BACKEND=s3 STORAGE_S3_BUCKET=bench STORAGE_S3_ENDPOINT_URL=http://127.0.0.1:9000 \\
+        python benchmarks/bench_storage.py 256
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from check_upload_memory import ChunkStream, MB
+from app import create_app
+from app.services import storage
+from config import Config
+
+
+def measure(label, function, size=None):
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    throughput = f"{size / MB / elapsed:6.0f} MB/s" if size else ' ' * 11
+    print(f"  {label:14}{elapsed * 1000:9.1f} ms {throughput}   heap peak {peak / MB:6.1f} MB")
+
+
+def drain(chunks):
+    for _ in chunks:
+        pass
+
+
+def read(f):
+    with f:
+        drain(iter(lambda: f.read(storage.COPY_BUFFER_SIZE), b''))
+
+
+def main():
+    size = int(float(sys.argv[1]) * MB) if len(sys.argv) > 1 else 128 * MB
+    scratch = tempfile.mkdtemp(prefix='bench_storage_')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+        TESTING = True
+        MAIL_OUTBOX_WORKER = False
+        UPLOAD_FOLDER = os.path.join(scratch, 'uploads')
+        STORAGE_CACHE_DIR = os.path.join(scratch, 'cache')
+
+    key = f'bench/storage_{os.getpid()}.bin'
+    try:
+        app = create_app(BenchConfig, model_loading='lazy')
+        with app.app_context():
+            files = storage.get_storage()
+            print(f"{files.name} storage, {size / MB:.0f} MB file")
+            tracemalloc.start()
+            measure('save', lambda: files.save(key, ChunkStream(size, 7)), size)
+            assert files.size(key) == size
+            measure('stream', lambda: drain(files.stream(key)), size)
+            if files.name == 's3':
+                shutil.rmtree(BenchConfig.STORAGE_CACHE_DIR)  # save() left a cached copy
+            measure('open, cold', lambda: read(files.open(key)), size)
+            measure('open, warm', lambda: files.open(key).close())
+            measure('open, pinned', lambda: files.open(key, verify=False).close())
+            tracemalloc.stop()
+            files.delete(key)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/check_export_memory.py
+
+"""
+Checks that /doctor/export streams in constant memory: seeds a file-backed
+SQLite database with synthetic predictions, then downloads a small and a large
+export (CSV and, if pyarrow is installed, Parquet) while tracing the Python heap.
+Reports time to first byte, throughput and heap peak for each.
+
+Exits with status 1 if the heap peak of the large export is well above that of
+the small one, i.e. if memory grows with the number of rows exported.
+
+Usage (from the project root):
+    python benchmarks/check_export_memory.py [rows]
+"""
+
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User, Prediction
+from config import Config
+
+MB = 1024 * 1024
+PATIENTS = 200
+SEED_BATCH = 20000
+VECTOR = struct.Struct('<26f')  # 13 input features followed by 13 SHAP contributions
+
+
+def seed(rows):
+    rng = random.Random(42)
+    patients = []
+    for i in range(PATIENTS):
+        user = User(username=f'patient{i}', email=f'patient{i}@check.local')
+        user.password_hash = 'x'
+        patients.append(user)
+    doctor = User(username='doctor', email='doctor@check.local', role='Doctor')
+    doctor.password_hash = 'x'
+    db.session.add_all(patients + [doctor])
+    db.session.commit()
+
+    start = datetime(2024, 1, 1)
+    for offset in range(0, rows, SEED_BATCH):
+        batch = []
+        for i in range(offset, min(rows, offset + SEED_BATCH)):
+            probability = rng.random()
+            batch.append({
+                'user_id': patients[i % PATIENTS].id,
+                'timestamp': start + timedelta(minutes=i),
+                'prediction_result': int(probability >= 0.5),
+                'risk_category': 'High' if probability >= 0.7 else 'Medium' if probability >= 0.4 else 'Low',
+                'probability': probability,
+                'model_version': 'check',
+                'feature_vector': VECTOR.pack(*(rng.uniform(0, 300) for _ in range(26)))
+            })
+        db.session.execute(db.insert(Prediction), batch)
+        db.session.commit()
+    return create_access_token(identity=str(doctor.id))
+
+
+def download(client, headers, query):
+    """Reads the streamed body piece by piece, as a WSGI server would, and discards it."""
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    response = client.get(f'/doctor/export?{query}', headers=headers, buffered=False)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    first_byte, size = None, 0
+    for piece in response.response:
+        if first_byte is None and piece:
+            first_byte = time.perf_counter() - start
+        size += len(piece)
+    response.close()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return first_byte, elapsed, size, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    small = max(1, rows // 10)
+    data_dir = tempfile.mkdtemp(prefix='check_export_memory_')
+
+    class CheckConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(data_dir, 'check.db')
+        TESTING = True
+        MAIL_OUTBOX_WORKER = False
+        DRIFT_MONITORING = False
+        ADMISSION_CONTROL = False
+
+    try:
+        app = create_app(CheckConfig, model_loading='lazy')
+        with app.app_context():
+            db.create_all()
+            print(f"Seeding {rows} predictions...")
+            headers = {'Authorization': f'Bearer {seed(rows)}'}
+            # The small export covers the first tenth of the rows by date.
+            small_end = (datetime(2024, 1, 1) + timedelta(minutes=small - 1)).isoformat()
+        client = app.test_client()
+
+        formats = ['csv']
+        try:
+            import pyarrow  # noqa: F401
+            formats.append('parquet')
+        except ImportError:
+            print("pyarrow is not installed: checking CSV only.")
+
+        chunk_size = app.config['EXPORT_CHUNK_SIZE']
+        print(f"\n--- /doctor/export, {chunk_size} rows per chunk ---")
+        print(f"{'format':9}{'rows':>9}{'first byte':>12}{'rows/s':>10}{'size':>9}{'heap peak':>11}")
+        tracemalloc.start()
+        download(client, headers, 'format=csv&risk=High')  # Warm-up: imports and model columns
+        failed = False
+        for fmt in formats:
+            peaks = []
+            for count, query in ((small, f'format={fmt}&end={small_end}'), (rows, f'format={fmt}')):
+                first_byte, elapsed, size, peak = download(client, headers, query)
+                peaks.append(peak)
+                print(f"{fmt:9}{count:9d}{first_byte * 1000:10.0f}ms{count / elapsed:10.0f}"
+                      f"{size / MB:7.1f}MB{peak / MB:9.1f}MB")
+            # Ten times the rows may cost a little more heap (allocator noise), never ten times more.
+            if peaks[1] > 1.5 * peaks[0] + 1 * MB:
+                failed = True
+        tracemalloc.stop()
+
+        if failed:
+            print("\nFAIL: memory grew with the number of rows exported")
+            sys.exit(1)
+        print("\nOK: memory stayed flat")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/check_startup_budget.py
+
+"""
+Reports `python -X importtime` totals for building the Flask app (as CLI
+commands and workers do) and exits with status 1 when startup exceeds the
+budget or when a heavy dependency is imported eagerly. Suitable for CI.
+
+Usage (from the project root):
+    python benchmarks/check_startup_budget.py [--budget-ms 1500] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a prediction, OCR or PDF export runs.
+HEAVY_MODULES = ('pandas', 'shap', 'sklearn', 'numba', 'matplotlib', 'PIL', 'fpdf', 'pytesseract')
+
+STARTUP_CODE = "from app import create_app; create_app(model_loading='lazy')"
+
+
+def parse_importtime(stderr):
+    """Returns a list of (module, self_us, cumulative_us, depth) from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the app factory against a startup-time budget.')
+    parser.add_argument('--budget-ms', type=float, default=1500.0, help='Maximum total import time in milliseconds')
+    parser.add_argument('--top', type=int, default=15, help='How many of the slowest top-level imports to list')
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    env['MODEL_LOADING'] = 'lazy'
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        print(result.stderr)
+        print("Error: building the app failed.")
+        return 1
+
+    rows = parse_importtime(result.stderr)
+    top_level = [row for row in rows if row[3] == 0]
+    total_ms = sum(row[2] for row in top_level) / 1000
+
+    print(f"\n--- App factory startup ({len(rows)} modules imported) ---")
+    print(f"Total import time: {total_ms:.1f} ms   Wall clock incl. interpreter: {wall_ms:.1f} ms   Budget: {args.budget_ms:.0f} ms")
+    print(f"\nSlowest top-level imports:")
+    for name, _, cumulative_us, _ in sorted(top_level, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:10.1f} ms  {name}")
+
+    imported = {row[0] for row in rows}
+    eager = [module for module in HEAVY_MODULES if module in imported]
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nFAIL: startup import time {total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\nOK: startup is within budget.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
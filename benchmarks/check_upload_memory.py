@@ -0,0 +1,152 @@
+# benchmarks/check_upload_memory.py
+
+"""
+Checks that a large resumable upload keeps the server's memory flat: streams a
+file of the given size (500 MB by default) through /uploads in chunks that are
+generated on the fly, sampling the Python heap (tracemalloc) and the process
+RSS every 100 MB, then completes it as a document upload.
+
+Exits with status 1 if the traced heap peak while receiving chunks exceeds a
+few chunk sizes, i.e. if anything on the request path buffers whole chunks
+repeatedly or the whole file. Completion (checksum, move, OCR) is reported
+separately; its first run also pays for importing PIL and pytesseract.
+
+Usage (from the project root):
+    python benchmarks/check_upload_memory.py [total_mb] [chunk_mb]
+"""
+
+import io
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User, MedicalDocument
+from app.services import storage
+from config import Config
+
+MB = 1024 * 1024
+SAMPLE_EVERY = 100 * MB
+PATTERN = os.urandom(64 * 1024)
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / MB
+
+
+class ChunkStream(io.RawIOBase):
+    """
+    `length` pseudo-random bytes produced as they are read, so the check itself
+    holds no chunk in memory. Seekable because the test client measures the body.
+    """
+
+    def __init__(self, length, seed):
+        self.length = length
+        self.position = 0
+        self.shift = seed % len(PATTERN)  # Different bytes per chunk without allocating a pattern each
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.length}[whence]
+        self.position = max(0, min(self.length, base + offset))
+        return self.position
+
+    def readinto(self, buffer):
+        start = (self.position + self.shift) % len(PATTERN)
+        n = min(len(buffer), self.length - self.position, len(PATTERN) - start)
+        buffer[:n] = PATTERN[start:start + n]
+        self.position += n
+        return n
+
+
+def main():
+    total = int(float(sys.argv[1]) * MB) if len(sys.argv) > 1 else 500 * MB
+    chunk_size = int(float(sys.argv[2]) * MB) if len(sys.argv) > 2 else 8 * MB
+    upload_dir = tempfile.mkdtemp(prefix='check_upload_memory_')
+
+    class CheckConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+        TESTING = True
+        MAIL_OUTBOX_WORKER = False
+        DRIFT_MONITORING = False
+        UPLOAD_FOLDER = upload_dir
+        UPLOAD_CHUNK_SIZE = chunk_size
+
+    try:
+        app = create_app(CheckConfig, model_loading='lazy')
+        with app.app_context():
+            db.create_all()
+            user = User(username='check', email='check@check.local')
+            user.password_hash = 'x'
+            db.session.add(user)
+            db.session.commit()
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        client = app.test_client()
+
+        response = client.post('/uploads', json={'filename': 'large_scan.pdf', 'size': total}, headers=headers)
+        assert response.status_code == 201, response.get_data(as_text=True)
+        upload_id = response.get_json()['upload_id']
+
+        print(f"\n--- Resumable upload of {total / MB:.0f} MB in {chunk_size / MB:.0f} MB chunks ---")
+        print(f"{'received':>10}{'heap now':>11}{'heap peak':>11}{'RSS':>9}")
+        tracemalloc.start()
+        rss_start = rss_mb()
+        offset, next_sample, chunk_index = 0, 0, 0
+        start = time.perf_counter()
+        while offset < total:
+            length = min(chunk_size, total - offset)
+            response = client.put(
+                f'/uploads/{upload_id}', input_stream=ChunkStream(length, chunk_index * 4099),
+                headers={**headers, 'Upload-Offset': str(offset)}
+            )
+            assert response.status_code == 200, response.get_data(as_text=True)
+            offset = response.get_json()['offset']
+            chunk_index += 1
+            if offset >= next_sample:
+                current, peak = tracemalloc.get_traced_memory()
+                print(f"{offset / MB:8.0f}MB{current / MB:9.1f}MB{peak / MB:9.1f}MB{rss_mb():7.0f}MB")
+                next_sample += SAMPLE_EVERY
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        rss_transfer = rss_mb()
+
+        tracemalloc.reset_peak()
+        response = client.post(f'/uploads/{upload_id}/complete', headers=headers)
+        assert response.status_code == 201, response.get_data(as_text=True)
+        _, complete_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with app.app_context():
+            assert MedicalDocument.query.filter_by(filename='large_scan.pdf').count() == 1
+            assert storage.get_storage().size('large_scan.pdf') == total
+
+        limit = 4 * chunk_size
+        print(f"\nTransfer: {total / MB / elapsed:.0f} MB/s; heap peak {peak / MB:.1f} MB "
+              f"(limit {limit / MB:.0f} MB); RSS grew {rss_transfer - rss_start:.0f} MB")
+        print(f"Completion: heap peak {complete_peak / MB:.1f} MB; RSS now {rss_mb():.0f} MB")
+        if peak > limit:
+            print("FAIL: memory grew with the upload size")
+            sys.exit(1)
+        print("OK: memory stayed flat")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
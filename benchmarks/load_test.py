@@ -0,0 +1,640 @@
+# benchmarks/load_test.py
+
+"""
+Mixed-workload load test that replays the API calls the frontend makes, with
+many concurrent virtual users, against a locally launched backend.
+
+Virtual users arrive at random (Poisson) at --rate per second for --duration
+seconds. Each one picks a flow according to --mix, for example
+"predictor=50,uploader=20,exporter=15,new_patient=10,browser=5", and waits a
+random think time (mean --think seconds) between steps, like a person would:
+
+  new_patient - register, log in, dashboard, predict, dashboard
+                (auth.js, dashboard.js, prediction.js)
+  predictor   - log in, dashboard, 1-3 predictions, dashboard
+  uploader    - log in, dashboard, resumable upload of a fixture scan
+                (main.js uploadResumable), documents list (documents.js)
+  exporter    - log in, profile history, PDF export of the latest prediction (profile.js)
+  browser     - log in, dashboard, documents list
+
+The client is a small asyncio HTTP/1.1 client with keep-alive connections, so
+thousands of virtual users fit in one process. The backend runs in a child
+process (Werkzeug threaded server by default, or gunicorn or uvicorn running
+the ASGI app with --server) on a
+throwaway database in a temporary run directory, seeded with --accounts
+returning users. Its CPU and RSS (summed over worker processes) are sampled
+from /proc throughout the run.
+
+The report gives per-endpoint request counts, throughput, latency percentiles,
+shed requests (429/503) and errors, plus a server resource timeline. Each run
+is saved as JSON under --output-dir; compare two runs with --compare.
+
+Usage (from the project root):
+    python benchmarks/load_test.py --rate 20 --duration 60 --label baseline
+    python benchmarks/load_test.py --server gunicorn --workers 4 --label gunicorn-4
+    python benchmarks/load_test.py --server uvicorn --workers 4 --label asgi-4
+    python benchmarks/load_test.py --compare benchmarks/load_runs/A.json benchmarks/load_runs/B.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+PASSWORD = 'load-test-password'
+
+DEFAULT_MIX = 'predictor=50,uploader=20,exporter=15,new_patient=10,browser=5'
+
+# Same ranges as the prediction form (and schemas.PREDICTION).
+FEATURE_RANGES = {
+    'age': (29, 77), 'sex': (0, 1), 'cp': (0, 3), 'trestbps': (94, 200), 'chol': (126, 564),
+    'fbs': (0, 1), 'restecg': (0, 2), 'thalach': (71, 202), 'exang': (0, 1), 'slope': (0, 2),
+    'ca': (0, 4), 'thal': (0, 3)
+}
+
+
+# --- Backend under test (runs in the child process) ---
+
+def server_app():
+    """
+    Builds the app for the child process from LOAD_TEST_* environment variables:
+    a fresh SQLite database and upload folder in the run directory, and
+    LOAD_TEST_ACCOUNTS seeded users sharing one password hash.
+    """
+    sys.path.insert(0, PROJECT_ROOT)
+    from app import create_app, db, bcrypt
+    from app.models import User
+    from app.services.file_lock import FileLock
+    from config import Config
+
+    run_dir = os.environ['LOAD_TEST_RUN_DIR']
+    accounts = int(os.environ.get('LOAD_TEST_ACCOUNTS', 0))
+
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(run_dir, 'load_test.db')
+        UPLOAD_FOLDER = os.path.join(run_dir, 'uploads')
+        DRIFT_STATE_PATH = os.path.join(run_dir, 'drift_state.json')
+        MAIL_OUTBOX_WORKER = False
+        # Every virtual user connects from 127.0.0.1, so the per-address auth rate
+        # would throttle the whole test; concurrency limits still apply.
+        ADMISSION_LIMITS = dict(Config.ADMISSION_LIMITS, auth=dict(Config.ADMISSION_LIMITS['auth'], rate=None))
+
+    os.makedirs(LoadTestConfig.UPLOAD_FOLDER, exist_ok=True)
+    app = create_app(LoadTestConfig, model_loading='background')
+    with app.app_context(), FileLock(os.path.join(run_dir, 'seed')):  # One seeder among gunicorn workers
+        db.create_all()
+        if User.query.count() == 0 and accounts:
+            password_hash = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+            db.session.bulk_insert_mappings(User, [
+                {'username': f'load_user_{i}', 'email': f'load_user_{i}@load.test', 'password_hash': password_hash}
+                for i in range(accounts)
+            ])
+            db.session.commit()
+    return app
+
+
+def asgi_server_app():
+    """server_app() wrapped for an ASGI server (uvicorn --factory)."""
+    app = server_app()
+    from app.asgi import AsgiApp
+    return AsgiApp(app)
+
+
+def serve(port):
+    from werkzeug.serving import run_simple
+    run_simple('127.0.0.1', port, server_app(), threaded=True, use_reloader=False)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, run_dir, port):
+    env = dict(os.environ, LOAD_TEST_RUN_DIR=run_dir, LOAD_TEST_ACCOUNTS=str(args.accounts),
+               ADMISSION_CONTROL='1' if args.admission else '0')
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--bind', f'127.0.0.1:{port}', '--chdir', BENCH_DIR, 'load_test:server_app()']
+    elif args.server == 'uvicorn':
+        command = [sys.executable, '-m', 'uvicorn', '--factory', '--workers', str(args.workers), '--host', '127.0.0.1',
+                   '--port', str(port), '--app-dir', BENCH_DIR, '--no-access-log', 'load_test:asgi_server_app']
+    else:
+        command = [sys.executable, os.path.abspath(__file__), '--serve', str(port)]
+    log = open(os.path.join(run_dir, 'server.log'), 'wb')
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+# --- Server resource sampling (Linux /proc) ---
+
+def _process_tree(pid):
+    pids = [pid]
+    for p in pids:
+        try:
+            for tid in os.listdir(f'/proc/{p}/task'):
+                with open(f'/proc/{p}/task/{tid}/children') as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _cpu_and_rss(pid):
+    """Total CPU seconds and resident bytes of a process and all its descendants."""
+    cpu, rss = 0.0, 0
+    ticks, page = os.sysconf('SC_CLK_TCK'), os.sysconf('SC_PAGE_SIZE')
+    for p in _process_tree(pid):
+        try:
+            with open(f'/proc/{p}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{p}/statm') as f:
+                rss += int(f.read().split()[1]) * page
+        except OSError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+    return cpu, rss
+
+
+async def sample_server(pid, interval, samples, recorder):
+    if not os.path.exists(f'/proc/{pid}'):
+        print("Note: /proc is not available; server CPU/RSS will not be reported.")
+        return
+    last_cpu, _ = _cpu_and_rss(pid)
+    last_time = time.perf_counter()
+    last_requests = 0
+    while True:
+        await asyncio.sleep(interval)
+        cpu, rss = _cpu_and_rss(pid)
+        now = time.perf_counter()
+        requests = recorder.total
+        samples.append({
+            't': round(now - recorder.start, 1),
+            'cpu_percent': round(100 * (cpu - last_cpu) / (now - last_time), 1),
+            'rss_mb': round(rss / 1024 / 1024, 1),
+            'requests_per_s': round((requests - last_requests) / (now - last_time), 1),
+            'active_users': recorder.active_users
+        })
+        last_cpu, last_time, last_requests = cpu, now, requests
+
+
+# --- Minimal asyncio HTTP/1.1 client ---
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 client with at most `max_connections` open connections."""
+
+    def __init__(self, host, port, max_connections, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def request(self, method, path, headers=None, body=b''):
+        """Returns (status, headers, body)."""
+        async with self._slots:
+            for attempt in range(2):
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+                try:
+                    status, response_headers, data, keep_alive = await asyncio.wait_for(
+                        self._exchange(reader, writer, method, path, headers or {}, body), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue  # The server closed an idle connection; retry on a fresh one
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, response_headers, data
+
+    async def _exchange(self, reader, writer, method, path, headers, body):
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+        head = await reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        version, status = status_line.split(' ', 2)[:2]
+        response_headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        if 'chunked' in response_headers.get('transfer-encoding', ''):
+            parts = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readuntil(b'\r\n')
+                    break
+                parts.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b''.join(parts)
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        elif method == 'HEAD' or status in ('204', '304'):
+            data = b''
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), response_headers, data, keep_alive
+
+
+# --- Results ---
+
+class Recorder:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.calls = {}  # endpoint -> [(seconds since start, latency seconds, status)]
+        self.total = 0
+        self.active_users = 0
+        self.flows = {}
+        self.dropped_arrivals = 0
+
+    def add(self, endpoint, latency, status):
+        self.calls.setdefault(endpoint, []).append((time.perf_counter() - self.start, latency, status))
+        self.total += 1
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for endpoint, calls in sorted(recorder.calls.items()):
+        latencies = sorted(latency for _, latency, _ in calls)
+        statuses = {}
+        for _, _, status in calls:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        shed = sum(count for status, count in statuses.items() if status in ('429', '503'))
+        errors = sum(count for status, count in statuses.items() if status == '0' or int(status) >= 400) - shed
+        endpoints[endpoint] = {
+            'count': len(calls),
+            'per_second': round(len(calls) / elapsed, 2),
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'shed': shed,
+            'errors': errors,
+            'statuses': statuses
+        }
+    return endpoints
+
+
+def print_report(run):
+    print(f"\n=== Load test '{run['label']}': {run['totals']['requests']} requests in {run['elapsed_s']:.0f}s "
+          f"({run['totals']['per_second']:.1f}/s), {run['totals']['sessions']} sessions ===")
+    print(f"{'endpoint':34}{'count':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'shed':>6}{'errors':>7}")
+    for endpoint, s in run['endpoints'].items():
+        print(f"{endpoint:34}{s['count']:7d}{s['per_second']:8.1f}{s['p50_ms']:7.0f}ms{s['p95_ms']:7.0f}ms"
+              f"{s['p99_ms']:7.0f}ms{s['max_ms']:7.0f}ms{s['shed']:6d}{s['errors']:7d}")
+    failing = {e: s['statuses'] for e, s in run['endpoints'].items() if s['errors']}
+    for endpoint, statuses in failing.items():
+        print(f"  {endpoint}: statuses {statuses}")
+    print(f"\nFlows: {run['flows']}; arrivals dropped at --max-users: {run['dropped_arrivals']}")
+
+    if run['timeline']:
+        print(f"\n{'t':>6}{'server CPU':>12}{'RSS':>10}{'req/s':>9}{'users':>8}")
+        step = max(1, len(run['timeline']) // 20)
+        for sample in run['timeline'][::step]:
+            print(f"{sample['t']:5.0f}s{sample['cpu_percent']:11.0f}%{sample['rss_mb']:8.0f}MB"
+                  f"{sample['requests_per_s']:9.1f}{sample['active_users']:8d}")
+        peak = max(run['timeline'], key=lambda s: s['rss_mb'])
+        mean_cpu = sum(s['cpu_percent'] for s in run['timeline']) / len(run['timeline'])
+        print(f"Mean server CPU {mean_cpu:.0f}%, peak RSS {peak['rss_mb']:.0f} MB")
+
+
+def compare(path_a, path_b):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+    print(f"\n=== '{a['label']}' ({a['started']}) vs '{b['label']}' ({b['started']}) ===")
+    print(f"{'endpoint':34}{'req/s':>16}{'p50 ms':>16}{'p95 ms':>16}{'shed+err %':>14}")
+
+    def failure_rate(s):
+        return 100 * (s['shed'] + s['errors']) / s['count'] if s['count'] else 0
+
+    for endpoint in sorted(set(a['endpoints']) | set(b['endpoints'])):
+        sa, sb = a['endpoints'].get(endpoint), b['endpoints'].get(endpoint)
+        if not sa or not sb:
+            print(f"{endpoint:34}  only in {'first' if sa else 'second'} run")
+            continue
+        print(f"{endpoint:34}{sa['per_second']:7.1f} → {sb['per_second']:6.1f}{sa['p50_ms']:7.0f} → {sb['p50_ms']:6.0f}"
+              f"{sa['p95_ms']:7.0f} → {sb['p95_ms']:6.0f}{failure_rate(sa):6.1f} → {failure_rate(sb):5.1f}")
+    print(f"{'total req/s':34}{a['totals']['per_second']:7.1f} → {b['totals']['per_second']:6.1f}")
+    if a['timeline'] and b['timeline']:
+        def mean_cpu(run):
+            return sum(s['cpu_percent'] for s in run['timeline']) / len(run['timeline'])
+        print(f"{'mean server CPU %':34}{mean_cpu(a):7.0f} → {mean_cpu(b):6.0f}")
+        print(f"{'peak server RSS MB':34}{max(s['rss_mb'] for s in a['timeline']):7.0f} → "
+              f"{max(s['rss_mb'] for s in b['timeline']):6.0f}")
+
+
+# --- Virtual users ---
+
+class VirtualUser:
+    def __init__(self, client, recorder, think, fixtures, username):
+        self.client, self.recorder, self.think_mean, self.fixtures = client, recorder, think, fixtures
+        self.username = username
+        self.headers = {}
+
+    async def think(self):
+        await asyncio.sleep(random.expovariate(1 / self.think_mean) if self.think_mean else 0)
+
+    async def call(self, endpoint, method, path, json_body=None, body=b'', headers=None):
+        """Performs and records one request; returns (status, parsed JSON or raw bytes)."""
+        headers = dict(self.headers, **(headers or {}))
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            status, response_headers, data = await self.client.request(method, path, headers, body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self.recorder.add(endpoint, time.perf_counter() - start, 0)
+            return 0, None
+        self.recorder.add(endpoint, time.perf_counter() - start, status)
+        if response_headers.get('content-type', '').startswith('application/json'):
+            try:
+                return status, json.loads(data)
+            except ValueError:
+                pass
+        return status, data
+
+    async def login(self):
+        status, data = await self.call('POST /login', 'POST', '/login',
+                                       {'username': self.username, 'password': PASSWORD})
+        if status == 200:
+            self.headers = {'Authorization': f"Bearer {data['access_token']}"}
+        return status == 200
+
+    async def dashboard(self, limit=50):
+        status, data = await self.call('GET /dashboard', 'GET', f'/dashboard?limit={limit}')
+        return data if status == 200 else None
+
+    async def predict(self):
+        body = {name: random.randint(low, high) for name, (low, high) in FEATURE_RANGES.items()}
+        body['oldpeak'] = round(random.uniform(0, 4), 1)
+        await self.call('POST /predict', 'POST', '/predict', body)
+
+    async def upload(self):
+        """Resumable upload of a fixture scan, chunk by chunk, as main.js uploadResumable does."""
+        filename, content = random.choice(self.fixtures)
+        status, state = await self.call('POST /uploads', 'POST', '/uploads',
+                                        {'filename': filename, 'size': len(content), 'purpose': 'document'})
+        if status != 201:
+            return
+        upload_id, offset, chunk_size = state['upload_id'], 0, state['chunk_size']
+        while offset < len(content):
+            chunk = content[offset:offset + chunk_size]
+            status, state = await self.call('PUT /uploads/{id}', 'PUT', f'/uploads/{upload_id}', body=chunk, headers={
+                'Upload-Offset': str(offset), 'Upload-Checksum': 'sha256 ' + hashlib.sha256(chunk).hexdigest()})
+            if status not in (200, 409):
+                return
+            offset = state['offset']
+        for _ in range(10):
+            status, data = await self.call('POST /uploads/{id}/complete', 'POST', f'/uploads/{upload_id}/complete')
+            if status not in (429, 503):
+                return
+            await asyncio.sleep(data.get('retry_after', 2) if isinstance(data, dict) else 2)
+
+
+async def flow_new_patient(user):
+    status, _ = await user.call('POST /register', 'POST', '/register',
+                                {'username': user.username, 'email': f'{user.username}@load.test', 'password': PASSWORD})
+    if status != 201 or not await user.login():
+        return
+    await user.dashboard()
+    await user.think()
+    await user.predict()
+    await user.think()
+    await user.dashboard()
+
+
+async def flow_predictor(user):
+    if not await user.login():
+        return
+    await user.dashboard()
+    for _ in range(random.randint(1, 3)):
+        await user.think()
+        await user.predict()
+    await user.think()
+    await user.dashboard()
+
+
+async def flow_uploader(user):
+    if not await user.login():
+        return
+    await user.dashboard()
+    await user.think()
+    await user.upload()
+    await user.think()
+    await user.call('GET /documents', 'GET', '/documents')
+
+
+async def flow_exporter(user):
+    if not await user.login():
+        return
+    history = await user.dashboard()
+    if history is not None and not history['latest_predictions']:
+        await user.predict()
+        history = await user.dashboard()
+    if history and history['latest_predictions']:
+        await user.think()
+        prediction_id = history['latest_predictions'][0]['id']
+        await user.call('GET /predictions/{id}/export', 'GET', f'/predictions/{prediction_id}/export')
+
+
+async def flow_browser(user):
+    if not await user.login():
+        return
+    await user.dashboard()
+    await user.think()
+    await user.call('GET /documents', 'GET', '/documents')
+
+
+FLOWS = {
+    'new_patient': flow_new_patient,
+    'predictor': flow_predictor,
+    'uploader': flow_uploader,
+    'exporter': flow_exporter,
+    'browser': flow_browser,
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in FLOWS:
+            raise SystemExit(f"Unknown flow '{name.strip()}'; choose from {', '.join(FLOWS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.pdf')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                fixtures.append((name, f.read()))
+    if not fixtures:
+        raise SystemExit(f"No fixture images found in {directory}")
+    return fixtures
+
+
+async def wait_until_ready(client, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _, _ = await client.request('GET', '/ready')
+            if status == 200:
+                return
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("The server did not become ready in time; see server.log in the run directory.")
+
+
+async def run_load(args, port, server_pid):
+    client = HttpClient('127.0.0.1', port, args.connections, args.timeout)
+    await wait_until_ready(client, args.startup_timeout)
+
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    fixtures = load_fixtures(args.fixtures)
+    recorder = Recorder()
+    timeline = []
+    sampler = asyncio.create_task(sample_server(server_pid, args.sample_interval, timeline, recorder)) if server_pid else None
+
+    async def session(name, n):
+        recorder.active_users += 1
+        recorder.flows[name] = recorder.flows.get(name, 0) + 1
+        username = f'load_user_{random.randrange(args.accounts)}' if args.accounts and name != 'new_patient' else f'vu_{os.getpid()}_{n}'
+        try:
+            await FLOWS[name](VirtualUser(client, recorder, args.think, fixtures, username))
+        finally:
+            recorder.active_users -= 1
+
+    sessions = set()
+    n = 0
+    while (elapsed := time.perf_counter() - recorder.start) < args.duration:
+        # Poisson arrivals at the full rate, thinned for a linear ramp-up over --ramp seconds.
+        await asyncio.sleep(random.expovariate(args.rate))
+        if args.ramp and random.random() > (time.perf_counter() - recorder.start) / args.ramp:
+            continue
+        if recorder.active_users >= args.max_users:
+            recorder.dropped_arrivals += 1
+            continue
+        n += 1
+        task = asyncio.create_task(session(random.choices(names, weights)[0], n))
+        sessions.add(task)
+        task.add_done_callback(sessions.discard)
+
+    if sessions:
+        _, pending = await asyncio.wait(sessions, timeout=args.drain)
+        for task in pending:
+            task.cancel()
+    elapsed = time.perf_counter() - recorder.start
+    if sampler:
+        sampler.cancel()
+
+    endpoints = summarize(recorder, elapsed)
+    return {
+        'label': args.label,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('compare', 'serve')},
+        'elapsed_s': round(elapsed, 1),
+        'totals': {'requests': recorder.total, 'per_second': round(recorder.total / elapsed, 1), 'sessions': n},
+        'flows': recorder.flows,
+        'dropped_arrivals': recorder.dropped_arrivals,
+        'endpoints': endpoints,
+        'timeline': timeline
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=20.0, help='virtual user arrivals per second')
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds of arrivals')
+    parser.add_argument('--ramp', type=float, default=10.0, help='seconds to ramp up to --rate')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='flow weights, e.g. "predictor=3,uploader=1"')
+    parser.add_argument('--think', type=float, default=1.0, help='mean think time between steps (seconds)')
+    parser.add_argument('--max-users', type=int, default=5000, help='cap on concurrent virtual users')
+    parser.add_argument('--connections', type=int, default=256, help='max open HTTP connections')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout (seconds)')
+    parser.add_argument('--drain', type=float, default=30.0, help='seconds to let sessions finish after --duration')
+    parser.add_argument('--accounts', type=int, default=500, help='pre-registered returning users')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='directory of scans to upload')
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn', 'uvicorn'), default='werkzeug')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--no-admission', dest='admission', action='store_false', help='disable admission control')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='server CPU/RSS sampling period (seconds)')
+    parser.add_argument('--startup-timeout', type=float, default=180.0)
+    parser.add_argument('--label', default='run', help='name for the saved run')
+    parser.add_argument('--output-dir', default=os.path.join(BENCH_DIR, 'load_runs'))
+    parser.add_argument('--keep-run-dir', action='store_true', help='keep the server database, uploads and log')
+    parser.add_argument('--compare', nargs=2, metavar=('RUN_A', 'RUN_B'), help='compare two saved runs and exit')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)  # Child process entry point
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    run_dir = tempfile.mkdtemp(prefix='load_test_')
+    port = free_port()
+    server = start_server(args, run_dir, port)
+    try:
+        run = asyncio.run(run_load(args, port, server.pid))
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        if args.keep_run_dir:
+            print(f"Server database, uploads and log kept in {run_dir}")
+        else:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    print_report(run)
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{datetime.now():%Y%m%d-%H%M%S}-{args.label}.json")
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=1)
+    print(f"\nSaved to {path}")
+
+
+if __name__ == '__main__':
+    main()
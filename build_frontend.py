@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli  # Optional: `pip install brotli` to also emit .br files
+except ImportError:
+    brotli = None
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(PROJECT_ROOT, 'frontend')
+BUILD_DIR = os.path.join(PROJECT_ROOT, 'build', 'frontend')
+ASSETS_DIR = os.path.join(BUILD_DIR, 'assets')
+
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css', '.svg', '.json', '.txt'}
+
+NAVBAR_PLACEHOLDER = '<div id="navbar-container"></div>'
+STYLESHEET_PATTERN = re.compile(r'href="/?styles/main\.css"')
+# A run of adjacent local <script> tags, which are bundled into one file.
+SCRIPT_RUN_PATTERN = re.compile(r'(?:<script src="/?scripts/[\w.-]+\.js"></script>\s*)+')
+SCRIPT_SRC_PATTERN = re.compile(r'<script src="/?scripts/([\w.-]+\.js)"></script>')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def write_fingerprinted(name, ext, data):
+    """Writes data to assets/<name>.<hash><ext> and returns its URL path."""
+    filename = f"{name}.{content_hash(data)}{ext}"
+    with open(os.path.join(ASSETS_DIR, filename), 'wb') as f:
+        f.write(data)
+    return f"/assets/{filename}"
+
+
+def build_bundle(script_names, bundles):
+    """Concatenates the given scripts (in page order) into one fingerprinted bundle."""
+    key = tuple(script_names)
+    if key not in bundles:
+        parts = []
+        for name in script_names:
+            with open(os.path.join(SOURCE_DIR, 'scripts', name), 'rb') as f:
+                parts.append(b'// --- scripts/' + name.encode() + b' ---\n' + f.read())
+        # The ';' guards against a file that ends without a semicolon.
+        bundles[key] = write_fingerprinted('bundle', '.js', b'\n;\n'.join(parts) + b'\n')
+    return bundles[key]
+
+
+def build_page(html, navbar_html, stylesheet_url, bundles):
+    html = html.replace(
+        NAVBAR_PLACEHOLDER,
+        f'<div id="navbar-container" data-prerendered="true">\n{navbar_html}\n</div>'
+    )
+    html = STYLESHEET_PATTERN.sub(f'href="{stylesheet_url}"', html)
+
+    def replace_run(match):
+        script_names = SCRIPT_SRC_PATTERN.findall(match.group(0))
+        trailing = match.group(0)[len(match.group(0).rstrip()):]
+        return f'<script src="{build_bundle(script_names, bundles)}"></script>{trailing}'
+
+    return SCRIPT_RUN_PATTERN.sub(replace_run, html)
+
+
+def precompress(path):
+    """Writes .gz (and .br when available) siblings, keeping them only if smaller."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = 0
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written += 1
+    return written
+
+
+def main():
+    """
+    Builds a production copy of the frontend in build/frontend:
+    inlines the navbar, bundles and fingerprints the scripts and stylesheet,
+    and precompresses text assets for static_server.py.
+    """
+    print("--- Building frontend ---")
+    if os.path.isdir(BUILD_DIR):
+        shutil.rmtree(BUILD_DIR)
+    os.makedirs(ASSETS_DIR)
+
+    with open(os.path.join(SOURCE_DIR, '_navbar.html'), encoding='utf-8') as f:
+        navbar_html = f.read().strip()
+    with open(os.path.join(SOURCE_DIR, 'styles', 'main.css'), 'rb') as f:
+        stylesheet_url = write_fingerprinted('main', '.css', f.read())
+
+    bundles = {}
+    pages = 0
+    for entry in sorted(os.listdir(SOURCE_DIR)):
+        source_path = os.path.join(SOURCE_DIR, entry)
+        if os.path.isdir(source_path):
+            # Scripts and styles only ship as fingerprinted assets.
+            if entry not in ('scripts', 'styles'):
+                shutil.copytree(source_path, os.path.join(BUILD_DIR, entry))
+        elif entry.endswith('.html'):
+            with open(source_path, encoding='utf-8') as f:
+                html = f.read()
+            if entry != '_navbar.html':
+                html = build_page(html, navbar_html, stylesheet_url, bundles)
+                pages += 1
+            with open(os.path.join(BUILD_DIR, entry), 'w', encoding='utf-8') as f:
+                f.write(html)
+        else:
+            shutil.copy2(source_path, os.path.join(BUILD_DIR, entry))
+
+    compressed = 0
+    for dirpath, _, filenames in os.walk(BUILD_DIR):
+        for filename in filenames:
+            if os.path.splitext(filename)[1] in COMPRESSIBLE_EXTENSIONS:
+                compressed += precompress(os.path.join(dirpath, filename))
+
+    print(f"Built {pages} pages, {len(bundles)} script bundles and 1 stylesheet into '{BUILD_DIR}'.")
+    print(f"Wrote {compressed} precompressed variants" + ("" if brotli else " (install 'brotli' for .br files)") + ".")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,17 +18,160 @@ class Config:
 
     TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+    # Input-drift monitoring: live /predict inputs are summarised per worker and merged
+    # into DRIFT_STATE_PATH every DRIFT_FLUSH_ROWS rows or DRIFT_FLUSH_SECONDS seconds.
+    DRIFT_MONITORING = os.environ.get('DRIFT_MONITORING', '1') == '1'
+    DRIFT_STATE_PATH = os.path.join(basedir, 'drift_state.json')
+    DRIFT_FLUSH_ROWS = 100
+    DRIFT_FLUSH_SECONDS = 30.0
+
+    # When the ML models are loaded: 'eager', 'background' or 'lazy' (see create_app).
+    MODEL_LOADING = os.environ.get('MODEL_LOADING', 'background')
+    # Per-request latency budget for /predict (milliseconds, p99 including the SHAP
+    # explanation). When set, the most accurate compact variant built by
+    # train_model.py that fits it is served instead of the full model; unset serves
+    # the full model. See `flask model-variants` for the measured trade-offs.
+    MODEL_LATENCY_BUDGET_MS = float(os.environ['MODEL_LATENCY_BUDGET_MS']) if os.environ.get('MODEL_LATENCY_BUDGET_MS') else None
+
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite tuning applied to every new connection: WAL journaling lets readers run
+    # alongside the single writer, and synchronous=NORMAL only fsyncs at WAL
+    # checkpoints instead of on every commit (use FULL to fsync every commit).
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') == '1'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+
+    # How /predict stores its Prediction row (see prediction_log.save):
+    #   'sync'  - commit in the request (default).
+    #   'group' - a background writer commits queued rows in batches; the request
+    #             still waits until its row is committed.
+    #   'async' - write-behind: the request returns immediately and the row is
+    #             committed within PREDICTION_LOG_FLUSH_INTERVAL. Queued rows are
+    #             flushed on graceful shutdown but lost if the process is killed.
+    PREDICTION_LOG_MODE = os.environ.get('PREDICTION_LOG_MODE', 'sync')
+    PREDICTION_LOG_BATCH_SIZE = 256
+    PREDICTION_LOG_FLUSH_INTERVAL = 0.01
+    PREDICTION_LOG_MAX_QUEUE = 10000
+    # Longest a request waits (seconds) to queue its row and, in 'group' mode, for
+    # the batch to commit. If the queue stays full the row is inserted directly; if
+    # the commit does not come in time /predict answers 503.
+    PREDICTION_LOG_FLUSH_TIMEOUT = 5.0
+
     # File Upload Configuration
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
+    # Largest request body Flask accepts (a direct upload or one resumable chunk); larger requests get 413.
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    # Resumable uploads (/uploads): largest file, suggested chunk size, and how long
+    # an unfinished upload is kept (seconds since its last chunk).
+    UPLOAD_MAX_FILE_SIZE = 1024 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    UPLOAD_SESSION_TTL = 24 * 3600
+
+    # Where documents and profile pictures are stored (see app/services/storage.py):
+    # 'local' keeps them under UPLOAD_FOLDER; 's3' puts them in an S3-compatible
+    # bucket (set STORAGE_S3_ENDPOINT_URL for MinIO and the like; credentials come
+    # from the usual AWS environment variables or config files). Files above
+    # STORAGE_MULTIPART_THRESHOLD are uploaded in parallel parts, and reads go
+    # through a disk cache of at most STORAGE_CACHE_MAX_BYTES. Unfinished
+    # resumable uploads always stay under UPLOAD_FOLDER, so with several nodes
+    # route /uploads/<id> to the node that started it or share that directory.
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    STORAGE_S3_BUCKET = os.environ.get('STORAGE_S3_BUCKET')
+    STORAGE_S3_PREFIX = os.environ.get('STORAGE_S3_PREFIX', '')
+    STORAGE_S3_ENDPOINT_URL = os.environ.get('STORAGE_S3_ENDPOINT_URL')
+    STORAGE_S3_REGION = os.environ.get('STORAGE_S3_REGION')
+    STORAGE_S3_MAX_CONNECTIONS = int(os.environ.get('STORAGE_S3_MAX_CONNECTIONS', 20))
+    STORAGE_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+    STORAGE_MULTIPART_CHUNK_SIZE = 16 * 1024 * 1024
+    STORAGE_CACHE_DIR = os.environ.get('STORAGE_CACHE_DIR', os.path.join(basedir, 'storage_cache'))
+    STORAGE_CACHE_MAX_BYTES = int(os.environ.get('STORAGE_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+    # Profile pictures: each upload is rendered once into these square sizes (pixels),
+    # as JPEG and WebP, by PROFILE_IMAGE_WORKERS threads per process. Uploads larger
+    # than PROFILE_IMAGE_MAX_BYTES or with more than PROFILE_IMAGE_MAX_PIXELS pixels
+    # (checked from the header, before decoding) are rejected with 413.
+    PROFILE_IMAGE_SIZES = (48, 150, 400)
+    PROFILE_IMAGE_WORKERS = 2
+    PROFILE_IMAGE_MAX_BYTES = 16 * 1024 * 1024
+    PROFILE_IMAGE_MAX_PIXELS = 50_000_000
+
+    # Data retention (`flask retention-run`): per owner role, predictions and documents
+    # older than these ages (days) move from the hot tables into compressed archive
+    # segments, and uploaded images older than 'images' are recompressed. None keeps
+    # data hot forever. Keep 'predictions' above 364: streaks use the last 52 weeks.
+    RETENTION_POLICIES = {
+        'Patient': {'predictions': 730, 'documents': 730, 'images': 90},
+        'Doctor': {'predictions': 400, 'documents': 365, 'images': 30},
+    }
+    RETENTION_BATCH_SIZE = 500
+    RETENTION_IMAGE_QUALITY = 75
+
+    # Admission control for expensive endpoints, per endpoint class: at most
+    # `concurrency` requests run at once and `queue` more wait (each up to `timeout`
+    # seconds); each user (or client address, for auth) also has a token bucket of
+    # `burst` requests refilled at `rate` per second. Requests beyond that get an
+    # immediate 429 (over the user's rate) or 503 (queue full / wait timed out) with
+    # Retry-After, so an OCR flood cannot tie up every worker. Keep concurrency +
+    # queue of the slow classes well below the server's worker threads. Limits are
+    # per process; set ADMISSION_SHARED_DIR to share them between worker processes
+    # on one host through lock files in that directory.
+    ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1') == '1'
+    ADMISSION_SHARED_DIR = os.environ.get('ADMISSION_SHARED_DIR')
+    ADMISSION_LIMITS = {
+        'ocr': {'concurrency': 2, 'queue': 2, 'timeout': 20.0, 'rate': 0.2, 'burst': 10},
+        'pdf': {'concurrency': 2, 'queue': 4, 'timeout': 10.0, 'rate': 0.5, 'burst': 5},
+        'predict': {'concurrency': 8, 'queue': 16, 'timeout': 2.0, 'rate': 2.0, 'burst': 20},
+        'auth': {'concurrency': 4, 'queue': 16, 'timeout': 2.0, 'rate': 0.5, 'burst': 10},
+        'export': {'concurrency': 2, 'queue': 2, 'timeout': 5.0, 'rate': 0.1, 'burst': 3},
+    }
+
+    # ASGI serving mode (`uvicorn asgi:app`, see app/asgi.py): the I/O-bound endpoints
+    # run as async handlers and every other Flask route runs on a bounded thread pool,
+    # ASGI_CPU_THREADS for model/OCR/PDF/bcrypt routes and ASGI_IO_THREADS for the rest
+    # (also the limit for blocking work started by the async handlers).
+    ASGI_CPU_THREADS = int(os.environ.get('ASGI_CPU_THREADS', os.cpu_count() or 2))
+    ASGI_IO_THREADS = int(os.environ.get('ASGI_IO_THREADS', 16))
+
+    # Bulk export (/doctor/export): rows fetched from the database cursor and written
+    # out per chunk (one Parquet row group each). Memory use grows with this, not
+    # with the size of the export.
+    EXPORT_CHUNK_SIZE = 5000
+
+    # Per-process user/role cache (seconds). Set to 0 to disable.
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
     
     # ... (Mail server config) ...
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
     MAIL_USE_TLS = True
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
-    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
\ No newline at end of file
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+
+    # Email outbox: messages are queued in the database and delivered in batches
+    # by a background sender. With MAIL_OUTBOX_WORKER enabled, each web process
+    # starts its own sender thread on first use; disable it when running the
+    # dedicated `flask outbox-worker` process instead.
+    MAIL_OUTBOX_WORKER = os.environ.get('MAIL_OUTBOX_WORKER', '1') == '1'
+    MAIL_OUTBOX_BATCH_SIZE = 100
+    MAIL_OUTBOX_POLL_INTERVAL = 2.0
+    MAIL_OUTBOX_MAX_ATTEMPTS = 5
+    MAIL_OUTBOX_BACKOFF_BASE = 30
+    MAIL_OUTBOX_BACKOFF_MAX = 3600
+    # Senders claim each batch before sending it, so several processes never send
+    # the same message; a claim not finished within this many seconds (the
+    # sender died) is released for another sender to retry.
+    MAIL_OUTBOX_LEASE = 300
+
+    # Patient deletion (DELETE /doctor/patients/...): the account is hidden at once and
+    # its predictions, documents, archives and files are removed by a background job
+    # in batches of DELETION_BATCH_SIZE rows, pausing DELETION_PAUSE seconds between
+    # batches. With DELETION_WORKER enabled each web process runs queued jobs in its
+    # own thread; disable it when running `flask deletion-worker` instead.
+    DELETION_WORKER = os.environ.get('DELETION_WORKER', '1') == '1'
+    DELETION_BATCH_SIZE = 500
+    DELETION_PAUSE = 0.05
+    DELETION_POLL_INTERVAL = 10.0
\ No newline at end of file
@@ -0,0 +1,278 @@
+# data_ingestion.py
+
+"""
+Out-of-core ingestion of the clinical training CSV.
+
+The CSV is read in chunks with compact dtypes, medians are computed with
+streaming quantile sketches, and the result is written to a columnar cache of
+memory-mapped NumPy files. Later runs on the same CSV open the cache instead of
+parsing it again, which takes milliseconds regardless of the number of rows.
+
+Usage (from the project root):
+    python data_ingestion.py [Data/Heartdata.csv] [--chunksize 500000] [--rebuild]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, 'Data', '.cache')
+
+# Bump when the cache layout or the preprocessing changes, so old caches are rebuilt.
+CACHE_VERSION = 1
+
+TARGET_COLUMN = 'target'
+
+# Smallest dtypes that hold the clinical ranges of each column. Columns not listed
+# here are read as float32.
+CLINICAL_DTYPES = {
+    'age': 'int8',        # years
+    'sex': 'int8',
+    'cp': 'int8',         # chest pain type 0-3
+    'trestbps': 'int16',  # resting blood pressure, mm Hg
+    'chol': 'int16',      # serum cholesterol, mg/dl
+    'fbs': 'int8',
+    'restecg': 'int8',
+    'thalach': 'int16',   # max heart rate
+    'exang': 'int8',
+    'oldpeak': 'float32',
+    'slope': 'int8',
+    'ca': 'int8',
+    'thal': 'int8',
+    'target': 'int8'
+}
+
+
+# --- Memory reporting ---
+
+@contextlib.contextmanager
+def stage(name, report):
+    """Times a block and records its peak traced memory (Python and NumPy allocations) in `report`."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        elapsed = time.perf_counter() - start
+        if started:
+            tracemalloc.stop()
+        report.append({'stage': name, 'seconds': elapsed, 'peak_mb': peak / 2 ** 20})
+        print(f"  {name:<22} {elapsed:8.2f}s   peak {peak / 2 ** 20:8.1f} MB")
+
+
+# --- Streaming medians ---
+
+class QuantileSketch:
+    """
+    Weighted value/count summary for streaming quantiles.
+
+    Exact as long as the column has at most `max_size` distinct values, which is
+    always the case for the integer clinical columns. Beyond that, neighbouring
+    values are merged into weighted centroids (as in a t-digest), keeping memory
+    bounded with a small rank error.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+        self.exact = True
+
+    def update(self, column):
+        """Adds a 1-D array of non-missing values."""
+        if not len(column):
+            return
+        values, counts = np.unique(column, return_counts=True)
+        merged = np.concatenate([self.values, values.astype(np.float64)])
+        weights = np.concatenate([self.weights, counts.astype(np.float64)])
+        self.values, inverse = np.unique(merged, return_inverse=True)
+        self.weights = np.bincount(inverse, weights=weights)
+        if len(self.values) > self.max_size:
+            self._compress()
+
+    def _compress(self):
+        # Equal-weight groups of neighbouring values, each replaced by its weighted mean.
+        cumulative = np.cumsum(self.weights)
+        groups = np.minimum((cumulative / cumulative[-1] * (self.max_size // 2)).astype(np.int64), self.max_size // 2 - 1)
+        weights = np.bincount(groups, weights=self.weights)
+        sums = np.bincount(groups, weights=self.values * self.weights)
+        keep = weights > 0
+        self.values, self.weights = sums[keep] / weights[keep], weights[keep]
+        self.exact = False
+
+    def median(self):
+        """Median with pandas' convention (mean of the two middle values for an even count)."""
+        if not len(self.values):
+            return float('nan')
+        cumulative = np.cumsum(self.weights)
+        total = cumulative[-1]
+        lower = self.values[np.searchsorted(cumulative, (total + 1) // 2)]
+        upper = self.values[np.searchsorted(cumulative, total // 2 + 1)]
+        return float((lower + upper) / 2)
+
+
+# --- Columnar cache ---
+
+def _sentinel(dtype):
+    """Placeholder written for missing values until the medians are known."""
+    dtype = np.dtype(dtype)
+    return np.nan if dtype.kind == 'f' else np.iinfo(dtype).min
+
+
+def _downcast(col, parsed, holes, dtype):
+    """Casts a parsed float32 column to its compact dtype, writing the sentinel for missing values."""
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return parsed.astype(dtype, copy=False)
+    present = parsed[~holes]
+    info = np.iinfo(dtype)
+    if len(present) and (present.min() <= info.min or present.max() > info.max or (present != np.round(present)).any()):
+        raise ValueError(f"Column '{col}' has values that do not fit {dtype.name}; update CLINICAL_DTYPES.")
+    return np.where(holes, info.min, parsed).astype(dtype)
+
+
+def cache_path_for(csv_path):
+    """Cache directory keyed on the CSV's path, size and modification time."""
+    info = os.stat(csv_path)
+    key = f"{os.path.abspath(csv_path)}:{info.st_size}:{info.st_mtime_ns}:{CACHE_VERSION}"
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(CACHE_DIR, f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:12]}")
+
+
+def build_cache(csv_path, cache_path, chunksize=500_000, report=None):
+    """
+    Streams the CSV into one raw binary file per column, then fills missing
+    feature values with the column medians. Rows without a target are dropped.
+    Memory use is bounded by the chunk size, not the file size.
+    """
+    report = [] if report is None else report
+    columns = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    if TARGET_COLUMN not in columns:
+        raise ValueError(f"Column '{TARGET_COLUMN}' not found in dataset.")
+    dtypes = {col: CLINICAL_DTYPES.get(col, 'float32') for col in columns}
+
+    tmp_path = cache_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    sketches = {col: QuantileSketch() for col in columns if col != TARGET_COLUMN}
+    missing = {col: 0 for col in columns}
+    rows = 0
+    with stage('read + sketch', report):
+        files = {col: open(os.path.join(tmp_path, f'{col}.bin'), 'wb') for col in columns}
+        try:
+            # Parsed as float32 (pandas' nullable integer parser is an order of magnitude
+            # slower) and downcast per column below, with a range check.
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=np.float32):
+                chunk = chunk[chunk[TARGET_COLUMN].notna()]
+                rows += len(chunk)
+                for col in columns:
+                    parsed = chunk[col].to_numpy()
+                    holes = np.isnan(parsed)
+                    missing[col] += int(holes.sum())
+                    if col in sketches:
+                        sketches[col].update(parsed[~holes])
+                    files[col].write(_downcast(col, parsed, holes, dtypes[col]).tobytes())
+        finally:
+            for f in files.values():
+                f.close()
+
+    medians = {col: sketch.median() for col, sketch in sketches.items()}
+    with stage('impute medians', report):
+        for col, count in missing.items():
+            if not count or col == TARGET_COLUMN:
+                continue
+            path = os.path.join(tmp_path, f'{col}.bin')
+            values = np.memmap(path, dtype=dtypes[col], mode='r+', shape=(rows,))
+            median = medians[col]
+            if values.dtype.kind != 'f' and median != int(median):
+                # Like pandas, a column whose fill value is fractional becomes float.
+                converted = np.memmap(path + '.f4', dtype='float32', mode='w+', shape=(rows,))
+                for start in range(0, rows, chunksize):
+                    block = values[start:start + chunksize]
+                    converted[start:start + chunksize] = np.where(block == _sentinel(dtypes[col]), median, block)
+                converted.flush()
+                del values, converted
+                os.replace(path + '.f4', path)
+                dtypes[col] = 'float32'
+                continue
+            for start in range(0, rows, chunksize):
+                block = values[start:start + chunksize]
+                holes = np.isnan(block) if block.dtype.kind == 'f' else block == _sentinel(dtypes[col])
+                block[holes] = median
+            values.flush()
+            del values
+
+    meta = {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(csv_path),
+        'rows': rows,
+        'columns': columns,
+        'dtypes': dtypes,
+        'medians': medians,
+        'medians_exact': all(sketch.exact for sketch in sketches.values()),
+        'missing': missing
+    }
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(tmp_path, cache_path)
+    return meta
+
+
+def load_cache(cache_path):
+    """Opens a cache as a DataFrame backed by read-only memory maps (no parsing, no copy)."""
+    with open(os.path.join(cache_path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    data = {
+        col: np.memmap(os.path.join(cache_path, f'{col}.bin'), dtype=meta['dtypes'][col], mode='r', shape=(meta['rows'],))
+        for col in meta['columns']
+    }
+    return pd.DataFrame(data, copy=False), meta
+
+
+def load_training_data(csv_path="Data/Heartdata.csv", chunksize=500_000, rebuild=False, report=None):
+    """
+    Returns (X, y) for training, building the columnar cache on the first run for
+    this CSV and reusing it afterwards. Peak memory and time per stage are
+    printed and appended to `report` when given.
+    """
+    report = [] if report is None else report
+    cache_path = cache_path_for(csv_path)
+    print(f"--- Ingesting '{csv_path}' ---")
+    if rebuild or not os.path.exists(os.path.join(cache_path, 'meta.json')):
+        print(f"Building columnar cache in '{os.path.relpath(cache_path, BASE_DIR)}'...")
+        build_cache(csv_path, cache_path, chunksize=chunksize, report=report)
+    else:
+        print(f"Using columnar cache in '{os.path.relpath(cache_path, BASE_DIR)}'.")
+
+    with stage('load cache', report):
+        df, meta = load_cache(cache_path)
+        X = df.drop(columns=TARGET_COLUMN)
+        y = df[TARGET_COLUMN]
+    print(f"{meta['rows']} rows, {len(X.columns)} features, {df.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB in memory-mapped columns.")
+    return X, y
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build (or reuse) the columnar training-data cache for a CSV file.')
+    parser.add_argument('csv_path', nargs='?', default=os.path.join('Data', 'Heartdata.csv'), help='Training CSV')
+    parser.add_argument('--chunksize', type=int, default=500_000, help='Rows parsed per chunk')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore an existing cache')
+    args = parser.parse_args()
+
+    load_training_data(args.csv_path, chunksize=args.chunksize, rebuild=args.rebuild)
@@ -25,7 +25,8 @@ async function loadPredictionHistory() {
     if (!historyContainer) return;
 
     try {
-        const response = await fetch(`${API_URL}/predictions`, {
+        // The aggregated /dashboard endpoint returns risk counts and recent history together.
+        const response = await fetch(`${API_URL}/dashboard?limit=50`, {
             method: 'GET',
             headers: { 'Authorization': `Bearer ${token}` }
         });
@@ -36,7 +37,8 @@ async function loadPredictionHistory() {
             return;
         }
 
-        const history = data;
+        const history = data.latest_predictions;
+        const riskCounts = data.risk_counts;
         
         const ctx = document.getElementById('historyChart');
         if (ctx) {
@@ -44,13 +46,6 @@ async function loadPredictionHistory() {
                 historyChart.destroy(); // Destroy old chart before drawing new one
             }
             if (history.length > 0) {
-                const riskCounts = { 'Low': 0, 'Medium': 0, 'High': 0 };
-                history.forEach(pred => {
-                    if (pred.risk_category in riskCounts) {
-                        riskCounts[pred.risk_category]++;
-                    }
-                });
-
                 historyChart = new Chart(ctx.getContext('2d'), {
                     type: 'pie',
                     data: {
@@ -114,10 +109,13 @@ function processOcrText(text) {
 // Loads the navbar from a separate file
 async function loadNavbar() {
     try {
-        const response = await fetch('_navbar.html');
-        if (!response.ok) return;
-        const navbarHtml = await response.text();
-        document.getElementById('navbar-container').innerHTML = navbarHtml;
+        const navbarContainer = document.getElementById('navbar-container');
+        // Skip the fetch when the navbar was inlined by build_frontend.py.
+        if (!navbarContainer.dataset.prerendered) {
+            const response = await fetch('_navbar.html');
+            if (!response.ok) return;
+            navbarContainer.innerHTML = await response.text();
+        }
         const logoutButton = document.getElementById('logoutButton');
         if (logoutButton) {
             logoutButton.addEventListener('click', () => {
@@ -216,15 +214,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 uploadResultDiv.innerHTML = '<div class="alert alert-danger">Please select a file to upload.</div>'; return;
             }
             const file = fileInput.files[0];
-            const formData = new FormData();
-            formData.append('document', file);
             try {
-                const response = await fetch(`${API_URL}/upload-document`, {
-                    method: 'POST',
-                    headers: { 'Authorization': `Bearer ${token}` },
-                    body: formData
+                const { response, data } = await uploadResumable(file, {
+                    onProgress: (fraction) => {
+                        uploadResultDiv.innerHTML = `<div class="alert alert-info">Uploading... ${Math.round(fraction * 100)}%</div>`;
+                    },
+                    onBusy: (seconds) => {
+                        uploadResultDiv.innerHTML = `<div class="alert alert-info">The server is busy; processing will start in about ${seconds}s...</div>`;
+                    }
                 });
-                const data = await response.json();
                 if (response.ok) {
                     const highlightedText = processOcrText(data.extracted_text);
                     uploadResultDiv.innerHTML = `<div class="alert alert-success mt-4"><h4>Upload Successful!</h4><p><strong>Filename:</strong> ${data.filename}</p><p><strong>Extracted Text (click a number to fill the form):</strong></p><pre class="bg-white p-2 rounded">${highlightedText}</pre></div>`;
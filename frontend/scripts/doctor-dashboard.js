@@ -2,6 +2,105 @@
 
 // NOTE: The global variables 'API_URL' and 'token' are defined in main.js
 
+const RISK_COLORS = { Low: 'rgb(25, 135, 84)', Medium: 'rgb(255, 193, 7)', High: 'rgb(220, 53, 69)' };
+const cohortCharts = {};
+
+// Replaces a chart on the given canvas (Chart.js keeps one chart per canvas)
+function drawChart(id, config) {
+    const canvas = document.getElementById(id);
+    if (!canvas) return;
+    if (cohortCharts[id]) {
+        cohortCharts[id].destroy();
+    }
+    cohortCharts[id] = new Chart(canvas.getContext('2d'), config);
+}
+
+// Population-level charts, read from the precomputed cohort rollups
+async function loadCohortAnalytics() {
+    const summary = document.getElementById('analytics-summary');
+    if (!summary || !token) return;
+    const days = document.getElementById('analytics-range').value;
+    const bucket = days > 90 ? 'week' : 'day';
+
+    try {
+        const response = await fetch(`${API_URL}/doctor/analytics?days=${days}&bucket=${bucket}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            summary.innerHTML = `<span class="text-danger">${data.message || 'Could not load cohort analytics.'}</span>`;
+            return;
+        }
+
+        const meanProbability = data.mean_probability === null ? 'n/a' : `${(data.mean_probability * 100).toFixed(1)}%`;
+        summary.textContent = `${data.total_predictions} predictions in total, mean predicted risk ${meanProbability}.`;
+
+        const categories = Object.keys(RISK_COLORS);
+        drawChart('cohortRiskChart', {
+            type: 'pie',
+            data: {
+                labels: categories.map(c => `${c} Risk`),
+                datasets: [{
+                    data: categories.map(c => data.risk_distribution[c]),
+                    backgroundColor: categories.map(c => RISK_COLORS[c]),
+                    hoverOffset: 4
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: { position: 'top' },
+                    title: { display: true, text: 'Risk Distribution (all time)' }
+                }
+            }
+        });
+
+        const points = data.trend.points;
+        drawChart('cohortTrendChart', {
+            type: 'line',
+            data: {
+                labels: points.map(p => p.date),
+                datasets: categories.map(c => ({
+                    label: `${c} Risk`,
+                    data: points.map(p => p[c]),
+                    borderColor: RISK_COLORS[c],
+                    backgroundColor: RISK_COLORS[c],
+                    tension: 0.2
+                }))
+            },
+            options: {
+                responsive: true,
+                scales: { y: { beginAtZero: true, ticks: { precision: 0 } } },
+                plugins: {
+                    title: { display: true, text: `Predictions per ${data.trend.bucket}` }
+                }
+            }
+        });
+
+        drawChart('cohortFeatureChart', {
+            type: 'bar',
+            data: {
+                labels: data.feature_importance.map(f => f.feature),
+                datasets: [{
+                    label: 'Mean |SHAP| (average impact on predicted risk)',
+                    data: data.feature_importance.map(f => f.mean_abs_shap),
+                    backgroundColor: 'rgb(13, 110, 253)'
+                }]
+            },
+            options: {
+                indexAxis: 'y',
+                responsive: true,
+                plugins: {
+                    title: { display: true, text: 'Feature Importance across all predictions' }
+                }
+            }
+        });
+    } catch (error) {
+        console.error('Failed to load cohort analytics:', error);
+        summary.innerHTML = '<span class="text-danger">A network error occurred while loading cohort analytics.</span>';
+    }
+}
+
 async function loadPatientList() {
     const container = document.getElementById('patient-list-container');
     
@@ -66,8 +165,14 @@ async function loadPatientList() {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
+    loadCohortAnalytics();
     loadPatientList();
 
+    const range = document.getElementById('analytics-range');
+    if (range) {
+        range.addEventListener('change', loadCohortAnalytics);
+    }
+
     const container = document.getElementById('patient-list-container');
     if (container) {
         container.addEventListener('click', async (e) => {
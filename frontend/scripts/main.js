@@ -38,7 +38,8 @@ applyTheme(savedTheme);
 
 
 /**
- * Fetches the navbar HTML, injects it into the page, and sets up its event listeners.
+ * Fetches the navbar HTML (unless it was inlined at build time), injects it into the page,
+ * and sets up its event listeners.
  */
 async function loadNavbar() {
     // On pages with a navbar, we must be logged in. Redirect if no token is found.
@@ -49,13 +50,14 @@ async function loadNavbar() {
     }
 
     try {
-        const response = await fetch('_navbar.html');
-        if (!response.ok) return;
-        const navbarHtml = await response.text();
         const navbarContainer = document.getElementById('navbar-container');
-        
-        if (navbarContainer) {
-            navbarContainer.innerHTML = navbarHtml;
+
+        // Pages built by build_frontend.py already have the navbar inlined, so only
+        // fetch it when serving the raw source files.
+        if (navbarContainer && !navbarContainer.dataset.prerendered) {
+            const response = await fetch('_navbar.html');
+            if (!response.ok) return;
+            navbarContainer.innerHTML = await response.text();
         }
 
         // Re-initialize theme logic AFTER the navbar (with the toggle) is loaded into the page.
@@ -100,4 +102,84 @@ function handleApiError(errorDiv, data, response) {
         const message = data.message || 'A server error occurred. Please try again later.';
         errorDiv.innerHTML = `<div class="alert alert-danger mt-4">${message}</div>`;
     }
-}
\ No newline at end of file
+}
+
+/**
+ * Uploads a file in chunks through the resumable upload API (/uploads).
+ * Each chunk carries a SHA-256 checksum and is retried with backoff on network
+ * errors; the upload id is kept in localStorage, so picking the same file again
+ * after a dropped connection or a page reload continues where it stopped.
+ * @param {File} file - The file to upload.
+ * @param {object} [options] - { purpose: 'document' | 'profile_picture', onProgress(fraction), onBusy(seconds) }.
+ * @returns {Promise<{response: Response, data: object}>} The final response, as with fetch.
+ */
+async function uploadResumable(file, options = {}) {
+    const purpose = options.purpose || 'document';
+    const storageKey = `upload:${purpose}:${file.name}:${file.size}:${file.lastModified}`;
+    const headers = { 'Authorization': `Bearer ${token}` };
+    let uploadId = localStorage.getItem(storageKey);
+    let offset = 0;
+    let chunkSize = 0;
+
+    if (uploadId) {
+        const response = await fetch(`${API_URL}/uploads/${uploadId}`, { headers });
+        if (response.ok) {
+            const state = await response.json();
+            offset = state.offset;
+            chunkSize = state.chunk_size;
+        } else {
+            uploadId = null; // Expired or already completed: start over
+        }
+    }
+    if (!uploadId) {
+        const response = await fetch(`${API_URL}/uploads`, {
+            method: 'POST',
+            headers: { ...headers, 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size, purpose })
+        });
+        const data = await response.json();
+        if (!response.ok) return { response, data };
+        uploadId = data.upload_id;
+        chunkSize = data.chunk_size;
+        localStorage.setItem(storageKey, uploadId);
+    }
+
+    while (offset < file.size) {
+        const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer();
+        const chunkHeaders = { ...headers, 'Upload-Offset': String(offset) };
+        if (window.crypto && crypto.subtle) {
+            const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', chunk));
+            chunkHeaders['Upload-Checksum'] = 'sha256 ' + Array.from(digest, b => b.toString(16).padStart(2, '0')).join('');
+        }
+        let response;
+        for (let attempt = 0; ; attempt++) {
+            try {
+                response = await fetch(`${API_URL}/uploads/${uploadId}`, { method: 'PUT', headers: chunkHeaders, body: chunk });
+                if (response.status !== 408 && response.status < 500) break;
+            } catch (error) {
+                if (attempt >= 4) throw error;
+            }
+            if (attempt >= 4) break;
+            await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+        }
+        const data = await response.json();
+        // 409 means the server has a different offset (e.g. a retried chunk had already arrived): continue from it.
+        if (!response.ok && response.status !== 409) return { response, data };
+        offset = data.offset;
+        if (options.onProgress) options.onProgress(offset / file.size);
+    }
+
+    // Processing (OCR) is admission-controlled: when the server is busy it answers
+    // 503/429 with a retry_after, and the finished upload simply waits its turn.
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(`${API_URL}/uploads/${uploadId}/complete`, { method: 'POST', headers });
+        const data = await response.json();
+        if ((response.status === 503 || response.status === 429) && attempt < 10) {
+            if (options.onBusy) options.onBusy(data.retry_after);
+            await new Promise(resolve => setTimeout(resolve, 1000 * (data.retry_after || 2)));
+            continue;
+        }
+        if (response.ok || response.status === 400 || response.status === 404) localStorage.removeItem(storageKey);
+        return { response, data };
+    }
+}
@@ -157,15 +157,15 @@ document.addEventListener("DOMContentLoaded", () => {
         return;
       }
       const file = fileInput.files[0];
-      const formData = new FormData();
-      formData.append("document", file);
       try {
-        const response = await fetch(`${API_URL}/upload-document`, {
-          method: "POST",
-          headers: { Authorization: `Bearer ${token}` },
-          body: formData,
+        const { response, data } = await uploadResumable(file, {
+          onProgress: (fraction) => {
+            uploadResultDiv.innerHTML = `<div class="alert alert-info">Uploading... ${Math.round(fraction * 100)}%</div>`;
+          },
+          onBusy: (seconds) => {
+            uploadResultDiv.innerHTML = `<div class="alert alert-info">The server is busy; processing will start in about ${seconds}s...</div>`;
+          },
         });
-        const data = await response.json();
         if (response.ok) {
           const highlightedText = processOcrText(data.extracted_text);
           uploadResultDiv.innerHTML = `<div class="alert alert-success mt-4"><h4>Upload Successful!</h4><p><strong>Filename:</strong> ${data.filename}</p><p><strong>Extracted Text (click a number to fill the form):</strong></p><pre class="bg-white p-2 rounded">${highlightedText}</pre></div>`;
@@ -3,6 +3,9 @@
 
 let profileChart = null;
 
+// How many recent predictions to list on the profile page.
+const PROFILE_HISTORY_LIMIT = 50;
+
 async function loadProfileData() {
     const profileUsername = document.getElementById('profileUsername');
     const profileEmail = document.getElementById('profileEmail');
@@ -10,7 +13,9 @@ async function loadProfileData() {
     const profileStreak = document.getElementById('profileStreak');
 
     try {
-        const response = await fetch(`${API_URL}/profile`, {
+        // One request for the profile, streak, risk counts and recent history.
+        // The browser revalidates it with the ETag, so unchanged data is a cheap 304.
+        const response = await fetch(`${API_URL}/dashboard?limit=${PROFILE_HISTORY_LIMIT}`, {
             headers: { 'Authorization': `Bearer ${token}` }
         });
         if (!response.ok) throw new Error('Failed to fetch profile data');
@@ -18,39 +23,60 @@ async function loadProfileData() {
         const data = await response.json();
         if(profileUsername) profileUsername.textContent = data.username;
         if(profileEmail) profileEmail.textContent = data.email;
+        showProfileImage(data.profile_image);
         if(profilePredictionCount) profilePredictionCount.textContent = `Total Predictions Made: ${data.prediction_count}`;
         if(profileStreak) profileStreak.textContent = `Current Streak: ${data.prediction_streak}`; // Populate streak
-        // Also load the prediction history for this page
-        loadPredictionHistory();
+        renderPredictionHistory(data.latest_predictions, data.risk_counts);
     } catch (error) {
         console.error("Error loading profile:", error);
         if(profileUsername) profileUsername.textContent = 'Could not load profile data.';
     }
 }
 
-async function loadPredictionHistory() {
+// Shows the 150px rendition (400px on high-density screens), WebP where supported.
+// The URLs are content-addressed, so the browser caches them for good.
+function showProfileImage(pictures) {
+    const img = document.getElementById('profileImage');
+    const webp = document.getElementById('profileImageWebp');
+    if (!img || !pictures) return;
+    webp.srcset = `${API_URL}${pictures[150].webp}, ${API_URL}${pictures[400].webp} 2x`;
+    img.srcset = `${API_URL}${pictures[150].jpg}, ${API_URL}${pictures[400].jpg} 2x`;
+    img.src = `${API_URL}${pictures[150].jpg}`;
+    img.hidden = false;
+}
+
+async function uploadProfilePicture(file) {
+    const status = document.getElementById('profilePictureStatus');
+    status.textContent = 'Uploading...';
+    try {
+        const formData = new FormData();
+        formData.append('picture', file);
+        const response = await fetch(`${API_URL}/profile/picture`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${token}` },
+            body: formData
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.message || 'Upload failed');
+        showProfileImage(data.profile_image);
+        status.textContent = '';
+    } catch (error) {
+        console.error('Profile picture upload failed:', error);
+        status.textContent = error.message;
+    }
+}
+
+function renderPredictionHistory(history, riskCounts) {
     const historyContainer = document.getElementById('history-container');
     if (!historyContainer) return;
 
     try {
-        const response = await fetch(`${API_URL}/predictions`, {
-            headers: { 'Authorization': `Bearer ${token}` }
-        });
-        if (!response.ok) throw new Error('Could not load history');
-        
-        const history = await response.json();
-        
         const ctx = document.getElementById('profileChart');
         if (ctx) {
             if (profileChart) {
                 profileChart.destroy();
             }
             if (history.length > 0) {
-                const riskCounts = { 'Low': 0, 'Medium': 0, 'High': 0 };
-                history.forEach(pred => {
-                    if (pred.risk_category in riskCounts) riskCounts[pred.risk_category]++;
-                });
-
                 profileChart = new Chart(ctx.getContext('2d'), {
                     type: 'pie',
                     data: {
@@ -86,7 +112,7 @@ async function loadPredictionHistory() {
         historyContainer.innerHTML = historyHtml;
 
     } catch (error) {
-        console.error('Failed to load prediction history:', error);
+        console.error('Failed to render prediction history:', error);
         historyContainer.innerHTML = '<p class="text-danger">Could not load prediction history.</p>';
     }
 }
@@ -94,6 +120,13 @@ async function loadPredictionHistory() {
 document.addEventListener('DOMContentLoaded', () => {
     loadProfileData();
 
+    const pictureInput = document.getElementById('profilePictureInput');
+    if (pictureInput) {
+        pictureInput.addEventListener('change', () => {
+            if (pictureInput.files.length > 0) uploadProfilePicture(pictureInput.files[0]);
+        });
+    }
+
     const historyContainer = document.getElementById('history-container');
     if (historyContainer) {
         historyContainer.addEventListener('click', async (e) => {
@@ -7,7 +7,12 @@ def main():
     """
     Starts both the Flask backend and the frontend http.server in parallel
     from a single terminal.
+
+    With --static, the frontend is first built by build_frontend.py and then
+    served by static_server.py (bundled, precompressed and cacheable assets)
+    instead of re-reading the source files on every hit.
     """
+    static_mode = '--static' in sys.argv[1:]
     project_root = os.path.dirname(os.path.abspath(__file__))
     frontend_dir = os.path.join(project_root, 'frontend')
 
@@ -32,13 +37,23 @@ def main():
     time.sleep(2)
 
     # --- Start the Frontend HTTP Server ---
-    print("\n--- Starting Frontend HTTP Server (on http://localhost:8000) ---")
-    
-    # Use 'python -m http.server'
-    frontend_process = subprocess.Popen(
-        [python_executable, '-m', 'http.server'], 
-        cwd=frontend_dir
-    )
+    if static_mode:
+        print("\n--- Building frontend for static serving ---")
+        subprocess.run([python_executable, 'build_frontend.py'], cwd=project_root, check=True)
+
+        print("\n--- Starting Static Frontend Server (on http://localhost:8000) ---")
+        frontend_process = subprocess.Popen(
+            [python_executable, 'static_server.py', '--port', '8000'],
+            cwd=project_root
+        )
+    else:
+        print("\n--- Starting Frontend HTTP Server (on http://localhost:8000) ---")
+
+        # Use 'python -m http.server'
+        frontend_process = subprocess.Popen(
+            [python_executable, '-m', 'http.server'], 
+            cwd=frontend_dir
+        )
     
     print("\nServers are running. Press CTRL+C in this terminal to shut them both down.")
 
@@ -0,0 +1,160 @@
+import argparse
+import hashlib
+import mimetypes
+import os
+import posixpath
+import shutil
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(PROJECT_ROOT, 'build', 'frontend')
+
+# Fingerprinted files never change, so browsers may cache them forever.
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Pages must be revalidated so a new build (with new asset names) is picked up.
+REVALIDATE_CACHE = 'no-cache'
+DEFAULT_CACHE = 'public, max-age=86400'
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    """Metadata for one servable file and its precompressed variants, gathered once at startup."""
+
+    def __init__(self, url_path, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type == 'application/javascript':
+            self.content_type += '; charset=utf-8'
+        with open(path, 'rb') as f:
+            self.etag = hashlib.sha1(f.read()).hexdigest()[:16]
+
+        if url_path.startswith('/assets/'):
+            self.cache_control = IMMUTABLE_CACHE
+        elif url_path.endswith('.html'):
+            self.cache_control = REVALIDATE_CACHE
+        else:
+            self.cache_control = DEFAULT_CACHE
+
+        self.variants = {}
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                self.variants[encoding] = (path + suffix, os.path.getsize(path + suffix))
+
+    def select(self, accept_encoding):
+        """Returns (path, size, content_encoding, etag) for the best variant the client accepts."""
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                path, size = self.variants[encoding]
+                return path, size, encoding, f'"{self.etag}-{encoding}"'
+        return self.path, self.size, None, f'"{self.etag}"'
+
+
+def build_index(root):
+    """Walks the build directory once and returns {url_path: StaticFile}."""
+    index = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(dirpath, filename)
+            url_path = '/' + os.path.relpath(path, root).replace(os.sep, '/')
+            index[url_path] = StaticFile(url_path, path)
+    return index
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: browsers reuse connections for assets
+    server_version = 'HeartStatic/1.0'
+    index = {}
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def serve(self, send_body):
+        url_path = posixpath.normpath(unquote(urlsplit(self.path).path))
+        if url_path in ('/', '.'):
+            url_path = '/index.html'
+        static_file = self.index.get(url_path)
+        if static_file is None:
+            self.send_error(404, 'File not found')
+            return
+
+        path, size, encoding, etag = static_file.select(self.headers.get('Accept-Encoding', ''))
+        common_headers = {
+            'ETag': etag,
+            'Cache-Control': static_file.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+            self.send_response(304)
+            for name, value in common_headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', static_file.content_type)
+        self.send_header('Content-Length', str(size))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in common_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if send_body:
+            with open(path, 'rb') as f:
+                self.wfile.flush()
+                try:
+                    # Zero-copy transfer from the page cache to the socket.
+                    self.connection.sendfile(f)
+                except (AttributeError, OSError, ValueError):
+                    f.seek(0)
+                    shutil.copyfileobj(f, self.wfile)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def main():
+    """
+    Serves a built frontend (see build_frontend.py) from a multi-threaded server with
+    precompressed variants, ETags and long-lived cache headers for fingerprinted assets.
+    """
+    parser = argparse.ArgumentParser(description='Serve the built frontend.')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='Directory produced by build_frontend.py')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--quiet', action='store_true', help='Do not log every request')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Error: '{args.root}' does not exist. Run 'python build_frontend.py' first.")
+        return 1
+
+    StaticHandler.index = build_index(args.root)
+    server = ThreadingHTTPServer((args.host, args.port), StaticHandler)
+    server.daemon_threads = True
+    server.quiet = args.quiet
+    print(f"Serving {len(StaticHandler.index)} files from '{args.root}' on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,27 +1,30 @@
+import os
 import pandas as pd
 import pickle
 import json
 import shap  # <--- 1. Import SHAP
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
+from app.services.drift_service import build_reference_stats, save_reference_stats
+from app.services import model_variants
+from data_ingestion import load_training_data
 
 print("--- Starting Model Training ---")
 
-# 1. Load Data
+# 1. Load Data (chunked ingestion into a columnar cache; reused on later runs)
 try:
-    df = pd.read_csv("Data/Heartdata.csv")
+    X, y = load_training_data("Data/Heartdata.csv")
     print("Dataset loaded successfully.")
 except FileNotFoundError:
     print("Error: 'Data/Heartdata.csv' not found. Please ensure the file is in the correct directory.")
     exit()
 
 # 2. Preprocess Data
-X = df.drop('target', axis=1)
-y = df['target']
-X = pd.get_dummies(X)
-X = X.fillna(X.median())
+# Missing feature values are already filled with streamed column medians by the
+# ingestion stage, and all clinical columns are numeric (no dummies needed).
 model_columns = X.columns.tolist()
 
 # 3. Split Data
@@ -70,7 +73,75 @@ with open('ml_models/model_columns.json', 'w') as f:
 with open('ml_models/shap_explainer.pkl', 'wb') as f:
     pickle.dump(explainer, f)
 
+# --- Save per-feature reference statistics for input-drift monitoring ---
+save_reference_stats(build_reference_stats(X_train))
+
 print("\n--- Model artifacts saved successfully ---")
 print("1. 'ml_models/heart_disease_pipeline.pkl' (the trained pipeline)")
 print("2. 'ml_models/model_columns.json' (the required feature list)")
-print("3. 'ml_models/shap_explainer.pkl' (the new SHAP explainer)") # <--- 8. Updated print
\ No newline at end of file
+print("3. 'ml_models/shap_explainer.pkl' (the new SHAP explainer)") # <--- 8. Updated print
+print("4. 'ml_models/reference_stats.json' (training distribution for drift monitoring)")
+
+# 8. --- Build compact model variants for latency-budgeted serving ---
+# prediction_service serves the most accurate variant whose measured p99 request
+# latency fits MODEL_LATENCY_BUDGET_MS (see app/services/model_variants.py).
+print("\nBuilding compact model variants...")
+candidates = {}
+
+# a) Greedy ensemble selection: the trees that best complement each other, picked
+#    on a validation split from a forest trained on the rest of the training data.
+X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.25, random_state=42)
+selection_pipeline = Pipeline([
+    ('scaler', StandardScaler()),
+    ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
+]).fit(X_fit, y_fit)
+selection_scaler = selection_pipeline.named_steps['scaler']
+compact_forests = model_variants.greedy_tree_selection(
+    selection_pipeline.named_steps['classifier'], selection_scaler.transform(X_val), y_val, sizes=(5, 10, 20))
+for size, forest in compact_forests.items():
+    candidates[f'greedy_{size}_trees'] = (
+        Pipeline([('scaler', selection_scaler), ('classifier', forest)]),
+        f'{size} of 100 trees, chosen by greedy selection on a validation split')
+
+# b) Depth-capped forests: shallower trees are cheaper to evaluate and to explain.
+for depth in (4, 6, 8):
+    candidates[f'forest_50_depth_{depth}'] = (Pipeline([
+        ('scaler', StandardScaler()),
+        ('classifier', RandomForestClassifier(n_estimators=50, max_depth=depth, random_state=42))
+    ]).fit(X_train, y_train), f'50 trees, max depth {depth}')
+
+# c) A compact linear model (SHAP contributions are then in log-odds).
+candidates['logistic'] = (Pipeline([
+    ('scaler', StandardScaler()),
+    ('classifier', LogisticRegression(max_iter=1000))
+]).fit(X_train, y_train), 'logistic regression on the scaled features')
+
+os.makedirs(model_variants.VARIANTS_DIR, exist_ok=True)
+variants = [{
+    'name': model_variants.FULL,
+    'description': '100 trees, unbounded depth (the production model above)',
+    'pipeline': 'heart_disease_pipeline.pkl',
+    'explainer': 'shap_explainer.pkl',
+    'size_bytes': os.path.getsize('ml_models/heart_disease_pipeline.pkl') + os.path.getsize('ml_models/shap_explainer.pkl'),
+    **model_variants.evaluate(pipeline, X_test, y_test),
+    **model_variants.profile(pipeline, explainer, X_test)
+}]
+for name, (variant_pipeline, description) in candidates.items():
+    background = pd.DataFrame(variant_pipeline.named_steps['scaler'].transform(X_train), columns=model_columns)
+    variant_explainer = model_variants.make_explainer(variant_pipeline, background)
+    entry = {'name': name, 'description': description,
+             'pipeline': f'variants/{name}_pipeline.pkl', 'explainer': f'variants/{name}_shap_explainer.pkl'}
+    pipeline_path, explainer_path = model_variants.artifact_paths(entry)
+    with open(pipeline_path, 'wb') as f:
+        pickle.dump(variant_pipeline, f)
+    with open(explainer_path, 'wb') as f:
+        pickle.dump(variant_explainer, f)
+    entry['size_bytes'] = os.path.getsize(pipeline_path) + os.path.getsize(explainer_path)
+    entry.update(model_variants.evaluate(variant_pipeline, X_test, y_test))
+    entry.update(model_variants.profile(variant_pipeline, variant_explainer, X_test))
+    variants.append(entry)
+    print(f"  {name}: AUC {entry['auc']:.4f}, p99 {entry['p99_ms']:.1f} ms")
+
+manifest = model_variants.save_manifest(variants, X_test)
+print("\n5. 'ml_models/variants/' (compact variants and manifest.json)")
+print(model_variants.format_report(manifest))